@@ -1,274 +1,169 @@
-import streamlit as st
-import requests
-import re
-import io
-from pydub import AudioSegment
-
-# =============================
-# LOGIN SYSTEM
-# =============================
-
-USERS = {
-    "Tejas": "Vobble123",
-    "Suryansh": "Vobble123"
-}
-
-if "logged_in" not in st.session_state:
-    st.session_state.logged_in = False
-
-if not st.session_state.logged_in:
-    st.title("🎙 Vobble Audio Studio Login")
-
-    username = st.text_input("Name")
-    password = st.text_input("Password", type="password")
-
-    if st.button("Login"):
-        if username in USERS and USERS[username] == password:
-            st.session_state.logged_in = True
-            st.rerun()
-        else:
-            st.error("Invalid credentials")
-
-    st.stop()
-
-# =============================
-# CONFIG
-# =============================
-
-API_KEY = st.secrets["API_KEY"]
-MODEL_ID = "eleven_v3"
-
-RETRIES = 3
-TIMEOUT_SEC = 30
-
-CROSSFADE_MS = 0
-GAP_SAME_SPEAKER_MS = 400
-GAP_SPEAKER_CHANGE_MS = 800
-
-CLIP_FADE_IN_MS = 20
-CLIP_FADE_OUT_MS = 40
-CLIP_TAIL_PAD_MS = 120
-
-# =============================
-# VOICE TYPE PROFILES
-# =============================
-
-VOICE_TYPE_PROFILES = {
-    "adult_male": {
-        "stability": 0.50,
-        "similarity_boost": 0.88,
-        "style": 0.75,
-        "use_speaker_boost": True
-    },
-    "adult_female": {
-        "stability": 0.5,
-        "similarity_boost": 0.90,
-        "style": 0.80,
-        "use_speaker_boost": True
-    },
-    "male_kid": {
-        "stability": 0.5,
-        "similarity_boost": 0.80,
-        "style": 0.90,
-        "use_speaker_boost": True
-    },
-    "female_kid": {
-        "stability": 0.5,
-        "similarity_boost": 0.78,
-        "style": 0.95,
-        "use_speaker_boost": False
-    }
-}
-
-# =============================
-# UTILITIES
-# =============================
-
-def normalize_name(name):
-    return name.strip().lower()
-
-def detect_characters(script_text):
-    characters = set()
-    lines = script_text.split("\n")
-
-    for line in lines:
-        line = line.strip()
-        if ":" in line:
-            speaker = line.split(":", 1)[0].strip()
-            if speaker:
-                characters.add(normalize_name(speaker))
-
-    return sorted(list(characters))
-
-ALLOWED_PAUSE_TAGS = {"[pause]", "[short pause]", "[long pause]"}
-
-def strip_unknown_brackets(s):
-    def repl(m):
-        tag = m.group(0).strip().lower()
-        return m.group(0) if tag in ALLOWED_PAUSE_TAGS else ""
-    return re.sub(r"\[[^\]]+\]", repl, s).strip()
-
-def ensure_line_tail(text):
-    t = strip_unknown_brackets(text.strip())
-    if not t:
-        return t
-
-    if not re.search(r"(\[short pause\]|\[pause\]|\[long pause\])\s*$", t):
-        if not t.endswith((".", "!", "?", ",")):
-            t += "."
-        t += " [short pause]"
-
-    return t
-
-# =============================
-# AUDIO GENERATION
-# =============================
-
-def generate_audio(text, voice_id, voice_settings):
-    t = ensure_line_tail(text)
-    if not t:
-        return None
-
-    # ✅ FIXED — request proper WAV output
-    url = f"https://api.elevenlabs.io/v1/text-to-speech/{voice_id}?output_format=wav_44100"
-
-    headers = {
-        "xi-api-key": API_KEY,
-        "Content-Type": "application/json"
-    }
-
-    data = {
-        "text": t,
-        "model_id": MODEL_ID,
-        "voice_settings": voice_settings
-    }
-
-    for attempt in range(RETRIES):
-        try:
-            response = requests.post(url, json=data, headers=headers, timeout=TIMEOUT_SEC)
-            break
-        except requests.exceptions.RequestException:
-            continue
-    else:
-        return None
-
-    if response.status_code != 200:
-        st.error(f"API Error {response.status_code}: {response.text}")
-        return None
-
-    # ✅ FIXED — load WAV properly
-    audio = AudioSegment.from_file(io.BytesIO(response.content), format="wav")
-
-    audio = audio.fade_in(CLIP_FADE_IN_MS).fade_out(CLIP_FADE_OUT_MS)
-    audio += AudioSegment.silent(duration=CLIP_TAIL_PAD_MS)
-
-    return audio
-
-# =============================
-# UI
-# =============================
-
-st.title("🎙 Vobble Audio Studio")
-
-uploaded_file = st.file_uploader("Upload Script (.txt)", type=["txt"])
-
-if uploaded_file:
-
-    script_text = uploaded_file.read().decode("utf-8")
-    characters = detect_characters(script_text)
-
-    if not characters:
-        st.warning("No characters detected. Use format: Name: dialogue")
-        st.stop()
-
-    st.subheader("🎭 Character Setup")
-
-    voice_map = {}
-    voice_profiles = {}
-
-    for character in characters:
-        st.markdown(f"### {character}")
-
-        voice_id = st.text_input(
-            f"Voice ID for {character}",
-            key=f"{character}_voice"
-        )
-
-        voice_type = st.selectbox(
-            f"Voice Type for {character}",
-            ["adult_male", "adult_female", "male_kid", "female_kid"],
-            key=f"{character}_type"
-        )
-
-        if voice_id:
-            voice_map[character] = voice_id
-            voice_profiles[character] = VOICE_TYPE_PROFILES[voice_type]
-
-    if st.button("🎬 Generate Episode"):
-
-        if len(voice_map) != len(characters):
-            st.error("Please assign Voice ID for all characters.")
-            st.stop()
-
-        final_audio = AudioSegment.empty()
-        prev_speaker = None
-
-        lines = script_text.split("\n")
-
-        progress = st.progress(0)
-        total_lines = len(lines)
-        processed = 0
-
-        for raw in lines:
-            line = raw.strip()
-            processed += 1
-            progress.progress(processed / total_lines)
-
-            if not line:
-                continue
-
-            if ":" in line:
-                speaker_part, dialogue = line.split(":", 1)
-                speaker = normalize_name(speaker_part)
-                dialogue = dialogue.strip()
-
-                if speaker not in voice_map:
-                    continue
-
-                audio = generate_audio(
-                    dialogue,
-                    voice_map[speaker],
-                    voice_profiles[speaker]
-                )
-
-                if audio:
-                    if len(final_audio) == 0:
-                        final_audio = audio
-                    else:
-                        # ✅ GAP BEFORE adding new line
-                        if prev_speaker == speaker:
-                            final_audio += AudioSegment.silent(duration=GAP_SAME_SPEAKER_MS)
-                        else:
-                            final_audio += AudioSegment.silent(duration=GAP_SPEAKER_CHANGE_MS)
-
-                        final_audio = final_audio.append(audio, crossfade=CROSSFADE_MS)
-
-                    prev_speaker = speaker
-
-        wav_io = io.BytesIO()
-        final_audio.export(
-            wav_io,
-            format="wav",
-            parameters=["-acodec", "pcm_s16le"]
-        )
-
-        wav_io.seek(0)
-
-        st.success("✅ Episode Generated Successfully!")
-
-        st.download_button(
-            label="⬇ Download Episode",
-            data=wav_io,
-            file_name="vobble_episode.wav",
-            mime="audio/wav"
-        )
+from typing import Dict
+
+import streamlit as st
+
+from listen_engine import telemetry
+from listen_engine.config import MixSettings
+from listen_engine.pipeline import render_episode
+from listen_engine.plan import CharConfig, plan_render, plan_summary
+from listen_engine.preflight import preflight
+from listen_engine.providers import configure
+from listen_engine.text import detect_characters, parse_script_lines
+from listen_engine.ui import admin_nav, queue_text, require_login
+
+# =============================
+# LOGIN SYSTEM
+# =============================
+
+USERS = {
+    "Tejas": "Vobble123",
+    "Suryansh": "Vobble123"
+}
+
+ADMINS = {"Tejas", "Suryansh"}
+
+require_login(USERS, "🎙 Vobble Audio Studio Login")
+
+# =============================
+# CONFIG
+# =============================
+
+configure(eleven_api_key=st.secrets["API_KEY"])
+
+MIX = MixSettings(
+    crossfade_ms=0,
+    gap_same_speaker_ms=400,
+    gap_speaker_change_ms=800,
+    clip_fade_in_ms=20,
+    clip_fade_out_ms=40,
+    clip_tail_pad_ms=120,
+    # ✅ FIXED — request proper WAV output
+    eleven_output_format="wav_44100",
+)
+
+admin_nav(ADMINS)
+
+# =============================
+# VOICE TYPE PROFILES
+# =============================
+
+VOICE_TYPE_PROFILES = {
+    "adult_male": {
+        "stability": 0.50,
+        "similarity_boost": 0.88,
+        "style": 0.75,
+        "use_speaker_boost": True
+    },
+    "adult_female": {
+        "stability": 0.5,
+        "similarity_boost": 0.90,
+        "style": 0.80,
+        "use_speaker_boost": True
+    },
+    "male_kid": {
+        "stability": 0.5,
+        "similarity_boost": 0.80,
+        "style": 0.90,
+        "use_speaker_boost": True
+    },
+    "female_kid": {
+        "stability": 0.5,
+        "similarity_boost": 0.78,
+        "style": 0.95,
+        "use_speaker_boost": False
+    }
+}
+
+# =============================
+# UI
+# =============================
+
+st.title("🎙 Vobble Audio Studio")
+
+uploaded_file = st.file_uploader("Upload Script (.txt)", type=["txt"])
+
+if uploaded_file:
+
+    script_text = uploaded_file.read().decode("utf-8")
+    characters = detect_characters(script_text)
+
+    if not characters:
+        st.warning("No characters detected. Use format: Name: dialogue")
+        st.stop()
+
+    st.subheader("🎭 Character Setup")
+
+    char_cfgs: Dict[str, CharConfig] = {}
+
+    for character in characters:
+        st.markdown(f"### {character}")
+
+        voice_id = st.text_input(
+            f"Voice ID for {character}",
+            key=f"{character}_voice"
+        )
+
+        voice_type = st.selectbox(
+            f"Voice Type for {character}",
+            list(VOICE_TYPE_PROFILES),
+            key=f"{character}_type"
+        )
+
+        if voice_id:
+            char_cfgs[character] = CharConfig(
+                provider="eleven",
+                eleven_voice_id=voice_id,
+                eleven_profile=VOICE_TYPE_PROFILES[voice_type],
+            )
+
+    if st.button("🎬 Generate Episode"):
+        with telemetry.render("app2", st.session_state.get("username", "")) as rec:
+            if len(char_cfgs) != len(characters):
+                st.error("Please assign Voice ID for all characters.")
+                st.stop()
+
+            parsed_items = parse_script_lines(script_text)
+
+            with st.spinner("Checking voices…"), rec.stage("preflight"):
+                issues = preflight(parsed_items, characters, char_cfgs, MIX)
+            for issue in issues:
+                (st.error if issue.blocking else st.warning)(issue.message)
+            if any(issue.blocking for issue in issues):
+                st.stop()
+
+            planned_lines, jobs = plan_render(parsed_items, char_cfgs)
+            rec.set(**plan_summary(parsed_items, char_cfgs, jobs))
+
+            # Synthesis, fades, placement and the WAV writer run as one staged pipeline
+            progress = st.progress(0)
+            queue_note = st.empty()
+            with render_episode(
+                planned_lines, jobs, char_cfgs, characters, MIX, stems=False,
+                on_progress=lambda done, total: progress.progress(done / total),
+                user=st.session_state.get("username", ""),
+                on_queue=lambda q: queue_note.caption(queue_text(q)),
+            ) as episode:
+                queue_note.empty()
+                for err in episode.errors:
+                    st.error(err)
+
+                edl = episode.edl
+                rec.set(audio_sec=episode.duration_ms / 1000)
+                with rec.stage("export"):
+                    wav_bytes = episode.mix_wav()
+
+            st.success("✅ Episode Generated Successfully!")
+
+            st.download_button(
+                label="⬇ Download Episode",
+                data=wav_bytes,
+                file_name="vobble_episode.wav",
+                mime="audio/wav"
+            )
+            st.download_button(
+                label="⬇ Download Edit Decision List (JSON)",
+                data=edl.to_json(),
+                file_name="vobble_episode_edl.json",
+                mime="application/json",
+                help="A record of this render: lines, timings and the cached clips each used. Remixing works from this session only."
+            )
@@ -1,14 +1,22 @@
+from dataclasses import replace
+from typing import Dict
+
 import streamlit as st
-import requests
-import re
-import io
-import zipfile
-import base64
-from dataclasses import dataclass
-from typing import Dict, List, Tuple, Optional
 
-from pydub import AudioSegment
-from pydub.silence import split_on_silence
+from listen_engine import telemetry
+from listen_engine.config import EPISODE_SAMPLE_RATES, VOICE_TYPE_PROFILES, VOICE_TYPES, MixSettings
+from listen_engine.estimate import RenderEstimate, estimate_render
+from listen_engine.fair_share import get_scheduler
+from listen_engine.mix import build_episode_zip, export_wav_bytes, finish_clip, render_edl
+from listen_engine.pipeline import render_episode
+from listen_engine.plan import CharConfig, audition_line, config_complete, plan_render, plan_summary
+from listen_engine.preflight import preflight
+from listen_engine.providers import configure
+from listen_engine.schedule import LONGEST_FIRST, SCHEDULES, SCRIPT_ORDER
+from listen_engine.session import StudioSession, upload_id
+from listen_engine.speculative import speculate_character, stop_speculation
+from listen_engine.takes import load_takes, parse_take_sequence, take_index
+from listen_engine.ui import admin_nav, queue_text, require_login, take_browser
 
 # =============================
 # LOGIN SYSTEM
@@ -25,294 +33,381 @@ USERS = {
     "Yatharth": "Vobble123",
 }
 
-if "logged_in" not in st.session_state:
-    st.session_state.logged_in = False
+ADMINS = {"Tejas", "Suryansh"}
 
-if not st.session_state.logged_in:
-    st.title("🎙 Vobble Listen engine Audio Team Login")
+require_login(USERS, "🎙 Vobble Listen engine Audio Team Login")
 
-    username = st.text_input("Name")
-    password = st.text_input("Password", type="password")
+# =============================
+# CONFIG
+# =============================
 
-    if st.button("Login"):
-        if username in USERS and USERS[username] == password:
-            st.session_state.logged_in = True
-            st.rerun()
-        else:
-            st.error("Invalid credentials")
+# ElevenLabs + Hume (add to secrets: HUME_API_KEY="..."). Either may be a list
+# of keys, e.g. API_KEY = ["sk_a", "sk_b"]; requests are spread across them.
+configure(eleven_api_key=st.secrets["API_KEY"], hume_api_key=st.secrets.get("HUME_API_KEY", ""))
+
+MIX = MixSettings(
+    crossfade_ms=0,
+    gap_same_speaker_ms=100,
+    gap_speaker_change_ms=100,
+    clip_fade_in_ms=20,
+    clip_fade_out_ms=40,
+    clip_tail_pad_ms=60,
+)
+
+SCHEDULE_LABELS = {
+    LONGEST_FIRST: "Longest lines first (full render finishes soonest)",
+    SCRIPT_ORDER: "Script order (opening lines first, for previews)",
+}
 
-    st.stop()
+def render_mix() -> MixSettings:
+    """MIX with the episode format picked for this render."""
+    return replace(
+        MIX,
+        sample_rate=st.session_state.get("episode_rate", MIX.sample_rate),
+        channels=2 if st.session_state.get("episode_channels") == "stereo" else 1,
+        hedge_requests=st.session_state.get("hedge_requests", False),
+        chunk_max_chars=st.session_state.get("chunk_max_chars", MIX.chunk_max_chars),
+        schedule=st.session_state.get("render_schedule", MIX.schedule),
+    )
+
+admin_nav(ADMINS)
 
 # =============================
-# CONFIG
+# CHARACTER PANELS
 # =============================
 
-# ElevenLabs
-API_KEY = st.secrets["API_KEY"]
-MODEL_ID = "eleven_v3"
+# Each panel is a fragment: typing in one character's boxes reruns only that
+# panel, not the login check, script parse or the other characters.
 
-# Hume (add to secrets: HUME_API_KEY="...")
-HUME_API_KEY = st.secrets.get("HUME_API_KEY", "")
+def fallback_voice(character: str, voice_type: str = VOICE_TYPES[0]):
+    """Optional secondary voice, used when the primary provider is failing."""
+    with st.expander("🛟 Fallback voice (used if the provider is down)"):
+        source = st.selectbox(
+            "Fallback source",
+            ["None", "ElevenLabs voice", "Hume voice"],
+            key=f"{character}_fb_source"
+        )
+        if source == "ElevenLabs voice":
+            fb_id = st.text_input("Fallback ElevenLabs Voice ID", key=f"{character}_fb_voice")
+            return CharConfig(
+                provider="eleven",
+                eleven_voice_id=fb_id.strip(),
+                eleven_profile=VOICE_TYPE_PROFILES[voice_type],
+            )
+        if source == "Hume voice":
+            mode = st.selectbox("Fallback Hume voice reference", ["id", "name"], key=f"{character}_fb_h_mode")
+            ref = st.text_input(f"Fallback Hume voice {mode}", key=f"{character}_fb_h_ref")
+            return CharConfig(
+                provider="hume",
+                hume_voice_mode=mode,
+                hume_voice_id=ref.strip() if mode == "id" else "",
+                hume_voice_name=ref.strip() if mode == "name" else "",
+            )
+    return None
 
-RETRIES = 3
-TIMEOUT_SEC = 30
+@st.fragment
+def character_panel(character: str):
+    studio: StudioSession = st.session_state.studio
 
-CROSSFADE_MS = 0
-GAP_SAME_SPEAKER_MS = 100
-GAP_SPEAKER_CHANGE_MS = 100
+    st.markdown(f"### {character}")
 
-CLIP_FADE_IN_MS = 20
-CLIP_FADE_OUT_MS = 40
-CLIP_TAIL_PAD_MS = 60
+    provider_ui = st.selectbox(
+        f"Voice source for {character}",
+        ["ElevenLabs (AI)", "Hume (AI)", "Recorded File (takes)"],
+        key=f"{character}_provider"
+    )
 
-# =============================
-# VOICE TYPE PROFILES
-# =============================
+    if provider_ui.startswith("ElevenLabs"):
+        voice_id = st.text_input(f"ElevenLabs Voice ID for {character}", key=f"{character}_voice")
+        voice_type = st.selectbox(
+            f"Voice Type for {character}",
+            VOICE_TYPES,
+            key=f"{character}_type"
+        )
+        vary = st.checkbox(
+            "Force variation (fresh read for every repeated line)",
+            value=False,
+            key=f"{character}_vary"
+        )
+        variants = st.number_input(
+            "Variants per line (best read auto-picked, others swappable after render)",
+            1, 5, 1,
+            key=f"{character}_variants"
+        )
+        cfg = CharConfig(
+            provider="eleven",
+            eleven_voice_id=voice_id.strip(),
+            eleven_profile=VOICE_TYPE_PROFILES[voice_type],
+            force_variation=vary,
+            variants=int(variants),
+            fallback=fallback_voice(character, voice_type),
+        )
 
-VOICE_TYPE_PROFILES = {
-    "adult_male": {"stability": 0.0, "similarity_boost": 0.88, "style": 1.0, "use_speaker_boost": True},
-    "adult_female": {"stability": 0.50, "similarity_boost": 0.90, "style": 0.80, "use_speaker_boost": True},
-    "male_kid": {"stability": 0.50, "similarity_boost": 0.80, "style": 0.90, "use_speaker_boost": True},
-    "female_kid": {"stability": 0.50, "similarity_boost": 0.78, "style": 0.95, "use_speaker_boost": False},
-}
+    elif provider_ui.startswith("Hume"):
+        st.caption("Hume: script text stays plain; performance direction goes into the 'description' field.")
+        mode = st.selectbox("Hume voice reference", ["id", "name"], key=f"{character}_h_mode")
 
-# =============================
-# UTILITIES
-# =============================
+        if mode == "id":
+            h_voice_id = st.text_input("Hume voice id", key=f"{character}_h_id")
+            h_voice_name = ""
+            h_provider = "HUME_AI"
+        else:
+            h_voice_id = ""
+            h_voice_name = st.text_input("Hume voice name", key=f"{character}_h_name")
+            h_provider = st.selectbox("Hume provider", ["HUME_AI", "CUSTOM_VOICE"], key=f"{character}_h_provider")
+
+        base_desc = st.text_area(
+            "Base acting description (personality/tone/pacing)",
+            value="Expressive, natural delivery. Clear articulation. Strong comedic timing if relevant.",
+            key=f"{character}_h_desc",
+            height=90
+        )
+        auto_hints = st.checkbox(
+            "Auto emotion hints from punctuation (!, ?)",
+            value=True,
+            key=f"{character}_h_hints"
+        )
+        vary = st.checkbox(
+            "Force variation (fresh read for every repeated line)",
+            value=False,
+            key=f"{character}_vary"
+        )
+        variants = st.number_input(
+            "Variants per line (best read auto-picked, others swappable after render)",
+            1, 5, 1,
+            key=f"{character}_variants"
+        )
+
+        cfg = CharConfig(
+            provider="hume",
+            hume_voice_mode=mode,
+            hume_voice_id=h_voice_id.strip(),
+            hume_voice_name=h_voice_name.strip(),
+            hume_provider=h_provider,
+            hume_base_desc=base_desc.strip(),
+            hume_auto_hints=auto_hints,
+            force_variation=vary,
+            variants=int(variants),
+            fallback=fallback_voice(character),
+        )
 
-def normalize_name(name: str) -> str:
-    return name.strip().lower()
-
-def safe_filename(name: str) -> str:
-    return re.sub(r"[^a-z0-9_\-]+", "_", name.lower()).strip("_")
-
-def is_sfx_or_music_line(line: str) -> bool:
-    l = line.strip().lower()
-    return l.startswith("sfx:") or l.startswith("music:")
-
-def parse_script_blocks(script_text: str) -> List[Tuple[str, str]]:
-    """
-    Supports BOTH:
-    1) single-line: name: dialogue
-    2) block format:
-       name:
-       [tag...]
-       dialogue line 1
-       dialogue line 2
-       (blank or next name:)
-    Returns list of tuples: (speaker, dialogue_text)
-    """
-    lines = script_text.splitlines()
-    items: List[Tuple[str, str]] = []
-
-    current_speaker = None
-    current_dialogue_lines: List[str] = []
-
-    def flush():
-        nonlocal current_speaker, current_dialogue_lines
-        if current_speaker and current_dialogue_lines:
-            dialogue = " ".join([x.strip() for x in current_dialogue_lines if x.strip()])
-            if dialogue.strip():
-                items.append((current_speaker, dialogue.strip()))
-        current_dialogue_lines = []
-
-    speaker_line_re = re.compile(r"^\s*([^:]{1,60})\s*:\s*(.*)$")
-
-    for raw in lines:
-        line = raw.rstrip("\n")
-        stripped = line.strip()
-
-        if not stripped:
-            flush()
-            continue
-
-        if is_sfx_or_music_line(stripped):
-            continue
-
-        # ignore pure bracket performance direction lines like [warm, loud]
-        if stripped.startswith("[") and stripped.endswith("]"):
-            continue
-
-        m = speaker_line_re.match(line)
-        if m:
-            speaker = normalize_name(m.group(1))
-            after = (m.group(2) or "").strip()
-
-            flush()
-            current_speaker = speaker
-
-            if after:
-                current_dialogue_lines.append(after)
-            continue
-
-        if current_speaker:
-            current_dialogue_lines.append(stripped)
-
-    flush()
-    return items
-
-def detect_characters_from_blocks(items: List[Tuple[str, str]]) -> List[str]:
-    return sorted(list({sp for sp, _ in items}))
-
-# Keep your existing cadence stabilizer (unchanged)
-ALLOWED_PAUSE_TAGS = {"[pause]", "[short pause]", "[long pause]"}
-
-def strip_unknown_brackets(s: str) -> str:
-    def repl(m):
-        tag = m.group(0).strip().lower()
-        return m.group(0) if tag in ALLOWED_PAUSE_TAGS else ""
-    return re.sub(r"\[[^\]]+\]", repl, s).strip()
-
-def ensure_line_tail(text: str) -> str:
-    t = strip_unknown_brackets(text.strip())
-    if not t:
-        return t
-    if not re.search(r"(\[short pause\]|\[pause\]|\[long pause\])\s*$", t):
-        if not t.endswith((".", "!", "?", ",")):
-            t += "."
-        t += " [short pause]"
-    return t
+    else:  # Recorded File
+        up = st.file_uploader(f"Upload recorded audio for {character} (wav/mp3)", type=["wav", "mp3"], key=f"{character}_file")
+        seq = st.text_input(
+            "Take sequence (e.g., 1,3,2,1,2) — one number per line, loops if shorter",
+            key=f"{character}_seq"
+        )
+
+        min_sil = st.slider("Min silence to split takes (ms)", 150, 900, 300, key=f"{character}_mins")
+        sil_thresh = st.slider("Silence threshold (dBFS)", -60, -15, -38, key=f"{character}_sth")
+        keep_sil = st.slider("Keep silence around takes (ms)", 0, 300, 100, key=f"{character}_keeps")
+
+        takes = None
+        if up is not None:
+            mix = render_mix()
+            takes = studio.takes_for(
+                character,
+                (upload_id(up), min_sil, sil_thresh, keep_sil, mix.sample_rate, mix.channels),
+                lambda: load_takes(
+                    up.getvalue(), up.name, mix.sample_rate, mix.channels,
+                    min_silence_len=min_sil, silence_thresh_db=sil_thresh, keep_silence=keep_sil,
+                ),
+            )
+            st.info(f"Detected takes: {len(takes)}")
+            take_browser(character, takes)
+        else:
+            studio.drop_takes(character)
+
+        cfg = CharConfig(
+            provider="file",
+            file_takes=takes,
+            take_sequence=parse_take_sequence(seq),
+        )
+
+    studio.set_config(character, cfg)
+
+    if st.session_state.get("speculative_mode"):
+        run = speculate_character(
+            st.session_state.speculative_runs, character, cfg, studio.parsed_items, render_mix(),
+            user=st.session_state.get("username", ""),
+        )
+        if run is not None and run.futures:
+            progress = run.progress()
+            caption = f"⚡ Pre-rendered {progress.rendered}/{progress.total} lines"
+            if progress.failed:
+                caption += f" · {progress.failed} failed (Generate will retry them)"
+            if progress.cancelled:
+                caption += f" · {progress.cancelled} cancelled"
+            st.caption(caption)
 
 # =============================
-# AUDIO GENERATION (ElevenLabs)
+# LINE AUDITION
 # =============================
 
-def generate_audio_eleven(text: str, voice_id: str, voice_settings: dict) -> Optional[AudioSegment]:
-    t = ensure_line_tail(text)
-    if not t:
-        return None
-
-    url = f"https://api.elevenlabs.io/v1/text-to-speech/{voice_id}?output_format=mp3_44100_128"
-    headers = {
-        "xi-api-key": API_KEY,
-        "Content-Type": "application/json",
-        "Accept": "audio/mpeg"
-    }
-    data = {"text": t, "model_id": MODEL_ID, "voice_settings": voice_settings}
-
-    response = None
-    for _ in range(RETRIES):
-        try:
-            response = requests.post(url, json=data, headers=headers, timeout=TIMEOUT_SEC)
-            if response.status_code == 200 and response.content:
-                break
-        except requests.exceptions.RequestException:
-            continue
-    else:
-        return None
-
-    if response.status_code != 200:
-        st.error(f"ElevenLabs API Error {response.status_code}: {response.text}")
-        return None
-
-    audio = AudioSegment.from_file(io.BytesIO(response.content), format="mp3")
-    audio = audio.fade_in(CLIP_FADE_IN_MS).fade_out(CLIP_FADE_OUT_MS)
-    audio += AudioSegment.silent(duration=CLIP_TAIL_PAD_MS)
-    return audio
+# One line at a time, with the character's current settings. The clip goes
+# into the shared clip store, so Generate reuses it instead of asking again.
+
+@st.fragment
+def audition_panel():
+    studio: StudioSession = st.session_state.studio
+    items = studio.parsed_items
+
+    st.subheader("🎧 Audition a line")
+    index = st.selectbox(
+        "Line",
+        range(len(items)),
+        format_func=lambda i: f"{i + 1}. {items[i][0]}: {items[i][1][:80]}",
+        key="audition_line"
+    )
+    speaker, text = items[index]
+    cfg = studio.char_cfgs.get(speaker)
+    if cfg is None:
+        return
+
+    if cfg.provider == "file":
+        line_no = sum(1 for sp, _ in items[:index] if sp == speaker)
+        idx = take_index(cfg.file_takes, cfg.take_sequence or [], line_no)
+        if idx is None:
+            st.caption("Upload takes and set a take sequence to hear this line.")
+        else:
+            st.caption(f"Take {idx + 1} of the upload")
+            st.audio(export_wav_bytes(cfg.file_takes.take(idx)), format="audio/wav")
+        return
+
+    if not config_complete(cfg):
+        st.caption(f"Set a voice for {speaker} first.")
+        return
+    if st.button("▶ Audition", key="audition_go"):
+        mix = render_mix()
+        with telemetry.render("studio", st.session_state.get("username", ""), kind="audition"):
+            with st.spinner(f"Rendering line {index + 1}…"):
+                audio, errors, variants = audition_line(
+                    items, index, studio.char_cfgs, mix, user=st.session_state.get("username", ""),
+                )
+        for err in errors:
+            st.error(err)
+        if audio is not None:
+            st.audio(export_wav_bytes(finish_clip(audio, mix)), format="audio/wav", autoplay=True)
+            if variants is not None:
+                st.caption(f"Read {variants.pick + 1} of {len(variants.clips)} auto-picked; all reads are kept for Generate.")
 
 # =============================
-# AUDIO GENERATION (Hume)
+# REMIX
 # =============================
 
-def infer_quick_emotion_hint(text: str) -> str:
-    t = text.strip()
-    if t.count("!") >= 2:
-        return "loud, excited"
-    if "!" in t:
-        return "excited"
-    if t.endswith("?"):
-        return "curious, questioning"
-    return ""
-
-def build_hume_description(base_desc: str, line_text: str, auto_hints: bool) -> str:
-    base = (base_desc or "").strip()
-    if not auto_hints:
-        return base if base else "Expressive delivery, clear articulation."
-    hint = infer_quick_emotion_hint(line_text)
-    if hint:
-        if base:
-            return f"{base} Emotion hint: {hint}."
-        return f"Expressive delivery. Emotion hint: {hint}."
-    return base if base else "Expressive delivery, clear articulation."
-
-def generate_audio_hume(text: str, voice_ref: dict, description: str) -> Optional[AudioSegment]:
-    """
-    Hume TTS:
-      POST https://api.hume.ai/v0/tts
-    """
-    if not HUME_API_KEY:
-        st.error("Missing HUME_API_KEY in Streamlit secrets.")
-        return None
-
-    url = "https://api.hume.ai/v0/tts"
-    headers = {"X-Hume-Api-Key": HUME_API_KEY, "Content-Type": "application/json"}
-
-    payload = {
-        "utterances": [
-            {"text": text, "description": description, "voice": voice_ref}
-        ],
-        "format": {"type": "mp3"},
-        "num_generations": 1,
-        "split_utterances": False,
-        "strip_headers": True
-    }
-
-    response = None
-    for _ in range(RETRIES):
-        try:
-            response = requests.post(url, json=payload, headers=headers, timeout=TIMEOUT_SEC)
-            if response.status_code == 200:
-                break
-        except requests.exceptions.RequestException:
-            continue
-    else:
-        return None
-
-    if response.status_code != 200:
-        st.error(f"Hume API Error {response.status_code}: {response.text}")
-        return None
-
-    data = response.json()
-    b64_audio = data["generations"][0]["audio"]
-    audio_bytes = base64.b64decode(b64_audio)
-
-    audio = AudioSegment.from_file(io.BytesIO(audio_bytes), format="mp3")
-    audio = audio.fade_in(CLIP_FADE_IN_MS).fade_out(CLIP_FADE_OUT_MS)
-    audio += AudioSegment.silent(duration=CLIP_TAIL_PAD_MS)
-    return audio
+# Re-assembles the last render from its edit decision list: timing, fades,
+# take choices and per-line gaps change, nothing is sent to a provider.
+
+@st.fragment
+def remix_panel():
+    studio: StudioSession = st.session_state.studio
+    edl = studio.edl
+
+    st.subheader("🎛 Remix last render (no re-synthesis)")
+    base = edl.mix
+    c1, c2, c3 = st.columns(3)
+    gap_same = c1.number_input("Gap, same speaker (s)", 0.0, 5.0, base.gap_same_speaker_ms / 1000, 0.05, key="remix_gap_same")
+    gap_change = c2.number_input("Gap, speaker change (s)", 0.0, 5.0, base.gap_speaker_change_ms / 1000, 0.05, key="remix_gap_change")
+    crossfade = c3.number_input("Crossfade (s)", 0.0, 2.0, base.crossfade_ms / 1000, 0.01, key="remix_crossfade")
+    c1, c2, c3 = st.columns(3)
+    fade_in = c1.number_input("Clip fade in (s)", 0.0, 1.0, base.clip_fade_in_ms / 1000, 0.01, key="remix_fade_in")
+    fade_out = c2.number_input("Clip fade out (s)", 0.0, 1.0, base.clip_fade_out_ms / 1000, 0.01, key="remix_fade_out")
+    tail_pad = c3.number_input("Clip tail pad (s)", 0.0, 2.0, base.clip_tail_pad_ms / 1000, 0.01, key="remix_tail_pad")
+
+    retakes = {}
+    for ch in edl.takes:
+        seq = st.text_input(f"Take sequence for {ch} (blank keeps the current takes)", key=f"remix_{ch}_seq")
+        if parse_take_sequence(seq):
+            retakes[ch] = parse_take_sequence(seq)
+
+    picks = {}
+    if edl.variants:
+        with st.expander(f"Variant reads ({len(edl.variants)} lines)"):
+            first_line = {}
+            for ln in edl.lines:
+                first_line.setdefault(ln.clip, ln)
+            for i, (job_key, vs) in enumerate(edl.variants.items()):
+                ln = first_line[job_key]
+                options = list(range(len(vs.clips)))
+                picks[job_key] = st.selectbox(
+                    f"{ln.speaker}: {ln.text[:60]}",
+                    options,
+                    index=vs.pick,
+                    format_func=lambda v, vs=vs: f"Read {v + 1} · {len(vs.clips[v]) / 1000:.1f}s · penalty {vs.scores[v]:.2f}",
+                    key=f"remix_variant_{i}",
+                )
+
+    with st.expander("Per-line gap overrides"):
+        rows = [
+            {"speaker": ln.speaker, "line": ln.text[:60], "gap before (s)": None if ln.gap_before_ms is None else ln.gap_before_ms / 1000}
+            for ln in edl.lines
+        ]
+        edited = st.data_editor(rows, disabled=["speaker", "line"], hide_index=True, key="remix_overrides")
+
+    if st.button("🔁 Remix episode"):
+        for ch, seq in retakes.items():
+            edl.retake(ch, seq)
+        for job_key, v in picks.items():
+            edl.pick_variant(job_key, v)
+        for ln, row in zip(edl.lines, edited):
+            gap = row.get("gap before (s)")
+            ln.gap_before_ms = None if gap is None or gap != gap else round(gap * 1000)
+        edl.mix = replace(
+            base,
+            gap_same_speaker_ms=round(gap_same * 1000),
+            gap_speaker_change_ms=round(gap_change * 1000),
+            crossfade_ms=round(crossfade * 1000),
+            clip_fade_in_ms=round(fade_in * 1000),
+            clip_fade_out_ms=round(fade_out * 1000),
+            clip_tail_pad_ms=round(tail_pad * 1000),
+        )
+        with telemetry.render("studio", st.session_state.get("username", ""), kind="remix") as rec:
+            rec.set(lines=len(edl.lines), characters=len(edl.characters))
+            with rec.stage("mix"):
+                final_audio, character_tracks = render_edl(edl)
+            with rec.stage("export"):
+                zip_buffer = build_episode_zip(final_audio, character_tracks, edl)
+            rec.set(audio_sec=len(final_audio) / 1000)
+        st.success(f"✅ Remixed {len(edl.lines)} lines ({len(final_audio) / 1000:.1f}s).")
+        st.download_button(
+            label="⬇ download remix + stems (zip)",
+            data=zip_buffer,
+            file_name="vobble_episode_remix.zip",
+            mime="application/zip"
+        )
 
 # =============================
-# RECORDED FILE TAKES
+# ESTIMATE
 # =============================
 
-def split_into_takes(audio: AudioSegment, min_silence_len=300, silence_thresh_db=-38, keep_silence=100) -> List[AudioSegment]:
-    chunks = split_on_silence(
-        audio,
-        min_silence_len=min_silence_len,
-        silence_thresh=silence_thresh_db,
-        keep_silence=keep_silence
+def _mb(n: int) -> str:
+    return f"{n / (1024 * 1024):.1f} MB"
+
+def _duration(sec: float) -> str:
+    return f"{sec:.0f} s" if sec < 90 else f"{sec / 60:.1f} min"
+
+def estimate_panel(est: RenderEstimate, deadline_sec: float, budget: float) -> None:
+    c1, c2, c3, c4 = st.columns(4)
+    c1.metric("Provider requests", est.requests, f"{est.cached} cached", delta_color="off")
+    c2.metric("Synthesis time", _duration(est.wall_sec), f"{est.workers} parallel", delta_color="off")
+    c3.metric("Cost", f"${est.cost:.2f}")
+    c4.metric("Episode length", _duration(est.episode_sec))
+    st.dataframe(
+        [
+            {"provider": p, "requests": pe.requests, "cached": pe.cached, "billed chars": pe.billed_chars, "cost $": round(est.costs[p], 2)}
+            for p, pe in est.providers.items()
+        ],
+        hide_index=True,
     )
-    takes = []
-    for c in chunks:
-        if len(c) < 60:
-            continue
-        takes.append(c.fade_in(5).fade_out(10))
-    return takes
-
-def parse_take_sequence(seq: str) -> List[int]:
-    seq = seq.strip()
-    if not seq:
-        return []
-    out = []
-    for part in seq.split(","):
-        part = part.strip()
-        if not part:
-            continue
-        try:
-            out.append(int(part))
-        except ValueError:
-            pass
-    return out
+    st.caption(f"Output: mix {_mb(est.mix_bytes)} + stems {_mb(est.stems_bytes)} of WAV (the zip is smaller; stems are mostly silence).")
+    if deadline_sec:
+        (st.success if est.wall_sec <= deadline_sec else st.warning)(
+            f"{'Fits' if est.wall_sec <= deadline_sec else 'Misses'} the {deadline_sec / 60:.0f} min deadline."
+        )
+    if budget:
+        (st.success if est.cost <= budget else st.warning)(
+            f"{'Within' if est.cost <= budget else 'Over'} the ${budget:.2f} budget."
+        )
 
 # =============================
 # UI
@@ -323,264 +418,128 @@ st.title("🎙 Vobble Audio Studio")
 uploaded_file = st.file_uploader("Upload Script (.txt)", type=["txt"])
 
 if uploaded_file:
-    script_text = uploaded_file.read().decode("utf-8")
+    studio: StudioSession = st.session_state.setdefault("studio", StudioSession())
+    studio.load_script(upload_id(uploaded_file), uploaded_file.getvalue)
 
-    parsed_items = parse_script_blocks(script_text)
-    characters = detect_characters_from_blocks(parsed_items)
+    parsed_items = studio.parsed_items
+    characters = studio.characters
 
     if not parsed_items or not characters:
         st.warning("No dialogue detected. Use either 'name: dialogue' OR block format 'name:' then dialogue lines.")
         st.stop()
 
+    st.subheader("🎚 Episode format")
+    c1, c2, c3 = st.columns(3)
+    c1.selectbox("Sample rate (Hz)", EPISODE_SAMPLE_RATES, key="episode_rate")
+    c2.selectbox("Channels", ["mono", "stereo"], key="episode_channels")
+    c3.number_input(
+        "Split lines longer than (chars, 0 = never)",
+        min_value=0, max_value=3000, value=MIX.chunk_max_chars, step=50,
+        key="chunk_max_chars"
+    )
+    st.radio(
+        "Render order",
+        SCHEDULES,
+        format_func=SCHEDULE_LABELS.get,
+        horizontal=True,
+        key="render_schedule"
+    )
+    st.toggle(
+        "🐇 Hedge slow requests (send a duplicate when a line is slower than the provider's p95)",
+        value=False,
+        key="hedge_requests"
+    )
+    mix = render_mix()
+
     st.subheader("🎭 Character Setup (Choose provider)")
 
-    @dataclass
-    class CharConfig:
-        provider: str  # "eleven" | "hume" | "file"
-        # eleven
-        eleven_voice_id: str = ""
-        eleven_profile: dict = None
-        # hume
-        hume_voice_mode: str = "id"     # "id" | "name"
-        hume_voice_id: str = ""
-        hume_voice_name: str = ""
-        hume_provider: str = "HUME_AI"
-        hume_base_desc: str = ""
-        hume_auto_hints: bool = True
-        # file
-        file_takes: List[AudioSegment] = None
-        take_sequence: List[int] = None
-
-    char_cfgs: Dict[str, CharConfig] = {}
+    speculative = st.toggle(
+        "⚡ Speculative pre-render (start rendering each character as soon as their voice is set)",
+        value=False,
+        key="speculative_mode"
+    )
+    speculative_runs = st.session_state.setdefault("speculative_runs", {})
+    stop_speculation(speculative_runs, keep=characters if speculative else None)
 
     for character in characters:
-        st.markdown(f"### {character}")
+        character_panel(character)
 
-        provider_ui = st.selectbox(
-            f"Voice source for {character}",
-            ["ElevenLabs (AI)", "Hume (AI)", "Recorded File (takes)"],
-            key=f"{character}_provider"
-        )
+    audition_panel()
 
-        if provider_ui.startswith("ElevenLabs"):
-            voice_id = st.text_input(f"ElevenLabs Voice ID for {character}", key=f"{character}_voice")
-            voice_type = st.selectbox(
-                f"Voice Type for {character}",
-                ["adult_male", "adult_female", "male_kid", "female_kid"],
-                key=f"{character}_type"
-            )
-            char_cfgs[character] = CharConfig(
-                provider="eleven",
-                eleven_voice_id=voice_id.strip(),
-                eleven_profile=VOICE_TYPE_PROFILES[voice_type],
-            )
+    char_cfgs: Dict[str, CharConfig] = studio.char_cfgs
 
-        elif provider_ui.startswith("Hume"):
-            st.caption("Hume: script text stays plain; performance direction goes into the 'description' field.")
-            mode = st.selectbox("Hume voice reference", ["id", "name"], key=f"{character}_h_mode")
-
-            if mode == "id":
-                h_voice_id = st.text_input("Hume voice id", key=f"{character}_h_id")
-                h_voice_name = ""
-                h_provider = "HUME_AI"
-            else:
-                h_voice_id = ""
-                h_voice_name = st.text_input("Hume voice name", key=f"{character}_h_name")
-                h_provider = st.selectbox("Hume provider", ["HUME_AI", "CUSTOM_VOICE"], key=f"{character}_h_provider")
-
-            base_desc = st.text_area(
-                "Base acting description (personality/tone/pacing)",
-                value="Expressive, natural delivery. Clear articulation. Strong comedic timing if relevant.",
-                key=f"{character}_h_desc",
-                height=90
-            )
-            auto_hints = st.checkbox(
-                "Auto emotion hints from punctuation (!, ?)",
-                value=True,
-                key=f"{character}_h_hints"
-            )
-
-            char_cfgs[character] = CharConfig(
-                provider="hume",
-                hume_voice_mode=mode,
-                hume_voice_id=h_voice_id.strip(),
-                hume_voice_name=h_voice_name.strip(),
-                hume_provider=h_provider,
-                hume_base_desc=base_desc.strip(),
-                hume_auto_hints=auto_hints,
-            )
+    with st.expander("📋 Estimate before rendering"):
+        c1, c2 = st.columns(2)
+        deadline_min = c1.number_input("Deadline (minutes, 0 = none)", 0.0, 600.0, 0.0, 1.0, key="estimate_deadline")
+        budget = c2.number_input("Budget (USD, 0 = none)", 0.0, 10000.0, 0.0, 1.0, key="estimate_budget")
+        if st.button("Estimate"):
+            estimate_panel(estimate_render(parsed_items, char_cfgs, characters, mix), deadline_min * 60, budget)
 
-        else:  # Recorded File
-            up = st.file_uploader(f"Upload recorded audio for {character} (wav/mp3)", type=["wav", "mp3"], key=f"{character}_file")
-            seq = st.text_input(
-                "Take sequence (e.g., 1,3,2,1,2) — one number per line, loops if shorter",
-                key=f"{character}_seq"
-            )
-
-            min_sil = st.slider("Min silence to split takes (ms)", 150, 900, 300, key=f"{character}_mins")
-            sil_thresh = st.slider("Silence threshold (dBFS)", -60, -15, -38, key=f"{character}_sth")
-            keep_sil = st.slider("Keep silence around takes (ms)", 0, 300, 100, key=f"{character}_keeps")
-
-            takes = None
-            if up is not None:
-                b = up.read()
-                fmt = "wav" if up.name.lower().endswith(".wav") else "mp3"
-                audio = AudioSegment.from_file(io.BytesIO(b), format=fmt)
-                takes = split_into_takes(audio, min_silence_len=min_sil, silence_thresh_db=sil_thresh, keep_silence=keep_sil)
-                st.info(f"Detected takes: {len(takes)}")
-
-            char_cfgs[character] = CharConfig(
-                provider="file",
-                file_takes=takes,
-                take_sequence=parse_take_sequence(seq),
-            )
+    busy = get_scheduler().snapshot()
+    if busy:
+        st.caption(
+            f"⏳ {len(busy)} user{'s' if len(busy) != 1 else ''} rendering right now; "
+            "the workers are shared fairly and small renders go first."
+        )
 
     if st.button("🎬 Generate Episode (Full + Stems ZIP)"):
-
-        # Validate
-        for ch in characters:
-            cfg = char_cfgs.get(ch)
-            if cfg is None:
-                st.error(f"Missing config for {ch}")
+        with telemetry.render("studio", st.session_state.get("username", "")) as rec:
+
+            # Pre-flight: every character checked up front (voice catalogs are cached)
+            with st.spinner("Checking voices…"), rec.stage("preflight"):
+                issues = preflight(parsed_items, characters, char_cfgs, mix)
+            for issue in issues:
+                (st.error if issue.blocking else st.warning)(issue.message)
+            if any(issue.blocking for issue in issues):
                 st.stop()
 
-            if cfg.provider == "eleven":
-                if not cfg.eleven_voice_id:
-                    st.error(f"Please enter ElevenLabs Voice ID for {ch}")
+            # Plan: identical lines with identical voice config are rendered once
+            planned_lines, jobs = plan_render(parsed_items, char_cfgs)
+            rec.set(**plan_summary(parsed_items, char_cfgs, jobs))
+            rec.set(est_synth_sec=estimate_render(parsed_items, char_cfgs, characters, mix).wall_sec)
+            reused = sum(job.occurrences - 1 for job in jobs.values())
+            if reused:
+                st.caption(f"Rendering {len(jobs)} unique lines; {reused} repeated lines reuse an existing take.")
+
+            # Lines already pre-rendered (or still in flight) come back from the clip store
+            # Synthesis, fades, placement and the WAV writers run as one staged pipeline
+            progress = st.progress(0)
+            queue_note = st.empty()
+            with render_episode(
+                planned_lines, jobs, char_cfgs, characters, mix,
+                on_progress=lambda done, total: progress.progress(done / total),
+                user=st.session_state.get("username", ""),
+                on_queue=lambda q: queue_note.caption(queue_text(q)),
+            ) as episode:
+                queue_note.empty()
+                for err in episode.errors:
+                    st.error(err)
+                if episode.fallbacks:
+                    fallback_keys = set(episode.fallbacks)
+                    fb_lines = [pl for pl in planned_lines if pl.job_key in fallback_keys]
+                    st.warning(f"🛟 {len(fb_lines)} lines were rendered with a fallback voice (primary provider failing).")
+                    with st.expander("Lines that used the fallback voice"):
+                        for pl in fb_lines:
+                            st.markdown(f"- **{pl.speaker}**: {pl.text[:80]}")
+
+                rec.set(audio_sec=episode.duration_ms / 1000)
+                if episode.duration_ms == 0:
+                    st.error("No audio was generated. Check: Voice IDs valid + script has dialogue under each speaker.")
                     st.stop()
 
-            if cfg.provider == "hume":
-                if not HUME_API_KEY:
-                    st.error("HUME_API_KEY missing in secrets.")
-                    st.stop()
-                if cfg.hume_voice_mode == "id" and not cfg.hume_voice_id:
-                    st.error(f"Please enter Hume voice id for {ch}")
-                    st.stop()
-                if cfg.hume_voice_mode == "name" and not cfg.hume_voice_name:
-                    st.error(f"Please enter Hume voice name for {ch}")
-                    st.stop()
-
-            if cfg.provider == "file":
-                if not cfg.file_takes:
-                    st.error(f"Upload recorded audio file (with takes) for {ch}")
-                    st.stop()
-                if not cfg.take_sequence:
-                    st.error(f"Provide take sequence for {ch} (e.g., 1,3,2,1,2)")
-                    st.stop()
+                studio.edl = episode.edl
+                with rec.stage("export"):
+                    zip_buffer = episode.zip()
+
+            st.success("✅ Episode + stems generated!")
+            spawns = rec.counters.get("ffmpeg_spawns", 0)
+            st.caption(f"{spawns} ffmpeg process{'es' if spawns != 1 else ''} started for this episode.")
+            st.download_button(
+                label="⬇ download episode + stems (zip)",
+                data=zip_buffer,
+                file_name="vobble_episode_and_stems.zip",
+                mime="application/zip"
+            )
 
-        # Build BOTH: full mix + stems
-        final_audio = AudioSegment.empty()
-        character_tracks = {ch: AudioSegment.silent(duration=0) for ch in characters}
-
-        timeline_position = 0
-        last_speaker = None
-
-        # recorded line counters per character
-        file_line_index = {ch: 0 for ch in characters}
-
-        progress = st.progress(0)
-        total_lines = len(parsed_items)
-        processed = 0
-
-        for speaker, dialogue in parsed_items:
-            processed += 1
-            progress.progress(processed / total_lines)
-
-            cfg = char_cfgs.get(speaker)
-            if cfg is None:
-                continue
-
-            audio = None
-
-            if cfg.provider == "eleven":
-                audio = generate_audio_eleven(dialogue, cfg.eleven_voice_id, cfg.eleven_profile)
-
-            elif cfg.provider == "hume":
-                # voice reference object
-                if cfg.hume_voice_mode == "id":
-                    voice_ref = {"id": cfg.hume_voice_id}
-                else:
-                    voice_ref = {"name": cfg.hume_voice_name, "provider": cfg.hume_provider}
-
-                desc = build_hume_description(cfg.hume_base_desc, dialogue, cfg.hume_auto_hints)
-                audio = generate_audio_hume(dialogue, voice_ref, desc)
-
-            else:  # recorded file
-                takes = cfg.file_takes or []
-                seq = cfg.take_sequence or []
-                idx = file_line_index[speaker]
-                file_line_index[speaker] += 1
-
-                take_num = seq[idx % len(seq)]  # loop
-                take_idx = max(0, take_num - 1)
-                if take_idx >= len(takes):
-                    take_idx = len(takes) - 1
-                audio = takes[take_idx]
-
-            if not audio:
-                continue
-
-            # GAP (consistent)
-            gap = 0
-            if last_speaker is not None:
-                gap = GAP_SAME_SPEAKER_MS if last_speaker == speaker else GAP_SPEAKER_CHANGE_MS
-
-            if gap > 0:
-                final_audio += AudioSegment.silent(duration=gap)
-                for ch in character_tracks:
-                    character_tracks[ch] += AudioSegment.silent(duration=gap)
-                timeline_position += gap
-
-            # FULL MIX
-            if len(final_audio) == 0:
-                final_audio = audio
-            else:
-                final_audio = final_audio.append(audio, crossfade=CROSSFADE_MS)
-
-            # STEMS
-            duration = len(audio)
-
-            for ch in character_tracks:
-                if len(character_tracks[ch]) < timeline_position:
-                    character_tracks[ch] += AudioSegment.silent(duration=timeline_position - len(character_tracks[ch]))
-
-            character_tracks[speaker] += audio
-            for ch in character_tracks:
-                if ch != speaker:
-                    character_tracks[ch] += AudioSegment.silent(duration=duration)
-
-            timeline_position += duration
-            last_speaker = speaker
-
-        if len(final_audio) == 0:
-            st.error("No audio was generated. Check: Voice IDs valid + script has dialogue under each speaker.")
-            st.stop()
-
-        # ZIP: full mix + stems
-        zip_buffer = io.BytesIO()
-        with zipfile.ZipFile(zip_buffer, "w", compression=zipfile.ZIP_DEFLATED) as zf:
-            full_wav = io.BytesIO()
-            final_audio.export(full_wav, format="wav", parameters=["-acodec", "pcm_s16le"])
-            full_wav.seek(0)
-            zf.writestr("vobble_episode_full.wav", full_wav.read())
-
-            for ch, track in character_tracks.items():
-                if len(track) < len(final_audio):
-                    track += AudioSegment.silent(duration=len(final_audio) - len(track))
-                elif len(track) > len(final_audio):
-                    track = track[:len(final_audio)]
-
-                stem_wav = io.BytesIO()
-                track.export(stem_wav, format="wav", parameters=["-acodec", "pcm_s16le"])
-                stem_wav.seek(0)
-                zf.writestr(f"stems/{safe_filename(ch)}_stem.wav", stem_wav.read())
-
-        zip_buffer.seek(0)
-
-        st.success("✅ Episode + stems generated!")
-        st.download_button(
-            label="⬇ download episode + stems (zip)",
-            data=zip_buffer,
-            file_name="vobble_episode_and_stems.zip",
-            mime="application/zip"
-        )
+    if studio.edl is not None:
+        remix_panel()
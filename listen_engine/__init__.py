@@ -0,0 +1,70 @@
+"""
+Shared engine behind the Vobble Streamlit apps: script parsing, TTS providers,
+the process-wide clip store, render planning and mixing.
+
+Importing the package is cheap. Submodules (and pydub/requests behind them)
+load on first attribute access, so `import listen_engine` costs nothing on a
+Streamlit rerun and command-line tools only pay for what they touch.
+"""
+import importlib
+
+_EXPORTS = {
+    # text
+    "parse_script_blocks": "text",
+    "parse_script_lines": "text",
+    "detect_characters_from_blocks": "text",
+    "ensure_line_tail": "text",
+    "normalize_line_text": "text",
+    # config
+    "MixSettings": "config",
+    "VOICE_TYPE_PROFILES": "config",
+    # providers
+    "SynthesisError": "providers",
+    "ProviderUnavailable": "providers",
+    "configure": "providers",
+    "generate_audio_eleven": "providers",
+    "generate_audio_hume": "providers",
+    # key pools
+    "get_key_pool": "key_pool",
+    # fair-share scheduler
+    "get_scheduler": "fair_share",
+    # clip store
+    "clip_key": "clip_store",
+    "get_clip_store": "clip_store",
+    # planning
+    "CharConfig": "plan",
+    "plan_render": "plan",
+    "synthesize_jobs": "plan",
+    "synthesize_with_fallback": "plan",
+    "audition_line": "plan",
+    # mixing
+    "assemble_episode": "mix",
+    "export_wav_bytes": "mix",
+    "build_episode_zip": "mix",
+    "render_edl": "mix",
+    # staged render
+    "render_episode": "pipeline",
+    # estimates
+    "estimate_render": "estimate",
+    # edit decision lists
+    "EditDecisionList": "edl",
+    "build_edl": "edl",
+    # variants
+    "VariantSet": "variants",
+    "pick_variant": "variants",
+}
+
+__all__ = sorted(_EXPORTS)
+
+
+def __getattr__(name):
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f".{module}", __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(list(globals()) + __all__)
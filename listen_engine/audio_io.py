@@ -0,0 +1,194 @@
+from __future__ import annotations
+
+import io
+import re
+import struct
+import subprocess
+import threading
+from typing import TYPE_CHECKING, Tuple
+
+from . import telemetry
+
+if TYPE_CHECKING:
+    import numpy as np
+    from pydub import AudioSegment
+
+# =============================
+# AUDIO I/O
+# =============================
+#
+# pydub spawns ffprobe + ffmpeg for every from_file() that is not a plain
+# PCM WAV, and ffmpeg again for every export() with parameters. Here WAV
+# (PCM, float, extensible) and raw PCM are read and written in-process;
+# compressed formats (the default ElevenLabs MP3 among them) go through
+# soundfile, whose bundled libsndfile decodes MP3, and only when it is
+# missing or cannot read the format through a single ffmpeg spawn, which is
+# counted (process-wide and into the current render's telemetry).
+
+_spawn_lock = threading.Lock()
+_spawns = 0
+
+def ffmpeg_spawns() -> int:
+    """ffmpeg processes started by this module since the server started."""
+    with _spawn_lock:
+        return _spawns
+
+def _count_spawn() -> None:
+    global _spawns
+    with _spawn_lock:
+        _spawns += 1
+    telemetry.count("ffmpeg_spawns")
+
+# ----- PCM helpers -----
+
+def _segment(pcm: "np.ndarray", frame_rate: int, channels: int) -> "AudioSegment":
+    from pydub import AudioSegment
+
+    return AudioSegment(data=pcm.astype("<i2").tobytes(), sample_width=2, frame_rate=frame_rate, channels=channels)
+
+def _to_int16(raw: bytes, fmt_tag: int, bits: int) -> "np.ndarray":
+    """Any WAV sample encoding to int16, which is what the mixer and exporter use."""
+    import numpy as np
+
+    width = bits // 8
+    raw = raw[:len(raw) - len(raw) % width]
+    if fmt_tag == 3:  # IEEE float
+        x = np.frombuffer(raw, dtype="<f4" if bits == 32 else "<f8")
+        return np.clip(np.rint(x * 32768.0), -32768, 32767).astype(np.int16)
+    if bits == 8:  # unsigned
+        return ((np.frombuffer(raw, dtype=np.uint8).astype(np.int16) - 128) << 8).astype(np.int16)
+    if bits == 16:
+        return np.frombuffer(raw, dtype="<i2")
+    if bits == 24:
+        b = np.frombuffer(raw, dtype=np.uint8).reshape(-1, 3)
+        return (b[:, 2].astype(np.int8).astype(np.int16) << 8 | b[:, 1]).astype(np.int16)
+    if bits == 32:
+        return (np.frombuffer(raw, dtype="<i4") >> 16).astype(np.int16)
+    raise ValueError(f"unsupported WAV sample size: {bits} bits")
+
+# ----- WAV -----
+
+def _parse_wav(data: bytes) -> Tuple[int, int, int, int, bytes]:
+    """(format tag, channels, rate, bits, sample bytes). Tolerates streamed headers with no sizes."""
+    if data[:4] != b"RIFF" or data[8:12] != b"WAVE":
+        raise ValueError("not a RIFF/WAVE file")
+    pos, fmt = 12, None
+    while pos + 8 <= len(data):
+        chunk_id = data[pos:pos + 4]
+        size = struct.unpack_from("<I", data, pos + 4)[0]
+        body = pos + 8
+        if chunk_id == b"fmt ":
+            tag, channels, rate, _, _, bits = struct.unpack_from("<HHIIHH", data, body)
+            if tag == 0xFFFE and size >= 40:  # WAVE_FORMAT_EXTENSIBLE: real tag opens the subformat GUID
+                tag = struct.unpack_from("<H", data, body + 24)[0]
+            fmt = (tag, channels, rate, bits)
+        elif chunk_id == b"data":
+            if fmt is None:
+                raise ValueError("WAV data chunk before fmt chunk")
+            end = len(data) if size in (0, 0xFFFFFFFF) or body + size > len(data) else body + size
+            return fmt + (data[body:end],)
+        pos = body + size + (size & 1)
+    raise ValueError("WAV file has no data chunk")
+
+def read_wav(data: bytes) -> "AudioSegment":
+    tag, channels, rate, bits, raw = _parse_wav(data)
+    if tag not in (1, 3):
+        raise ValueError(f"unsupported WAV encoding (format tag {tag})")
+    pcm = _to_int16(raw, tag, bits)
+    return _segment(pcm[:len(pcm) - len(pcm) % channels], rate, channels)
+
+_WAV_HEADER_BYTES = 44
+
+def _wav_header(channels: int, frame_rate: int, data_bytes: int) -> bytes:
+    return struct.pack(
+        "<4sI4s4sIHHIIHH4sI",
+        b"RIFF", 36 + data_bytes, b"WAVE",
+        b"fmt ", 16, 1, channels, frame_rate,
+        frame_rate * channels * 2, channels * 2, 16,
+        b"data", data_bytes,
+    )
+
+def wav_bytes(audio: "AudioSegment") -> bytes:
+    """16-bit PCM WAV, written directly from the segment's samples."""
+    if audio.sample_width != 2:
+        audio = audio.set_sample_width(2)
+    raw = audio.raw_data
+    return _wav_header(audio.channels, audio.frame_rate, len(raw)) + raw
+
+class WavWriter:
+    """
+    A 16-bit PCM WAV file written a block of frames at a time, so an episode
+    never has to sit in memory whole. The header's sizes are patched on close.
+    """
+
+    def __init__(self, path: str, frame_rate: int, channels: int):
+        self.path = path
+        self.frame_rate = frame_rate
+        self.channels = channels
+        self.frame_width = channels * 2
+        self.frames = 0
+        self._f = open(path, "wb")
+        self._f.write(_wav_header(channels, frame_rate, 0))
+
+    def write(self, raw: bytes) -> None:
+        self._f.write(raw)
+        self.frames += len(raw) // self.frame_width
+
+    def truncate(self, frames: int) -> None:
+        if frames < self.frames:
+            self._f.seek(_WAV_HEADER_BYTES + frames * self.frame_width)
+            self._f.truncate()
+            self.frames = frames
+
+    def close(self) -> None:
+        if self._f.closed:
+            return
+        self._f.seek(0)
+        self._f.write(_wav_header(self.channels, self.frame_rate, self.frames * self.frame_width))
+        self._f.close()
+
+# ----- compressed -----
+
+def _decode_soundfile(data: bytes) -> "AudioSegment":
+    import soundfile  # in requirements.txt; its libsndfile (>= 1.1) decodes MP3 in-process
+
+    pcm, rate = soundfile.read(io.BytesIO(data), dtype="int16", always_2d=True)
+    return _segment(pcm.reshape(-1), rate, pcm.shape[1])
+
+def _decode_ffmpeg(data: bytes, fmt: str) -> "AudioSegment":
+    from pydub import AudioSegment
+
+    # no -f: ffmpeg probes the stream, so a provider sending other than what was asked still decodes
+    _count_spawn()
+    proc = subprocess.run(
+        [AudioSegment.converter, "-v", "error", "-i", "pipe:0", "-f", "wav", "-acodec", "pcm_s16le", "pipe:1"],
+        input=data,
+        capture_output=True,
+        check=False,
+    )
+    if proc.returncode != 0:
+        raise ValueError(f"ffmpeg could not decode {fmt}: {proc.stderr.decode(errors='replace')[-300:]}")
+    return read_wav(proc.stdout)
+
+_PCM_FORMAT_RE = re.compile(r"^pcm_(\d+)$")
+
+def decode(data: bytes, fmt: str) -> "AudioSegment":
+    """
+    Decode provider or upload bytes. `fmt` is "wav", "mp3", or an ElevenLabs
+    raw format like "pcm_24000" (16-bit mono little-endian at that rate).
+    """
+    import numpy as np
+
+    m = _PCM_FORMAT_RE.match(fmt)
+    if m:
+        raw = data[:len(data) - len(data) % 2]
+        return _segment(np.frombuffer(raw, dtype="<i2"), int(m.group(1)), 1)
+    if data[:4] == b"RIFF":
+        try:
+            return read_wav(data)
+        except ValueError:  # compressed WAV (μ-law, ADPCM, …): decoded below like any other format
+            pass
+    try:
+        return _decode_soundfile(data)
+    except Exception:  # not installed, or this libsndfile cannot read the format
+        return _decode_ffmpeg(data, fmt)
@@ -0,0 +1,123 @@
+import threading
+import time
+from collections import deque
+from typing import Deque, Dict, Optional, Tuple
+
+from .config import (
+    BREAKER_COOLDOWN_SEC,
+    BREAKER_ERROR_RATE,
+    BREAKER_MIN_CALLS,
+    BREAKER_SLOW_CALL_SEC,
+    BREAKER_SLOW_RATE,
+    BREAKER_WINDOW,
+)
+
+# =============================
+# PROVIDER CIRCUIT BREAKERS
+# =============================
+#
+# closed    -> calls go through; outcomes land in a rolling window
+# open      -> calls fail immediately for BREAKER_COOLDOWN_SEC
+# half_open -> one probe call; success closes, failure re-opens
+#
+# A breaker trips when, over the window, too many calls fail or too many
+# are slower than BREAKER_SLOW_CALL_SEC.
+#
+# allow() hands each call a token to report its outcome with. Only the probe's
+# own token resolves half-open: a call sent before the breaker tripped that
+# finishes late says nothing about whether the provider has recovered.
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+_CALL = object()   # token for calls let through while closed
+
+class CircuitBreaker:
+    def __init__(self, name: str):
+        self.name = name
+        self._lock = threading.Lock()
+        self._window: Deque[Tuple[bool, bool]] = deque(maxlen=BREAKER_WINDOW)  # (failed, slow)
+        self._state = CLOSED
+        self._opened_at = 0.0
+        self._probe: Optional[object] = None   # token of the half-open probe in flight
+        self.trips = 0
+        self.rejected = 0
+
+    def allow(self) -> Optional[object]:
+        """
+        A token for one call, to pass to record() and then release(); None
+        when the breaker rejects the call.
+        """
+        with self._lock:
+            if self._state == CLOSED:
+                return _CALL
+            if self._state == OPEN and time.monotonic() - self._opened_at >= BREAKER_COOLDOWN_SEC:
+                self._state = HALF_OPEN
+                self._probe = None
+            if self._state == HALF_OPEN and self._probe is None:
+                self._probe = object()
+                return self._probe
+            self.rejected += 1
+            return None
+
+    def record(self, failed: bool, seconds: float, token: Optional[object] = None) -> None:
+        slow = seconds >= BREAKER_SLOW_CALL_SEC
+        with self._lock:
+            if self._state == HALF_OPEN:
+                if token is None or token is not self._probe:
+                    return
+                self._probe = None
+                if failed or slow:
+                    self._trip_locked()
+                else:
+                    self._state = CLOSED
+                    self._window.clear()
+                return
+
+            self._window.append((failed, slow))
+            n = len(self._window)
+            if self._state != CLOSED or n < BREAKER_MIN_CALLS:
+                return
+            failures = sum(1 for f, _ in self._window if f)
+            slows = sum(1 for _, s in self._window if s)
+            if failures / n >= BREAKER_ERROR_RATE or slows / n >= BREAKER_SLOW_RATE:
+                self._trip_locked()
+
+    def release(self, token: Optional[object]) -> None:
+        """
+        The call is over. A probe that ended without an outcome (no usable key,
+        an error before the request went out) frees the slot for the next call.
+        """
+        with self._lock:
+            if token is not None and token is self._probe:
+                self._probe = None
+
+    def _trip_locked(self) -> None:
+        self._state = OPEN
+        self._opened_at = time.monotonic()
+        self._window.clear()
+        self.trips += 1
+
+    def snapshot(self) -> Dict[str, object]:
+        with self._lock:
+            n = len(self._window)
+            return {
+                "state": self._state,
+                "window": n,
+                "error_rate": sum(1 for f, _ in self._window if f) / n if n else 0.0,
+                "trips": self.trips,
+                "rejected": self.rejected,
+            }
+
+_breakers: Dict[str, CircuitBreaker] = {}
+_lock = threading.Lock()
+
+def get_breaker(provider: str) -> CircuitBreaker:
+    with _lock:
+        b = _breakers.get(provider)
+        if b is None:
+            b = _breakers[provider] = CircuitBreaker(provider)
+        return b
+
+def all_breakers() -> Dict[str, CircuitBreaker]:
+    with _lock:
+        return dict(_breakers)
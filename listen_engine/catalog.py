@@ -0,0 +1,127 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Dict, Optional, Set, Tuple
+
+from .config import CATALOG_TIMEOUT_SEC, CATALOG_TTL_SEC, ELEVEN_API_BASE, HUME_API_BASE
+from .providers import api_key, http
+
+# =============================
+# VOICE CATALOGS (TTL CACHE)
+# =============================
+
+ELEVEN_VOICES_URL = ELEVEN_API_BASE + "/v1/voices"
+ELEVEN_VOICE_URL = ELEVEN_API_BASE + "/v1/voices/{voice_id}"
+HUME_VOICES_URL = HUME_API_BASE + "/v0/tts/voices"
+HUME_PROVIDERS = ("HUME_AI", "CUSTOM_VOICE")
+
+class CatalogUnavailable(Exception):
+    """The provider's voice list could not be fetched; callers skip the check instead of blocking."""
+
+@dataclass
+class VoiceCatalog:
+    ids: Set[str] = field(default_factory=set)
+    # ElevenLabs only: ids confirmed missing by a direct lookup
+    missing: Set[str] = field(default_factory=set)
+    # Hume only: provider -> names
+    names: Dict[str, Set[str]] = field(default_factory=dict)
+    fetched_at: float = 0.0
+
+    def fresh(self) -> bool:
+        return time.monotonic() - self.fetched_at < CATALOG_TTL_SEC
+
+_lock = threading.Lock()
+# (provider, api key) -> catalog
+_catalogs: Dict[Tuple[str, str], VoiceCatalog] = {}
+
+def _get(url: str, headers: dict, params: Optional[dict] = None) -> dict:
+    import requests
+
+    try:
+        r = http().get(url, headers=headers, params=params, timeout=CATALOG_TIMEOUT_SEC)
+    except requests.exceptions.RequestException as e:
+        raise CatalogUnavailable(str(e)) from e
+    if r.status_code != 200:
+        raise CatalogUnavailable(f"{url} returned {r.status_code}")
+    return r.json()
+
+def _fetch_eleven() -> VoiceCatalog:
+    data = _get(ELEVEN_VOICES_URL, {"xi-api-key": api_key("eleven")})
+    return VoiceCatalog(ids={v["voice_id"] for v in data.get("voices", [])}, fetched_at=time.monotonic())
+
+def _fetch_hume() -> VoiceCatalog:
+    cat = VoiceCatalog(fetched_at=time.monotonic())
+    headers = {"X-Hume-Api-Key": api_key("hume")}
+    for provider in HUME_PROVIDERS:
+        names = cat.names.setdefault(provider, set())
+        page, total = 0, 1
+        while page < total:
+            data = _get(HUME_VOICES_URL, headers, {"provider": provider, "page_number": page, "page_size": 100})
+            for v in data.get("voices_page", []):
+                cat.ids.add(v["id"])
+                names.add(v["name"])
+            total = data.get("total_pages", 1)
+            page += 1
+    return cat
+
+_FETCHERS = {"eleven": _fetch_eleven, "hume": _fetch_hume}
+
+def get_catalog(provider: str) -> VoiceCatalog:
+    """Cached catalog for `provider`; refetched after CATALOG_TTL_SEC. Raises CatalogUnavailable."""
+    key = (provider, api_key(provider))
+    with _lock:
+        cat = _catalogs.get(key)
+        if cat is not None and cat.fresh():
+            return cat
+    cat = _FETCHERS[provider]()
+    with _lock:
+        _catalogs[key] = cat
+    return cat
+
+def get_catalogs(providers: Set[str]) -> Dict[str, Optional[VoiceCatalog]]:
+    """Fetch several providers' catalogs in parallel; unavailable ones map to None."""
+    def one(p):
+        try:
+            return get_catalog(p)
+        except CatalogUnavailable:
+            return None
+
+    providers = sorted(providers)
+    if len(providers) <= 1:
+        return {p: one(p) for p in providers}
+    with ThreadPoolExecutor(max_workers=len(providers)) as pool:
+        return dict(zip(providers, pool.map(one, providers)))
+
+def confirm_eleven_voice(cat: VoiceCatalog, voice_id: str) -> bool:
+    """
+    Library voices used by ID do not always appear in /v1/voices; look those
+    up individually once and remember the answer in the catalog. Only a clear
+    "not found" counts as invalid; network trouble gives the voice the benefit of the doubt.
+    """
+    import requests
+
+    if voice_id in cat.ids:
+        return True
+    if voice_id in cat.missing:
+        return False
+    try:
+        r = http().get(
+            ELEVEN_VOICE_URL.format(voice_id=voice_id),
+            headers={"xi-api-key": api_key("eleven")},
+            timeout=CATALOG_TIMEOUT_SEC,
+        )
+    except requests.exceptions.RequestException:
+        return True
+    if r.status_code in (400, 404, 422):
+        with _lock:
+            cat.missing.add(voice_id)
+        return False
+    if r.status_code == 200:
+        with _lock:
+            cat.ids.add(voice_id)
+    return True
+
+def clear_catalogs() -> None:
+    with _lock:
+        _catalogs.clear()
@@ -0,0 +1,168 @@
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Optional
+
+from . import telemetry
+
+# =============================
+# PROCESS-WIDE CLIP STORE
+# =============================
+#
+# Streamlit runs every session in the same Python process, so a module-level
+# store is shared by all logged-in users. Finished clips are kept in an LRU
+# bounded by bytes; clips still being rendered are tracked as futures so a
+# second session asking for the same clip waits instead of calling the API again.
+
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+
+
+def clip_key(*parts: Any) -> str:
+    """Stable cache key for everything that changes the rendered audio."""
+    blob = json.dumps(parts, sort_keys=True, default=str, separators=(",", ":"))
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+
+def _sizeof(value: Any) -> int:
+    raw = getattr(value, "raw_data", None)
+    if raw is not None:
+        return len(raw)
+    if isinstance(value, (bytes, bytearray)):
+        return len(value)
+    if isinstance(value, (list, tuple)):  # e.g. all generations of one Hume request
+        return sum(_sizeof(v) for v in value)
+    return 0
+
+
+class ClipStore:
+    def __init__(self, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._clips: "OrderedDict[str, Any]" = OrderedDict()
+        self._sizes: Dict[str, int] = {}
+        self._inflight: Dict[str, Future] = {}
+        self._bytes = 0
+        self._counters = {
+            "requests": 0,
+            "hits": 0,
+            "inflight_joins": 0,
+            "misses": 0,
+            "failures": 0,
+            "evictions": 0,
+        }
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            if key not in self._clips:
+                return None
+            self._clips.move_to_end(key)
+            return self._clips[key]
+
+    def contains(self, key: str) -> bool:
+        """Cached or being rendered right now; does not touch the LRU order or the counters."""
+        with self._lock:
+            return key in self._clips or key in self._inflight
+
+    def peek(self, key: str) -> Optional[Any]:
+        """The cached clip, without touching the LRU order or the counters."""
+        with self._lock:
+            return self._clips.get(key)
+
+    def put(self, key: str, value: Any) -> None:
+        if value is None:
+            return
+        size = _sizeof(value)
+        with self._lock:
+            self._store_locked(key, value, size)
+
+    def get_or_render(self, key: str, render: Callable[[], Optional[Any]]) -> Optional[Any]:
+        """
+        Return the cached clip for `key`, join an in-flight render of the same
+        key, or run `render()` ourselves. Failed renders (None or an exception)
+        are handed to everyone waiting on them but never cached.
+        """
+        with self._lock:
+            self._counters["requests"] += 1
+            if key in self._clips:
+                self._counters["hits"] += 1
+                self._clips.move_to_end(key)
+                telemetry.count("cache_hits")
+                return self._clips[key]
+
+            fut = self._inflight.get(key)
+            if fut is not None:
+                self._counters["inflight_joins"] += 1
+                owner = False
+            else:
+                self._counters["misses"] += 1
+                fut = Future()
+                self._inflight[key] = fut
+                owner = True
+        telemetry.count("cache_misses" if owner else "cache_joins")
+
+        if not owner:
+            return fut.result()
+
+        try:
+            value = render()
+        except BaseException as e:
+            with self._lock:
+                self._counters["failures"] += 1
+                self._inflight.pop(key, None)
+            fut.set_exception(e)
+            raise
+
+        if value is None:
+            with self._lock:
+                self._counters["failures"] += 1
+                self._inflight.pop(key, None)
+        else:
+            size = _sizeof(value)
+            with self._lock:
+                self._inflight.pop(key, None)
+                self._store_locked(key, value, size)
+        fut.set_result(value)
+        return value
+
+    def _store_locked(self, key: str, value: Any, size: int) -> None:
+        # a key cached meanwhile (put() during our render) is replaced, not counted twice
+        if key in self._clips:
+            self._bytes -= self._sizes.pop(key)
+            del self._clips[key]
+        if size > self.max_bytes:  # would evict everything else and still not fit
+            return
+        self._clips[key] = value
+        self._sizes[key] = size
+        self._bytes += size
+        self._evict_locked()
+
+    def _evict_locked(self) -> None:
+        while self._bytes > self.max_bytes and self._clips:
+            old_key, _ = self._clips.popitem(last=False)
+            self._bytes -= self._sizes.pop(old_key)
+            self._counters["evictions"] += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._clips.clear()
+            self._sizes.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            s = dict(self._counters)
+            s["entries"] = len(self._clips)
+            s["bytes"] = self._bytes
+            s["inflight"] = len(self._inflight)
+        served = s["hits"] + s["inflight_joins"]
+        s["hit_rate"] = served / s["requests"] if s["requests"] else 0.0
+        return s
+
+
+_STORE = ClipStore()
+
+
+def get_clip_store() -> ClipStore:
+    return _STORE
@@ -0,0 +1,131 @@
+import os
+from dataclasses import dataclass
+
+# =============================
+# PROVIDER CONFIG
+# =============================
+
+# overridable so the load-test harness can point every session at a fake server
+ELEVEN_API_BASE = os.environ.get("ELEVEN_API_BASE", "https://api.elevenlabs.io")
+HUME_API_BASE = os.environ.get("HUME_API_BASE", "https://api.hume.ai")
+
+# ElevenLabs
+MODEL_ID = "eleven_v3"
+ELEVEN_OUTPUT_FORMAT = "mp3_44100_128"
+
+RETRIES = 3
+TIMEOUT_SEC = 30
+
+# request hedging (opt-in per render): duplicate a request once it outlives
+# the provider's recent p95, spending at most HEDGE_BUDGET_RATIO extra requests
+HEDGE_QUANTILE = 0.95
+HEDGE_BUDGET_RATIO = 0.10
+HEDGE_BUDGET_BURST = 5.0
+
+# provider circuit breakers: trip on error rate or slow-call rate over the
+# last BREAKER_WINDOW calls, then fail fast for BREAKER_COOLDOWN_SEC
+BREAKER_WINDOW = 20
+BREAKER_MIN_CALLS = 6
+BREAKER_ERROR_RATE = 0.5
+BREAKER_SLOW_CALL_SEC = 20
+BREAKER_SLOW_RATE = 0.5
+BREAKER_COOLDOWN_SEC = 30
+
+# API key pools: every key takes at most KEY_MAX_CONCURRENCY requests at once
+# (lowered per key when the provider answers 429, raised back one step after
+# KEY_RECOVER_SUCCESSES successes in a row); a rate-limited key sits out
+# KEY_COOLDOWN_SEC, and auth / quota errors eject a key for good
+KEY_MAX_CONCURRENCY = 5
+KEY_COOLDOWN_SEC = 10
+KEY_RECOVER_SUCCESSES = 20
+KEY_RATE_WINDOW_SEC = 60
+
+# pre-render estimates: billed characters are priced at these rates (USD per
+# 1000 characters; set them to your plan's overage rate), and an uncached line
+# is assumed to run this many ms of speech per character of text
+PRICE_PER_1K_CHARS = {"eleven": 0.30, "hume": 0.15}
+SPEECH_MS_PER_CHAR = 65
+
+# per-request text limits (characters)
+ELEVEN_MAX_CHARS = 3000   # eleven_v3
+HUME_MAX_CHARS = 5000     # per utterance
+HUME_MAX_DESC_CHARS = 1000
+
+# long blocks are split at sentence / pause-tag boundaries into requests of at
+# most this many characters, synthesized in parallel and stitched back together
+CHUNK_MAX_CHARS = 400
+CHUNK_JOIN_CROSSFADE_MS = 8
+
+# voice catalogs used by the pre-flight check
+CATALOG_TTL_SEC = 600
+CATALOG_TIMEOUT_SEC = 5
+
+# background synthesis shares one pool per process
+SYNTH_WORKERS = 4
+
+# the pool is shared fairly between logged-in users: a user's share of it is
+# proportional to their weight here (default 1). Renders of at most
+# INTERACTIVE_MAX_REQUESTS requests (and every audition) jump the queue;
+# waiting renders refresh their queue position every QUEUE_POLL_SEC
+FAIR_SHARE_WEIGHTS: dict = {}
+INTERACTIVE_MAX_REQUESTS = 8
+QUEUE_POLL_SEC = 1.0
+
+# Generate runs as a staged pipeline (synthesis -> fades -> placement -> WAV
+# writers); each stage hands the next at most this many clips / write blocks
+# before it has to wait
+PIPELINE_QUEUE_DEPTH = 16
+# ...and synthesis runs at most this many jobs (script lines) ahead of the
+# line being faded; keep it well above the number of synthesis workers
+PIPELINE_JOBS_AHEAD = 64
+
+# one row per render, appended to a local SQLite file
+TELEMETRY_DB_PATH = os.environ.get("VOBBLE_TELEMETRY_DB", "vobble_telemetry.sqlite3")
+# how often a render samples the process RSS for its peak_rss_mb
+TELEMETRY_RSS_POLL_SEC = 0.25
+
+# =============================
+# VOICE TYPE PROFILES
+# =============================
+
+VOICE_TYPE_PROFILES = {
+    "adult_male": {"stability": 0.0, "similarity_boost": 0.88, "style": 1.0, "use_speaker_boost": True},
+    "adult_female": {"stability": 0.50, "similarity_boost": 0.90, "style": 0.80, "use_speaker_boost": True},
+    "male_kid": {"stability": 0.50, "similarity_boost": 0.80, "style": 0.90, "use_speaker_boost": True},
+    "female_kid": {"stability": 0.50, "similarity_boost": 0.78, "style": 0.95, "use_speaker_boost": False},
+}
+
+VOICE_TYPES = list(VOICE_TYPE_PROFILES)
+
+# =============================
+# MIX SETTINGS
+# =============================
+
+@dataclass(frozen=True)
+class MixSettings:
+    crossfade_ms: int = 0
+    gap_same_speaker_ms: int = 100
+    gap_speaker_change_ms: int = 100
+
+    # applied when a synthesized clip is placed (stored clips stay raw, so remixes can change them)
+    clip_fade_in_ms: int = 20
+    clip_fade_out_ms: int = 40
+    clip_tail_pad_ms: int = 60
+
+    # episode format: every clip is conformed to this once, before mixing
+    sample_rate: int = 44100
+    channels: int = 1
+
+    # container ElevenLabs is asked for; every clip is decoded to PCM before mixing
+    eleven_output_format: str = ELEVEN_OUTPUT_FORMAT
+
+    # lines longer than this go out as several parallel requests (0 = never split)
+    chunk_max_chars: int = CHUNK_MAX_CHARS
+
+    # request policy (not part of the clip cache key)
+    hedge_requests: bool = False
+    schedule: str = "longest_first"   # or "script_order" (opening lines first, for previews)
+
+DEFAULT_MIX = MixSettings()
+
+EPISODE_SAMPLE_RATES = [44100, 48000, 24000]
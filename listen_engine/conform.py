@@ -0,0 +1,102 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    import numpy as np
+    from pydub import AudioSegment
+
+# =============================
+# FORMAT CONFORM
+# =============================
+#
+# pydub silently converts whenever two segments with different rates or
+# channel counts meet (`+=`, append, overlay), and it converts the *longer*
+# one too. Every clip is brought to the episode format exactly once here,
+# before it is cached or reaches the mixer, so those hidden conversions never run.
+
+SAMPLE_WIDTH = 2          # episodes are exported as pcm_s16le
+
+_HALF_TAPS = 16           # sinc half-width in input samples (at the cutoff)
+_KAISER_BETA = 8.6
+_ROLLOFF = 0.94           # keep the transition band below the new Nyquist
+_MAX_PHASES = 1024        # precompute kernels when the rate ratio has few phases
+_OUT_CHUNK = 1 << 15      # output frames per vectorized block
+
+def _to_float(audio: "AudioSegment") -> "np.ndarray":
+    import numpy as np
+
+    dtype = {1: np.int8, 2: np.int16, 4: np.int32}[audio.sample_width]
+    x = np.frombuffer(audio.raw_data, dtype=dtype).astype(np.float32)
+    x /= float(1 << (8 * audio.sample_width - 1))
+    return x.reshape(-1, audio.channels)
+
+def _from_float(x: "np.ndarray", frame_rate: int) -> "AudioSegment":
+    import numpy as np
+    from pydub import AudioSegment
+
+    pcm = np.clip(np.rint(x * 32768.0), -32768, 32767).astype("<i2")
+    return AudioSegment(data=pcm.tobytes(), sample_width=SAMPLE_WIDTH, frame_rate=frame_rate, channels=x.shape[1])
+
+def remix_channels(x: "np.ndarray", channels: int) -> "np.ndarray":
+    """Downmix to mono by averaging, or spread mono across `channels`."""
+    import numpy as np
+
+    have = x.shape[1]
+    if have == channels:
+        return x
+    if channels == 1:
+        return x.mean(axis=1, keepdims=True, dtype=np.float32)
+    if have == 1:
+        return np.repeat(x, channels, axis=1)
+    return np.repeat(x.mean(axis=1, keepdims=True, dtype=np.float32), channels, axis=1)
+
+def _kernel(frac: "np.ndarray", taps: "np.ndarray", half: int, cutoff: float) -> "np.ndarray":
+    import numpy as np
+
+    d = frac[:, None] - taps[None, :]  # distance from each tap, in input samples
+    window = np.i0(_KAISER_BETA * np.sqrt(np.clip(1.0 - (d / half) ** 2, 0.0, 1.0))) / np.i0(_KAISER_BETA)
+    return (cutoff * np.sinc(cutoff * d) * window).astype(np.float32)
+
+def resample(x: "np.ndarray", src_rate: int, dst_rate: int) -> "np.ndarray":
+    """
+    Band-limited resampling of (frames, channels) float samples with a
+    Kaiser-windowed sinc, vectorized over blocks of output frames. For the
+    usual rate pairs (48k/44.1k/24k) the fractional phases repeat every few
+    hundred frames, so the kernels are computed once per phase.
+    """
+    import math
+
+    import numpy as np
+
+    if src_rate == dst_rate or len(x) == 0:
+        return x
+
+    g = math.gcd(src_rate, dst_rate)
+    up, down = dst_rate // g, src_rate // g   # output frame n sits at input position n * down / up
+    cutoff = min(1.0, dst_rate / src_rate) * _ROLLOFF
+    half = int(np.ceil(_HALF_TAPS / cutoff))
+    taps = np.arange(-half + 1, half + 1)
+    n_out = int(round(len(x) * dst_rate / src_rate))
+    table = _kernel(np.arange(up) / up, taps, half, cutoff) if up <= _MAX_PHASES else None
+
+    # zero padding on both sides keeps every tap index in range
+    zeros = np.zeros((half + 1, x.shape[1]), np.float32)
+    padded = np.concatenate([zeros[:half], x, zeros])
+    out = np.empty((n_out, x.shape[1]), dtype=np.float32)
+
+    for o0 in range(0, n_out, _OUT_CHUNK):
+        o1 = min(n_out, o0 + _OUT_CHUNK)
+        pos = np.arange(o0, o1, dtype=np.int64) * down
+        base, phase = pos // up, pos % up
+        kernel = table[phase] if table is not None else _kernel(phase / up, taps, half, cutoff)
+        idx = base[:, None] + taps[None, :] + half
+        out[o0:o1] = np.einsum("nk,nkc->nc", kernel, padded[idx])
+    return out
+
+def conform(audio: "AudioSegment", sample_rate: int, channels: int) -> "AudioSegment":
+    """Resample + up/downmix + 16-bit in one pass; already-conformed clips are returned as-is."""
+    if audio.frame_rate == sample_rate and audio.channels == channels and audio.sample_width == SAMPLE_WIDTH:
+        return audio
+    x = remix_channels(_to_float(audio), channels)
+    return _from_float(resample(x, audio.frame_rate, sample_rate), sample_rate)
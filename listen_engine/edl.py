@@ -0,0 +1,158 @@
+from __future__ import annotations
+
+import json
+from dataclasses import asdict, dataclass, field
+from typing import TYPE_CHECKING, Dict, List, Optional
+
+from .config import DEFAULT_MIX, MixSettings
+from .plan import CharConfig, PlannedLine, SynthJob, job_chunks, job_clip_key, job_variants
+from .takes import take_index
+from .variants import VariantSet
+
+if TYPE_CHECKING:
+    from pydub import AudioSegment
+
+    from .takes import TakeStore
+
+# =============================
+# EDIT DECISION LIST
+# =============================
+#
+# Every render produces an EDL: one entry per placed line with the clip it
+# uses (synthesized job or recorded take), per-line overrides, and where it
+# landed on the timeline. The EDL keeps the raw clips it references, so a
+# remix with different gaps / crossfade / fades / take choices is a pure
+# re-assembly with no provider calls.
+#
+# The exported JSON is a record of the render, not something to remix from:
+# audio stays with the in-session EDL. Each synthesized line lists the clip
+# store keys of the read it uses (one per chunk), which this server resolves
+# for as long as it still caches them.
+
+@dataclass
+class EdlLine:
+    speaker: str
+    text: str
+    clip: Optional[tuple] = None        # synthesized: the plan job key
+    take: Optional[int] = None          # recorded: take index into the character's TakeStore
+    gap_before_ms: Optional[int] = None  # per-line override of the speaker gap
+    # filled in by each render
+    start_ms: int = 0
+    duration_ms: int = 0
+
+@dataclass
+class EditDecisionList:
+    characters: List[str]
+    mix: MixSettings
+    lines: List[EdlLine] = field(default_factory=list)
+    clips: Dict[tuple, "AudioSegment"] = field(default_factory=dict)
+    takes: Dict[str, "TakeStore"] = field(default_factory=dict)
+    variants: Dict[tuple, VariantSet] = field(default_factory=dict)
+    # clip store keys per job: one list per read, one key per chunk (primary voice)
+    store_keys: Dict[tuple, List[List[str]]] = field(default_factory=dict)
+
+    def pick_variant(self, job_key: tuple, index: int) -> None:
+        """Swap every line using this job over to another of its scored reads."""
+        vs = self.variants[job_key]
+        vs.pick = index
+        self.clips[job_key] = vs.chosen
+
+    def retake(self, character: str, seq: List[int]) -> None:
+        """Re-pick a recorded character's takes from a new take sequence."""
+        store = self.takes.get(character)
+        lines = [ln for ln in self.lines if ln.speaker == character and ln.clip is None]
+        for i, ln in enumerate(lines):
+            ln.take = take_index(store, seq, i)
+
+    def _line_store_keys(self, ln: EdlLine) -> Optional[List[str]]:
+        reads = self.store_keys.get(ln.clip) if ln.clip is not None else None
+        if not reads:
+            return None
+        vs = self.variants.get(ln.clip)
+        return reads[vs.pick if vs is not None and vs.pick < len(reads) else 0]
+
+    def to_json(self) -> str:
+        return json.dumps({
+            "format": asdict(self.mix),
+            "characters": self.characters,
+            "lines": [
+                {
+                    "speaker": ln.speaker,
+                    "text": ln.text,
+                    "clips": self._line_store_keys(ln),
+                    "take": ln.take,
+                    "variant": self.variants[ln.clip].pick if ln.clip in self.variants else None,
+                    "gap_before_ms": ln.gap_before_ms,
+                    "start_ms": ln.start_ms,
+                    "duration_ms": ln.duration_ms,
+                }
+                for ln in self.lines
+            ],
+        }, indent=2, ensure_ascii=False)
+
+class EdlBuilder:
+    """
+    Resolves planned lines to EDL entries one at a time, in script order, for
+    renders that place each line as soon as its clip is ready.
+    """
+
+    def __init__(self, char_cfgs: Dict[str, CharConfig], characters: List[str], mix: MixSettings = DEFAULT_MIX):
+        self.edl = EditDecisionList(characters=list(characters), mix=mix)
+        self._char_cfgs = char_cfgs
+        self._file_line_index = {ch: 0 for ch in characters}
+
+    def add(
+        self,
+        line: PlannedLine,
+        audio: Optional["AudioSegment"] = None,
+        variants: Optional[VariantSet] = None,
+    ) -> Optional[EdlLine]:
+        """
+        Append `line` (with its job's audio, for synthesized lines). Returns the
+        new entry, or None when the line has no audio and is dropped.
+        """
+        speaker = line.speaker
+        cfg = self._char_cfgs[speaker]
+        edl = self.edl
+
+        if line.job_key is not None:
+            if not audio:
+                return None
+            edl.clips[line.job_key] = audio
+            if line.job_key not in edl.store_keys:
+                job = SynthJob(speaker=speaker, text=line.job_key[1], variation=line.job_key[2])
+                chunks = job_chunks(job, edl.mix)
+                edl.store_keys[line.job_key] = [
+                    [job_clip_key(read, cfg, edl.mix) for read in reads]
+                    for reads in zip(*(job_variants(chunk, cfg) for chunk in chunks))
+                ]
+            if variants is not None:
+                edl.variants[line.job_key] = variants
+            entry = EdlLine(speaker, line.text, clip=line.job_key)
+        else:  # recorded file
+            idx = take_index(cfg.file_takes, cfg.take_sequence or [], self._file_line_index[speaker])
+            self._file_line_index[speaker] += 1
+            if idx is None:
+                return None
+            edl.takes[speaker] = cfg.file_takes
+            entry = EdlLine(speaker, line.text, take=idx)
+
+        edl.lines.append(entry)
+        return entry
+
+def build_edl(
+    planned_lines: List[PlannedLine],
+    job_audio: Dict[tuple, Optional["AudioSegment"]],
+    char_cfgs: Dict[str, CharConfig],
+    characters: List[str],
+    mix: MixSettings = DEFAULT_MIX,
+    variants: Optional[Dict[tuple, VariantSet]] = None,
+) -> EditDecisionList:
+    """Resolve every planned line to a clip reference. Lines with no audio are dropped."""
+    builder = EdlBuilder(char_cfgs, characters, mix)
+    for line in planned_lines:
+        if line.job_key is not None:
+            builder.add(line, job_audio.get(line.job_key), (variants or {}).get(line.job_key))
+        else:
+            builder.add(line)
+    return builder.edl
@@ -0,0 +1,134 @@
+from __future__ import annotations
+
+import heapq
+from dataclasses import dataclass, field
+from typing import Dict, List, Tuple
+
+from .clip_store import get_clip_store
+from .config import DEFAULT_MIX, PRICE_PER_1K_CHARS, SPEECH_MS_PER_CHAR, MixSettings
+from .key_pool import get_key_pool
+from .plan import CharConfig, job_chunks, job_clip_key, job_variants, plan_render, synth_workers, voice_identity
+from .schedule import estimate_seconds, order_tasks
+from .takes import take_index
+from .text import ensure_line_tail
+
+# =============================
+# PRE-RENDER ESTIMATE
+# =============================
+#
+# What Generate would cost, from the same plan it would run: requests the
+# clip store cannot answer, the characters each provider bills for them,
+# wall time from the speed model replayed through the render's schedule on
+# the current pool and key limits, and the size of the WAVs it would write.
+
+_WAV_HEADER_BYTES = 44
+
+@dataclass
+class ProviderEstimate:
+    requests: int = 0
+    cached: int = 0          # requests the clip store already holds (or has in flight)
+    billed_chars: int = 0
+
+@dataclass
+class RenderEstimate:
+    providers: Dict[str, ProviderEstimate] = field(default_factory=dict)
+    costs: Dict[str, float] = field(default_factory=dict)
+    wall_sec: float = 0.0
+    workers: int = 0
+    episode_sec: float = 0.0
+    mix_bytes: int = 0
+    stems_bytes: int = 0
+
+    @property
+    def requests(self) -> int:
+        return sum(p.requests for p in self.providers.values())
+
+    @property
+    def cached(self) -> int:
+        return sum(p.cached for p in self.providers.values())
+
+    @property
+    def cost(self) -> float:
+        return sum(self.costs.values())
+
+def wav_size(seconds: float, mix: MixSettings) -> int:
+    return _WAV_HEADER_BYTES + round(seconds * mix.sample_rate) * mix.channels * 2
+
+def _simulate(tasks: List[Tuple[str, float]], workers: int) -> float:
+    """Replay (provider, seconds) tasks in submission order on the pool and each provider's key slots."""
+    pool = [0.0] * max(1, workers)
+    slots: Dict[str, List[float]] = {}
+    end = 0.0
+    for provider, seconds in tasks:
+        if provider not in slots:
+            slots[provider] = [0.0] * max(1, min(workers, get_key_pool(provider).capacity() or workers))
+        start = max(pool[0], slots[provider][0])
+        finish = start + seconds
+        heapq.heapreplace(pool, finish)
+        heapq.heapreplace(slots[provider], finish)
+        end = max(end, finish)
+    return end
+
+def estimate_render(
+    parsed_items: List[Tuple[str, str]],
+    char_cfgs: Dict[str, CharConfig],
+    characters: List[str],
+    mix: MixSettings = DEFAULT_MIX,
+) -> RenderEstimate:
+    est = RenderEstimate(workers=synth_workers())
+    store = get_clip_store()
+    planned_lines, jobs = plan_render(parsed_items, char_cfgs)
+
+    line_ms: Dict[tuple, float] = {}
+    tasks = []
+    for position, (key, job) in enumerate(jobs.items()):
+        cfg = char_cfgs[job.speaker]
+        prov = est.providers.setdefault(cfg.provider, ProviderEstimate())
+        ms = 0.0
+        for chunk in job_chunks(job, mix):
+            sent = ensure_line_tail(chunk.text) if cfg.provider == "eleven" else chunk.text
+            # a Hume chunk is one num_generations request for all variants; ElevenLabs makes one per variant
+            requests = [chunk] if cfg.provider == "hume" else job_variants(chunk, cfg)
+            for req in requests:
+                clip_key = job_clip_key(req, cfg, mix)
+                if store.contains(clip_key):
+                    prov.cached += 1
+                    continue
+                prov.requests += 1
+                prov.billed_chars += len(sent) * (max(1, cfg.variants) if cfg.provider == "hume" else 1)
+                seconds = estimate_seconds(cfg.provider, voice_identity(cfg), len(sent))
+                tasks.append(((cfg.provider, seconds), position, seconds))
+            cached = store.peek(job_clip_key(chunk, cfg, mix))
+            if isinstance(cached, list):
+                cached = cached[0] if cached else None
+            ms += len(cached) if cached is not None else len(chunk.text) * SPEECH_MS_PER_CHAR
+        line_ms[key] = ms + mix.clip_tail_pad_ms
+
+    est.costs = {p: pe.billed_chars / 1000 * PRICE_PER_1K_CHARS.get(p, 0.0) for p, pe in est.providers.items()}
+    est.wall_sec = _simulate(order_tasks(tasks, mix.schedule), est.workers)
+
+    # timeline: the same gaps and crossfades render_edl lays down
+    total_ms = 0.0
+    last_speaker = None
+    file_line_index = {ch: 0 for ch in characters}
+    for line in planned_lines:
+        if line.job_key is not None:
+            ms = line_ms[line.job_key]
+        else:
+            cfg = char_cfgs[line.speaker]
+            idx = take_index(cfg.file_takes, cfg.take_sequence or [], file_line_index[line.speaker])
+            file_line_index[line.speaker] += 1
+            if idx is None:
+                continue
+            start, end = cfg.file_takes.spans[idx]
+            ms = (end - start) * 1000 / cfg.file_takes.frame_rate
+        if last_speaker is not None:
+            total_ms += mix.gap_same_speaker_ms if line.speaker == last_speaker else mix.gap_speaker_change_ms
+            total_ms -= min(mix.crossfade_ms, ms)
+        total_ms += ms
+        last_speaker = line.speaker
+
+    est.episode_sec = total_ms / 1000
+    est.mix_bytes = wav_size(est.episode_sec, mix)
+    est.stems_bytes = est.mix_bytes * len(characters)  # every stem spans the whole episode
+    return est
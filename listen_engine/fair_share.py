@@ -0,0 +1,206 @@
+import contextvars
+import heapq
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from dataclasses import dataclass
+from typing import Callable, Deque, Dict, List, Optional
+
+from .config import FAIR_SHARE_WEIGHTS
+from .key_pool import worker_capacity
+
+# =============================
+# FAIR-SHARE SYNTHESIS SCHEDULER
+# =============================
+#
+# Every logged-in user shares one process, one set of API keys and one pool of
+# synthesis workers. Requests wait in per-user queues and a free worker takes
+# the next one by lane, then by weighted fair share within the lane:
+#
+#   interactive  auditions and small renders (a few requests); always first
+#   batch        full renders
+#   background   speculative pre-renders; only when nothing else is waiting
+#
+# Fair share is start-time fair queueing: each user carries a virtual time that
+# advances by a request's estimated seconds divided by the user's weight, and
+# the user with the lowest virtual time goes next. A user who has been idle
+# rejoins at the current virtual clock, so one person's 500-line render and
+# another's three-line fix alternate instead of running back to back.
+
+INTERACTIVE = "interactive"
+BATCH = "batch"
+BACKGROUND = "background"
+LANES = (INTERACTIVE, BATCH, BACKGROUND)
+
+class QueuedFuture(Future):
+    """A Future that also knows when a worker picked its request up."""
+    started: Optional[float] = None   # time.monotonic()
+
+@dataclass
+class QueueStatus:
+    """Where one user's queued requests stand, from a replay of the dispatch order."""
+    queued: int = 0
+    running: int = 0
+    ahead: int = 0              # other users' requests that will start before this user's next one
+    wait_sec: float = 0.0       # until this user's next request starts
+    finish_sec: float = 0.0     # until this user's last queued request finishes
+
+class _Task:
+    __slots__ = ("fn", "args", "ctx", "future", "est", "user", "lane")
+
+    def __init__(self, fn, args, est: float, user: str, lane: str):
+        self.fn = fn
+        self.args = args
+        self.ctx = contextvars.copy_context()   # carries the render recorder into the worker
+        self.future = QueuedFuture()
+        self.est = est
+        self.user = user
+        self.lane = lane
+
+class _UserState:
+    def __init__(self, weight: float):
+        self.weight = weight
+        self.vtime = 0.0
+        self.running: Dict[_Task, float] = {}   # task -> start time
+        self.lanes: Dict[str, Deque[_Task]] = {lane: deque() for lane in LANES}
+
+    def queued(self) -> int:
+        return sum(len(q) for q in self.lanes.values())
+
+class FairScheduler:
+    def __init__(self, workers: int):
+        self.workers = workers
+        self._cond = threading.Condition()
+        self._users: Dict[str, _UserState] = {}
+        self._vclock = 0.0
+        self.dispatched = 0
+        for n in range(workers):
+            threading.Thread(target=self._worker, name=f"synth_{n}", daemon=True).start()
+
+    def submit(self, user: str, lane: str, est: float, fn: Callable, *args) -> QueuedFuture:
+        """Queue fn(*args) for `user` in `lane`; `est` is its expected seconds."""
+        task = _Task(fn, args, est, user, lane)
+        with self._cond:
+            state = self._users.get(user)
+            if state is None:
+                state = self._users[user] = _UserState(FAIR_SHARE_WEIGHTS.get(user, 1.0))
+            if not state.queued() and not state.running:
+                # no credit banked while idle
+                state.vtime = max(state.vtime, self._vclock)
+            state.lanes[lane].append(task)
+            self._cond.notify()
+        return task.future
+
+    def _pick(self) -> Optional[_Task]:
+        for lane in LANES:
+            waiting = [s for s in self._users.values() if s.lanes[lane]]
+            if waiting:
+                state = min(waiting, key=lambda s: s.vtime)
+                task = state.lanes[lane].popleft()
+                self._vclock = state.vtime
+                state.vtime += task.est / state.weight
+                return task
+        return None
+
+    def _worker(self) -> None:
+        while True:
+            with self._cond:
+                task = self._pick()
+                while task is None:
+                    self._cond.wait()
+                    task = self._pick()
+                # cancelled while queued (a stopped speculative run): drop it
+                if not task.future.set_running_or_notify_cancel():
+                    continue
+                task.future.started = time.monotonic()
+                state = self._users[task.user]
+                state.running[task] = task.future.started
+                self.dispatched += 1
+            try:
+                result = task.ctx.run(task.fn, *task.args)
+            except BaseException as e:
+                task.future.set_exception(e)
+            else:
+                task.future.set_result(result)
+            finally:
+                with self._cond:
+                    del state.running[task]
+
+    def status(self, user: str) -> QueueStatus:
+        """
+        Replay the dispatch order over everything queued now, on worker slots
+        that free up as running requests finish, to place `user` in it.
+        """
+        now = time.monotonic()
+        with self._cond:
+            queues = {
+                name: {lane: [t.est for t in q if not t.future.cancelled()] for lane, q in s.lanes.items()}
+                for name, s in self._users.items()
+            }
+            vtimes = {name: s.vtime for name, s in self._users.items()}
+            weights = {name: s.weight for name, s in self._users.items()}
+            running_left = [
+                max(0.0, t.est - (now - started))
+                for s in self._users.values()
+                for t, started in s.running.items()
+            ]
+            mine = self._users.get(user)
+            out = QueueStatus(running=len(mine.running) if mine else 0)
+
+        out.queued = sum(len(q) for q in queues.get(user, {}).values())
+        if not out.queued:
+            return out
+        slots = sorted(running_left)[:self.workers]
+        slots += [0.0] * (self.workers - len(slots))
+        heapq.heapify(slots)
+        heads = {name: {lane: 0 for lane in LANES} for name in queues}
+        left = out.queued
+        seen_mine = False
+        while left:
+            for lane in LANES:
+                waiting = [n for n in queues if heads[n][lane] < len(queues[n][lane])]
+                if waiting:
+                    name = min(waiting, key=lambda n: vtimes[n])
+                    break
+            est = queues[name][lane][heads[name][lane]]
+            heads[name][lane] += 1
+            vtimes[name] += est / weights[name]
+            start = heapq.heappop(slots)
+            heapq.heappush(slots, start + est)
+            if name == user:
+                if not seen_mine:
+                    out.wait_sec = start
+                    seen_mine = True
+                out.finish_sec = max(out.finish_sec, start + est)
+                left -= 1
+            elif not seen_mine:
+                out.ahead += 1
+        return out
+
+    def snapshot(self) -> List[Dict[str, object]]:
+        with self._cond:
+            return [
+                {
+                    "user": name or "(none)",
+                    "weight": s.weight,
+                    **{lane: sum(1 for t in q if not t.future.cancelled()) for lane, q in s.lanes.items()},
+                    "running": len(s.running),
+                }
+                for name, s in sorted(self._users.items())
+                if s.queued() or s.running
+            ]
+
+_scheduler: Optional[FairScheduler] = None
+_lock = threading.Lock()
+
+def get_scheduler() -> FairScheduler:
+    """
+    The process-wide scheduler, with one worker per request the API key pools
+    can run at once (at least SYNTH_WORKERS), sized when first used.
+    """
+    global _scheduler
+    with _lock:
+        if _scheduler is None:
+            _scheduler = FairScheduler(worker_capacity())
+        return _scheduler
@@ -0,0 +1,104 @@
+import threading
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Callable, Dict, Optional
+
+from .config import HEDGE_BUDGET_BURST, HEDGE_BUDGET_RATIO, HEDGE_QUANTILE
+from .key_pool import worker_capacity
+from .latency import get_latency
+from .telemetry import submit_in_context
+
+# =============================
+# HEDGED REQUESTS
+# =============================
+#
+# When a request has been outstanding longer than the provider's recent p95,
+# fire one duplicate and take whichever answers first. Duplicates are paid
+# for out of a token budget refilled by a fixed fraction of all requests,
+# so hedging can never more than (1 + ratio)x the provider bill.
+
+class HedgeBudget:
+    def __init__(self, ratio: float = HEDGE_BUDGET_RATIO, burst: float = HEDGE_BUDGET_BURST):
+        self.ratio = ratio
+        self.burst = burst
+        self._tokens = burst
+        self._lock = threading.Lock()
+
+    def on_request(self) -> None:
+        with self._lock:
+            self._tokens = min(self.burst, self._tokens + self.ratio)
+
+    def try_spend(self) -> bool:
+        with self._lock:
+            if self._tokens >= 1.0:
+                self._tokens -= 1.0
+                return True
+            return False
+
+_budget = HedgeBudget()
+_stats_lock = threading.Lock()
+_stats: Dict[str, Dict[str, int]] = {}
+
+# hedged attempts run here, never on the synth pool the caller is occupying
+_pool: Optional[ThreadPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+def _hedge_pool() -> ThreadPoolExecutor:
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ThreadPoolExecutor(max_workers=worker_capacity() * 3, thread_name_prefix="hedge")
+    return _pool
+
+def _bump(provider: str, counter: str) -> None:
+    with _stats_lock:
+        s = _stats.setdefault(provider, {"requests": 0, "hedged": 0, "hedge_wins": 0, "budget_denied": 0})
+        s[counter] += 1
+
+def hedge_stats() -> Dict[str, Dict[str, int]]:
+    with _stats_lock:
+        return {p: dict(s) for p, s in _stats.items()}
+
+def hedged_call(provider: str, attempt: Callable[[], object], ok: Callable[[object], bool]):
+    """
+    Run `attempt()`; if it outlives the provider's p95 latency and the budget
+    allows, run it a second time concurrently. Returns the first result for
+    which `ok(result)` holds, else whatever finished last (or re-raises its error).
+    """
+    _budget.on_request()
+    _bump(provider, "requests")
+
+    threshold = get_latency(provider).percentile(HEDGE_QUANTILE)
+    primary = submit_in_context(_hedge_pool(), attempt)
+    if threshold is None:
+        return primary.result()
+
+    done, _ = wait([primary], timeout=threshold)
+    if done:
+        return primary.result()
+    if not _budget.try_spend():
+        _bump(provider, "budget_denied")
+        return primary.result()
+
+    _bump(provider, "hedged")
+    backup = submit_in_context(_hedge_pool(), attempt)
+    pending = {primary, backup}
+    last_exc: Optional[BaseException] = None
+    last_result = None
+    while pending:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for fut in done:
+            try:
+                result = fut.result()
+            except Exception as e:
+                last_exc = e
+                continue
+            if ok(result):
+                if fut is backup:
+                    _bump(provider, "hedge_wins")
+                # the slower twin finishes in the background and is dropped
+                return result
+            last_result = result
+    if last_result is not None:
+        return last_result
+    raise last_exc
@@ -0,0 +1,192 @@
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Deque, Dict, Iterator, List, Optional, Sequence, Union
+
+from .config import KEY_COOLDOWN_SEC, KEY_MAX_CONCURRENCY, KEY_RATE_WINDOW_SEC, KEY_RECOVER_SUCCESSES, SYNTH_WORKERS
+
+# =============================
+# API KEY POOLS
+# =============================
+#
+# Each provider can hold several API keys (a list in secrets). Every request
+# leases the least-loaded usable key for its duration, so concurrency is
+# spread across keys and scales past one plan's ceiling. Responses are
+# reported back against the key that made them:
+#   401 / 402 / 403 -> key ejected (revoked, out of quota, wrong workspace)
+#   429             -> key cools down and its concurrency limit drops by one
+#   200             -> every KEY_RECOVER_SUCCESSES in a row win one step of the limit back
+# All keys must see the same voices (same workspace, or premade voices only).
+
+# statuses that mean "this key is done", not "this request or the provider is bad"
+_EJECT_STATUS = {401, 402, 403}
+_RATE_LIMITED = 429
+
+class NoKeysAvailable(Exception):
+    """No usable key: none configured, or every one has been ejected."""
+
+class _KeyState:
+    def __init__(self, key: str):
+        self.key = key
+        self.in_flight = 0
+        self.limit = KEY_MAX_CONCURRENCY
+        self.cooling_until = 0.0
+        self.ejected: Optional[str] = None
+        self.requests = 0
+        self.failures = 0
+        self.streak = 0                       # successes since the last 429
+        self.recent: Deque[float] = deque()   # request start times inside KEY_RATE_WINDOW_SEC
+
+    def usable(self, now: float) -> bool:
+        return self.ejected is None and now >= self.cooling_until and self.in_flight < self.limit
+
+class KeyLease:
+    """One request's hold on a key; `report` tells the pool how the key fared."""
+
+    def __init__(self, pool: "KeyPool", state: _KeyState):
+        self._pool = pool
+        self._state = state
+        self.key = state.key
+
+    def report(self, status: int) -> bool:
+        """
+        Account the response to this key. Returns True when the failure was the
+        key's own (it was ejected or cooled) and other keys can still serve.
+        """
+        return self._pool._report(self._state, status)
+
+class KeyPool:
+    def __init__(self, provider: str, keys: Sequence[str] = ()):
+        self.provider = provider
+        self._cond = threading.Condition()
+        self._keys: List[_KeyState] = [_KeyState(k) for k in keys]
+        self.waits = 0
+
+    def set_keys(self, keys: Sequence[str]) -> None:
+        """Replace the key list, keeping the accounting of keys that stay."""
+        with self._cond:
+            old = {s.key: s for s in self._keys}
+            self._keys = [old.get(k) or _KeyState(k) for k in keys]
+            self._cond.notify_all()
+
+    def configured(self) -> bool:
+        with self._cond:
+            return bool(self._keys)
+
+    def primary(self) -> str:
+        """A usable key for one-off calls (voice catalog lookups); "" if none."""
+        with self._cond:
+            for s in self._keys:
+                if s.ejected is None:
+                    return s.key
+            return ""
+
+    def capacity(self) -> int:
+        with self._cond:
+            return sum(s.limit for s in self._keys if s.ejected is None)
+
+    @contextmanager
+    def lease(self) -> Iterator[KeyLease]:
+        """Hold the least-loaded usable key; waits while every key is at its limit or cooling."""
+        with self._cond:
+            waited = False
+            while True:
+                if not self._keys:
+                    raise NoKeysAvailable(f"no {self.provider} API key configured in secrets")
+                live = [s for s in self._keys if s.ejected is None]
+                if not live:
+                    raise NoKeysAvailable(f"every {self.provider} API key has been ejected (auth or quota errors)")
+                now = time.monotonic()
+                usable = [s for s in live if s.usable(now)]
+                if usable:
+                    state = min(usable, key=lambda s: (s.in_flight / s.limit, len(s.recent)))
+                    break
+                if not waited:
+                    self.waits += 1
+                    waited = True
+                # wake on a release, or when the first cooling key comes back
+                cooling = [s.cooling_until - now for s in live if s.cooling_until > now]
+                self._cond.wait(timeout=min(cooling) if cooling else None)
+            state.in_flight += 1
+            state.requests += 1
+            state.recent.append(now)
+            while state.recent and state.recent[0] < now - KEY_RATE_WINDOW_SEC:
+                state.recent.popleft()
+        try:
+            yield KeyLease(self, state)
+        finally:
+            with self._cond:
+                state.in_flight -= 1
+                self._cond.notify_all()
+
+    def _report(self, state: _KeyState, status: int) -> bool:
+        with self._cond:
+            if status == 200:
+                state.streak += 1
+                if state.limit < KEY_MAX_CONCURRENCY and state.streak >= KEY_RECOVER_SUCCESSES:
+                    # a 429 may have been a burst, not the plan's ceiling; probe one step up
+                    state.limit += 1
+                    state.streak = 0
+                    self._cond.notify_all()
+                return False
+            state.failures += 1
+            if status in _EJECT_STATUS:
+                state.ejected = f"HTTP {status}"
+            elif status == _RATE_LIMITED:
+                # the plan's ceiling is below our limit; learn it
+                state.limit = max(1, min(state.limit, state.in_flight) - 1)
+                state.streak = 0
+                state.cooling_until = time.monotonic() + KEY_COOLDOWN_SEC
+            else:
+                return False
+            self._cond.notify_all()
+            # only another key that can take requests soon makes this the key's problem
+            now = time.monotonic()
+            return any(s is not state and s.ejected is None and s.cooling_until <= now for s in self._keys)
+
+    def snapshot(self) -> List[Dict[str, object]]:
+        now = time.monotonic()
+        with self._cond:
+            return [
+                {
+                    "key": "…" + s.key[-4:],
+                    "state": "ejected" if s.ejected else ("cooling" if s.cooling_until > now else "ok"),
+                    "in flight": s.in_flight,
+                    "limit": s.limit,
+                    "requests": s.requests,
+                    "req / min": sum(1 for t in s.recent if t >= now - KEY_RATE_WINDOW_SEC) * 60 / KEY_RATE_WINDOW_SEC,
+                    "failures": s.failures,
+                    "ejected for": s.ejected or "",
+                }
+                for s in self._keys
+            ]
+
+_pools: Dict[str, KeyPool] = {}
+_lock = threading.Lock()
+
+def get_key_pool(provider: str) -> KeyPool:
+    with _lock:
+        p = _pools.get(provider)
+        if p is None:
+            p = _pools[provider] = KeyPool(provider)
+        return p
+
+def all_key_pools() -> Dict[str, KeyPool]:
+    with _lock:
+        return dict(_pools)
+
+def worker_capacity() -> int:
+    """Concurrent requests worth running: every pool's combined key limits, at least SYNTH_WORKERS."""
+    return max(SYNTH_WORKERS, sum(p.capacity() for p in all_key_pools().values()))
+
+def parse_keys(value: Union[str, Sequence[str], None]) -> List[str]:
+    """A secrets value that is one key, a comma-separated string, or a list of keys."""
+    if not value:
+        return []
+    items = value.split(",") if isinstance(value, str) else list(value)
+    out: List[str] = []
+    for k in (str(i).strip() for i in items):
+        if k and k not in out:
+            out.append(k)
+    return out
@@ -0,0 +1,81 @@
+import bisect
+import math
+import threading
+from collections import deque
+from typing import Deque, Dict, List, Optional
+
+# =============================
+# PER-PROVIDER LATENCY HISTOGRAMS
+# =============================
+#
+# Log-spaced buckets over a rolling window of recent requests, so the
+# percentiles follow a provider that gets slower (or recovers) during the day.
+
+_BUCKET_MIN_SEC = 0.05
+_BUCKET_MAX_SEC = 120.0
+_BUCKETS_PER_DOUBLING = 8
+WINDOW = 1000
+MIN_SAMPLES = 10
+
+def _bucket_bounds() -> List[float]:
+    n = int(math.ceil(math.log2(_BUCKET_MAX_SEC / _BUCKET_MIN_SEC) * _BUCKETS_PER_DOUBLING))
+    return [_BUCKET_MIN_SEC * 2 ** (i / _BUCKETS_PER_DOUBLING) for i in range(n + 1)]
+
+_BOUNDS = _bucket_bounds()
+
+class LatencyHistogram:
+    def __init__(self, window: int = WINDOW):
+        self._lock = threading.Lock()
+        self._window: Deque[int] = deque()
+        self._maxlen = window
+        self._counts = [0] * (len(_BOUNDS) + 1)
+        self.total = 0
+
+    def record(self, seconds: float) -> None:
+        b = bisect.bisect_left(_BOUNDS, seconds)
+        with self._lock:
+            self._window.append(b)
+            self._counts[b] += 1
+            self.total += 1
+            if len(self._window) > self._maxlen:
+                self._counts[self._window.popleft()] -= 1
+
+    def count(self) -> int:
+        with self._lock:
+            return len(self._window)
+
+    def percentile(self, q: float, min_samples: int = MIN_SAMPLES) -> Optional[float]:
+        """Upper bound (seconds) of the bucket holding the q-quantile; None until enough samples."""
+        with self._lock:
+            n = len(self._window)
+            if n < max(1, min_samples):
+                return None
+            target = q * n
+            seen = 0
+            for b, c in enumerate(self._counts):
+                seen += c
+                if seen >= target and c:
+                    return _BOUNDS[min(b, len(_BOUNDS) - 1)]
+        return _BOUNDS[-1]
+
+    def snapshot(self) -> Dict[str, Optional[float]]:
+        return {
+            "samples": self.count(),
+            "p50": self.percentile(0.50, 1),
+            "p95": self.percentile(0.95, 1),
+            "p99": self.percentile(0.99, 1),
+        }
+
+_histograms: Dict[str, LatencyHistogram] = {}
+_hist_lock = threading.Lock()
+
+def get_latency(provider: str) -> LatencyHistogram:
+    with _hist_lock:
+        hist = _histograms.get(provider)
+        if hist is None:
+            hist = _histograms[provider] = LatencyHistogram()
+        return hist
+
+def all_latencies() -> Dict[str, LatencyHistogram]:
+    with _hist_lock:
+        return dict(_histograms)
@@ -0,0 +1,247 @@
+from __future__ import annotations
+
+import io
+import zipfile
+from dataclasses import replace
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple
+
+from .audio_io import wav_bytes
+from .config import DEFAULT_MIX, MixSettings
+from .edl import EditDecisionList, EdlLine, build_edl
+from .plan import CharConfig, PlannedLine
+from .text import safe_filename
+from .variants import VariantSet
+
+if TYPE_CHECKING:
+    from pydub import AudioSegment
+
+# =============================
+# MIXING
+# =============================
+
+def silence(duration_ms: int, mix: MixSettings) -> "AudioSegment":
+    """Silence already in the episode format, so joining it never triggers a pydub conversion."""
+    from pydub import AudioSegment
+
+    return AudioSegment.silent(duration=duration_ms, frame_rate=mix.sample_rate).set_channels(mix.channels)
+
+def finish_clip(audio: "AudioSegment", mix: MixSettings) -> "AudioSegment":
+    """Fades + tail pad for a synthesized clip, applied at placement so remixes can change them."""
+    audio = audio.fade_in(mix.clip_fade_in_ms).fade_out(mix.clip_fade_out_ms)
+    return audio + silence(mix.clip_tail_pad_ms, mix)
+
+class PcmBuffer:
+    """An in-memory Timeline sink; `segment()` hands back what was written."""
+
+    def __init__(self, mix: MixSettings):
+        self.frame_rate = mix.sample_rate
+        self.channels = mix.channels
+        self.frame_width = mix.channels * 2
+        self.frames = 0
+        self._data = bytearray()
+
+    def write(self, raw: bytes) -> None:
+        self._data += raw
+        self.frames += len(raw) // self.frame_width
+
+    def segment(self) -> "AudioSegment":
+        from pydub import AudioSegment
+
+        return AudioSegment(data=bytes(self._data), sample_width=2, frame_rate=self.frame_rate, channels=self.channels)
+
+class Timeline:
+    """
+    Places lines one at a time, frame for frame as appending pydub segments
+    would, but streams what it places to sinks (anything with `write(raw)` and
+    a `frames` count): one for the full mix, one per character stem. Appending
+    segments copies the whole mix on every line; here each frame is written
+    once, and only the last crossfade's worth of the mix is held back for the
+    next line to fade into. Where pydub would refuse a crossfade longer than the
+    mix so far or than the clip, the crossfade is shortened to fit.
+    """
+
+    def __init__(self, mix: MixSettings, sink, stem_sinks: Optional[Dict[str, object]] = None):
+        self.mix = mix
+        self._sink = sink
+        self._stems = stem_sinks or {}
+        self._rate = mix.sample_rate
+        self._fw = mix.channels * 2
+        self._tail = b""          # mix frames not yet written: what the next crossfade may reach into
+        self._keep = int((mix.crossfade_ms + 2) * self._rate / 1000) + 2
+        self.position = 0         # ms, as line start times are reported
+        self._last_speaker = None
+
+    def _ms(self, frames: int) -> int:
+        return round(1000 * frames / self._rate)
+
+    def _silence(self, ms: int) -> bytes:
+        return bytes(int(self._rate * (ms / 1000.0)) * self._fw)
+
+    def _fit(self, audio: "AudioSegment") -> "AudioSegment":
+        if audio.sample_width != 2:
+            audio = audio.set_sample_width(2)
+        if audio.frame_rate != self._rate:
+            audio = audio.set_frame_rate(self._rate)
+        if audio.channels != self.mix.channels:
+            audio = audio.set_channels(self.mix.channels)
+        return audio
+
+    def _join(self, audio: "AudioSegment", crossfade: int) -> None:
+        total = self._sink.frames + len(self._tail) // self._fw
+        length = self._ms(total)
+        # a crossfade never reaches past either side: short lines get a shorter one
+        crossfade = min(crossfade, length, len(audio))
+        if length == 0:
+            # an (all but) empty mix is replaced by the first clip, not joined to it
+            self._tail = audio.raw_data
+        elif not crossfade:
+            self._tail += audio.raw_data
+        else:
+            # the same frames pydub's append would cut from the whole mix, found in the tail
+            cut = int((length - crossfade) * self._rate / 1000) - self._sink.frames
+            end = int(length * self._rate / 1000) - self._sink.frames
+            fade_from = self._tail[cut * self._fw:end * self._fw]
+            fade_from += bytes((end - cut) * self._fw - len(fade_from))
+            xf = audio._spawn(fade_from).fade(to_gain=-120, start=0, end=float("inf"))
+            xf *= audio[:crossfade].fade(from_gain=-120, start=0, end=float("inf"))
+            self._tail = self._tail[:cut * self._fw] + xf.raw_data + audio[crossfade:].raw_data
+        spill = len(self._tail) - self._keep * self._fw
+        if spill > 0:
+            self._sink.write(self._tail[:spill])
+            self._tail = self._tail[spill:]
+
+    def place(self, line: EdlLine, audio: "AudioSegment") -> None:
+        """Lay `line` down with its finished clip; sets line.start_ms / duration_ms."""
+        mix = self.mix
+        speaker = line.speaker
+        audio = self._fit(audio)
+
+        # GAP (consistent, unless the line overrides it)
+        gap = 0
+        if self._last_speaker is not None:
+            gap = mix.gap_same_speaker_ms if self._last_speaker == speaker else mix.gap_speaker_change_ms
+            if line.gap_before_ms is not None:
+                gap = line.gap_before_ms
+
+        if gap > 0:
+            pad = self._silence(gap)
+            self._join(audio._spawn(pad), 0)
+            for stem in self._stems.values():
+                stem.write(pad)
+            self.position += gap
+
+        # FULL MIX
+        self._join(audio, mix.crossfade_ms)
+
+        # STEMS
+        duration = len(audio)
+        line.start_ms, line.duration_ms = self.position, duration
+
+        for stem in self._stems.values():
+            behind = self.position - self._ms(stem.frames)
+            if behind > 0:
+                stem.write(self._silence(behind))
+
+        if speaker in self._stems:
+            self._stems[speaker].write(audio.raw_data)
+        for ch, stem in self._stems.items():
+            if ch != speaker:
+                stem.write(self._silence(duration))
+
+        self.position += duration
+        self._last_speaker = speaker
+
+    def close(self) -> None:
+        """Write out the held-back end of the mix."""
+        self._sink.write(self._tail)
+        self._tail = b""
+
+def render_edl(
+    edl: EditDecisionList,
+    mix: Optional[MixSettings] = None,
+    stems: bool = True,
+) -> Tuple["AudioSegment", Dict[str, "AudioSegment"]]:
+    """
+    Lay the EDL's clips out on one timeline. Returns the full mix and, when
+    `stems` is set, one track per character padded with silence where others speak.
+    `mix` overrides timing only; the episode format is always the EDL's.
+    Each line's start_ms / duration_ms is updated to where it landed.
+    """
+    mix = edl.mix if mix is None else replace(mix, sample_rate=edl.mix.sample_rate, channels=edl.mix.channels)
+    sink = PcmBuffer(mix)
+    stem_sinks = {ch: PcmBuffer(mix) for ch in edl.characters} if stems else {}
+    timeline = Timeline(mix, sink, stem_sinks)
+
+    for line in edl.lines:
+        if line.clip is not None:
+            audio = finish_clip(edl.clips[line.clip], mix)
+        else:  # recorded file
+            audio = edl.takes[line.speaker].take(line.take)
+        timeline.place(line, audio)
+
+    timeline.close()
+    return sink.segment(), {ch: stem.segment() for ch, stem in stem_sinks.items()}
+
+def assemble_episode(
+    planned_lines: List[PlannedLine],
+    job_audio: Dict[tuple, Optional["AudioSegment"]],
+    char_cfgs: Dict[str, CharConfig],
+    characters: List[str],
+    mix: MixSettings = DEFAULT_MIX,
+    stems: bool = True,
+    variants: Optional[Dict[tuple, VariantSet]] = None,
+) -> Tuple["AudioSegment", Dict[str, "AudioSegment"], EditDecisionList]:
+    """Build the render's EDL and mix it. Returns (full mix, stems, EDL)."""
+    edl = build_edl(planned_lines, job_audio, char_cfgs, characters, mix, variants)
+    final_audio, character_tracks = render_edl(edl, stems=stems)
+    return final_audio, character_tracks, edl
+
+# =============================
+# EXPORT
+# =============================
+
+def export_wav_bytes(audio: "AudioSegment") -> bytes:
+    return wav_bytes(audio)
+
+def build_episode_zip(
+    final_audio: "AudioSegment",
+    character_tracks: Dict[str, "AudioSegment"],
+    edl: Optional[EditDecisionList] = None,
+) -> io.BytesIO:
+    """ZIP: full mix + one stem per character, each trimmed/padded to the mix length (+ the EDL)."""
+    from pydub import AudioSegment
+
+    zip_buffer = io.BytesIO()
+    with zipfile.ZipFile(zip_buffer, "w", compression=zipfile.ZIP_DEFLATED) as zf:
+        zf.writestr("vobble_episode_full.wav", export_wav_bytes(final_audio))
+        if edl is not None:
+            zf.writestr("vobble_episode_edl.json", edl.to_json())
+
+        for ch, track in character_tracks.items():
+            if len(track) < len(final_audio):
+                pad = AudioSegment.silent(duration=len(final_audio) - len(track), frame_rate=track.frame_rate)
+                track += pad.set_channels(track.channels)
+            elif len(track) > len(final_audio):
+                track = track[:len(final_audio)]
+
+            zf.writestr(f"stems/{safe_filename(ch)}_stem.wav", export_wav_bytes(track))
+
+    zip_buffer.seek(0)
+    return zip_buffer
+
+def build_episode_zip_files(
+    mix_path: str,
+    stem_paths: Dict[str, str],
+    edl: Optional[EditDecisionList] = None,
+) -> io.BytesIO:
+    """build_episode_zip for WAVs already on disk (stems already fitted to the mix), streamed in from the files."""
+    zip_buffer = io.BytesIO()
+    with zipfile.ZipFile(zip_buffer, "w", compression=zipfile.ZIP_DEFLATED) as zf:
+        zf.write(mix_path, "vobble_episode_full.wav")
+        if edl is not None:
+            zf.writestr("vobble_episode_edl.json", edl.to_json())
+        for ch, path in stem_paths.items():
+            zf.write(path, f"stems/{safe_filename(ch)}_stem.wav")
+
+    zip_buffer.seek(0)
+    return zip_buffer
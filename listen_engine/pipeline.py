@@ -0,0 +1,333 @@
+from __future__ import annotations
+
+import contextvars
+import io
+import os
+import queue
+import tempfile
+import threading
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional
+
+from . import telemetry
+from .audio_io import WavWriter
+from .config import DEFAULT_MIX, PIPELINE_JOBS_AHEAD, PIPELINE_QUEUE_DEPTH, MixSettings
+from .edl import EditDecisionList, EdlBuilder
+from .fair_share import QueueStatus
+from .mix import Timeline, build_episode_zip_files, finish_clip
+from .plan import CharConfig, PlannedLine, SynthJob, synthesize_jobs
+from .text import safe_filename
+
+# =============================
+# STAGED RENDER PIPELINE
+# =============================
+#
+# Generate as one pipeline instead of stages run back to back. Each stage is a
+# thread handing work to the next through a bounded queue; a stage that falls
+# behind blocks the one feeding it rather than letting work pile up:
+#
+#   fetch + decode  the fair-share synthesis workers (decoding runs in the
+#                   worker that fetched the clip); the caller's thread collects
+#                   a line's audio the moment its last request is done
+#   finish          fades + tail pad, line by line in script order, each as
+#                   soon as its job's audio is in
+#   place           finished lines onto a Timeline
+#   write           full mix + stem WAV files in a temp directory
+#
+# Synthesis is held at most PIPELINE_JOBS_AHEAD jobs ahead of the line being
+# finished: requests for later lines are not sent until the finish stage gets
+# closer, so decoded audio waiting for its turn stays bounded. The schedule
+# applies inside that window (longest-first sends the window's longest lines
+# first). What does grow with the script is the EDL's raw clips, which remixes
+# re-assemble from.
+
+_DONE = object()
+
+class _Aborted(Exception):
+    """Another stage failed; this one stops without an error of its own."""
+
+class _Stages:
+    def __init__(self):
+        self.failed = threading.Event()
+        self.error: Optional[BaseException] = None
+        self._threads: List[threading.Thread] = []
+
+    def fail(self, error: BaseException) -> None:
+        if self.error is None and not isinstance(error, _Aborted):
+            self.error = error
+        self.failed.set()
+
+    def start(self, name: str, fn: Callable, *args) -> threading.Thread:
+        ctx = contextvars.copy_context()   # stage threads count into the caller's render
+
+        def run():
+            try:
+                ctx.run(fn, *args)
+            except BaseException as e:
+                self.fail(e)
+
+        thread = threading.Thread(target=run, name=f"render_{name}", daemon=True)
+        thread.start()
+        self._threads.append(thread)
+        return thread
+
+    def put(self, q: queue.Queue, item) -> None:
+        """Blocking put that gives up once any stage has failed, so nothing waits forever."""
+        while not self.failed.is_set():
+            try:
+                q.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                pass
+        raise _Aborted()
+
+    def get(self, q: queue.Queue):
+        while not self.failed.is_set():
+            try:
+                return q.get(timeout=0.1)
+            except queue.Empty:
+                pass
+        raise _Aborted()
+
+    def join(self) -> None:
+        for thread in self._threads:
+            thread.join()
+        if self.error is not None:
+            raise self.error
+
+class _QueuedSink:
+    """A Timeline sink that hands its blocks to the writer stage; frames are counted as they are queued."""
+
+    def __init__(self, writer: WavWriter, writes: queue.Queue, stages: _Stages):
+        self.writer = writer
+        self.frames = 0
+        self._writes = writes
+        self._stages = stages
+
+    def write(self, raw: bytes) -> None:
+        if raw:
+            self.frames += len(raw) // self.writer.frame_width
+            self._stages.put(self._writes, (self.writer, raw))
+
+class _Arrivals:
+    """
+    Each job's audio as synthesis hands it over, for the finish stage to take
+    in script order; also the window that keeps synthesis from running ahead.
+    """
+
+    def __init__(self, stages: _Stages, jobs: Dict[tuple, SynthJob]):
+        self._cond = threading.Condition()
+        self._jobs: Dict[tuple, tuple] = {}
+        self._closed = False
+        self._stages = stages
+        self._positions = {key: i for i, key in enumerate(jobs)}
+        self._needed = 0      # position of the furthest job the finish stage has asked for
+        self._granted = 0
+
+    def window(self, block: bool) -> int:
+        """How many jobs synthesis may have sent; with `block`, waits until that is more than last time."""
+        with self._cond:
+            while block and self._needed + PIPELINE_JOBS_AHEAD <= self._granted:
+                if self._stages.failed.is_set():
+                    raise _Aborted()
+                self._cond.wait(timeout=0.1)
+            self._granted = self._needed + PIPELINE_JOBS_AHEAD
+            return self._granted
+
+    def put(self, key: tuple, audio, variants) -> None:
+        if self._stages.failed.is_set():
+            raise _Aborted()   # stops synthesize_jobs, which cancels what is still queued
+        with self._cond:
+            self._jobs[key] = (audio, variants)
+            self._cond.notify_all()
+
+    def close(self) -> None:
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    def take(self, key: tuple, last: bool) -> tuple:
+        with self._cond:
+            if self._positions[key] > self._needed:
+                self._needed = self._positions[key]
+                self._cond.notify_all()
+            while key not in self._jobs:
+                if self._stages.failed.is_set():
+                    raise _Aborted()
+                if self._closed:
+                    raise RuntimeError(f"synthesis finished without a result for job {key[1][:40]!r}")
+                self._cond.wait(timeout=0.1)
+            return self._jobs.pop(key) if last else self._jobs[key]
+
+def _finish_stage(
+    stages: _Stages,
+    arrivals: _Arrivals,
+    finished: queue.Queue,
+    planned_lines: List[PlannedLine],
+    mix: MixSettings,
+) -> None:
+    # a repeated line's finished clip is kept until its last use
+    clips: Dict[tuple, object] = {}
+    uses = Counter(line.job_key for line in planned_lines if line.job_key is not None)
+
+    for line in planned_lines:
+        if line.job_key is None:  # recorded file
+            stages.put(finished, (line, None, None, None))
+            continue
+        uses[line.job_key] -= 1
+        last = not uses[line.job_key]
+        audio, variants = arrivals.take(line.job_key, last)
+        if line.job_key not in clips:
+            clips[line.job_key] = finish_clip(audio, mix) if audio else None
+        clip = clips.pop(line.job_key) if last else clips[line.job_key]
+        stages.put(finished, (line, audio, variants, clip))
+    stages.put(finished, _DONE)
+
+def _place_stage(stages: _Stages, finished: queue.Queue, builder: EdlBuilder, timeline: Timeline) -> None:
+    while True:
+        item = stages.get(finished)
+        if item is _DONE:
+            break
+        line, audio, variants, clip = item
+        if line.job_key is None:  # recorded file
+            entry = builder.add(line)
+            if entry is not None:
+                timeline.place(entry, builder.edl.takes[line.speaker].take(entry.take))
+            continue
+        entry = builder.add(line, audio, variants)
+        if entry is not None:
+            timeline.place(entry, clip)
+
+    timeline.close()
+
+def _write_stage(stages: _Stages, writes: queue.Queue) -> None:
+    while True:
+        item = stages.get(writes)
+        if item is _DONE:
+            return
+        writer, raw = item
+        writer.write(raw)
+
+def _fit_stem(stem: WavWriter, mix_ms: int) -> None:
+    """Pad or trim a stem to the mix length, by the same ms arithmetic build_episode_zip uses."""
+    stem_ms = round(1000 * stem.frames / stem.frame_rate)
+    if stem_ms < mix_ms:
+        stem.write(bytes(int(stem.frame_rate * ((mix_ms - stem_ms) / 1000.0)) * stem.frame_width))
+    elif stem_ms > mix_ms:
+        stem.truncate(int(mix_ms * stem.frame_rate / 1000))
+
+@dataclass
+class EpisodeRender:
+    """A finished render: its EDL, what went wrong, and the mix + stem WAVs on disk until closed."""
+    edl: EditDecisionList
+    errors: List[str]
+    fallbacks: List[tuple]
+    duration_ms: int
+    mix_path: str
+    stem_paths: Dict[str, str] = field(default_factory=dict)
+    _dir: Optional[tempfile.TemporaryDirectory] = None
+
+    def zip(self) -> io.BytesIO:
+        return build_episode_zip_files(self.mix_path, self.stem_paths, self.edl)
+
+    def mix_wav(self) -> bytes:
+        with open(self.mix_path, "rb") as f:
+            return f.read()
+
+    def close(self) -> None:
+        if self._dir is not None:
+            self._dir.cleanup()
+            self._dir = None
+
+    def __enter__(self) -> "EpisodeRender":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+def render_episode(
+    planned_lines: List[PlannedLine],
+    jobs: Dict[tuple, SynthJob],
+    char_cfgs: Dict[str, CharConfig],
+    characters: List[str],
+    mix: MixSettings = DEFAULT_MIX,
+    stems: bool = True,
+    on_progress: Optional[Callable[[int, int], None]] = None,
+    user: str = "",
+    on_queue: Optional[Callable[[QueueStatus], None]] = None,
+) -> EpisodeRender:
+    """
+    Synthesize, fade, place and write the episode as overlapping stages; the
+    result matches synthesize_jobs + assemble_episode + build_episode_zip.
+    Progress and queue callbacks run on the calling thread. Use the result as
+    a context manager (or close it) to delete its WAV files.
+    """
+    workdir = tempfile.TemporaryDirectory(prefix="vobble_render_")
+    stages = _Stages()
+    arrivals = _Arrivals(stages, jobs)
+    finished: queue.Queue = queue.Queue(PIPELINE_QUEUE_DEPTH)
+    writes: queue.Queue = queue.Queue(PIPELINE_QUEUE_DEPTH * 4)
+
+    mix_writer = WavWriter(os.path.join(workdir.name, "mix.wav"), mix.sample_rate, mix.channels)
+    stem_writers = {
+        ch: WavWriter(os.path.join(workdir.name, f"{i}_{safe_filename(ch)}.wav"), mix.sample_rate, mix.channels)
+        for i, ch in enumerate(characters)
+    } if stems else {}
+    timeline = Timeline(
+        mix,
+        _QueuedSink(mix_writer, writes, stages),
+        {ch: _QueuedSink(w, writes, stages) for ch, w in stem_writers.items()},
+    )
+    builder = EdlBuilder(char_cfgs, characters, mix)
+
+    writers = [mix_writer, *stem_writers.values()]
+    try:
+        stages.start("finish", _finish_stage, stages, arrivals, finished, planned_lines, mix)
+        placer = stages.start("place", _place_stage, stages, finished, builder, timeline)
+        stages.start("write", _write_stage, stages, writes)
+
+        start = time.perf_counter()
+        try:
+            _, errors, fallbacks, _ = synthesize_jobs(
+                jobs, char_cfgs, mix,
+                on_progress=on_progress,
+                user=user,
+                on_queue=on_queue,
+                on_job=arrivals.put,
+                window=arrivals.window,
+            )
+        except BaseException as e:
+            stages.fail(e)
+        arrivals.close()
+        synth_done = time.perf_counter()
+
+        # placement ends the mix; once it has, the writer gets its end marker
+        placer.join()
+        if not stages.failed.is_set():
+            stages.put(writes, _DONE)
+        stages.join()
+        # what mixing added after the last line came back (the rest overlapped synthesis)
+        telemetry.set_fields(synth_sec=synth_done - start, mix_sec=time.perf_counter() - synth_done)
+
+        mix_ms = round(1000 * mix_writer.frames / mix.sample_rate)
+        for stem in stem_writers.values():
+            _fit_stem(stem, mix_ms)
+    except BaseException:
+        for w in writers:
+            w.close()
+        workdir.cleanup()
+        raise
+    for w in writers:
+        w.close()
+
+    return EpisodeRender(
+        edl=builder.edl,
+        errors=errors,
+        fallbacks=fallbacks,
+        duration_ms=mix_ms,
+        mix_path=mix_writer.path,
+        stem_paths={ch: w.path for ch, w in stem_writers.items()},
+        _dir=workdir,
+    )
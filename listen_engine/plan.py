@@ -0,0 +1,379 @@
+from __future__ import annotations
+
+import time
+from concurrent.futures import FIRST_COMPLETED, wait
+from dataclasses import dataclass, replace
+from typing import TYPE_CHECKING, Callable, Dict, List, Optional, Tuple
+
+from .config import CHUNK_JOIN_CROSSFADE_MS, DEFAULT_MIX, INTERACTIVE_MAX_REQUESTS, QUEUE_POLL_SEC, MixSettings
+from . import telemetry
+from .fair_share import BATCH, INTERACTIVE, QueueStatus, get_scheduler
+from .schedule import estimate_seconds, order_tasks
+from .providers import (
+    SynthesisError,
+    eleven_clip_key,
+    generate_audio_eleven,
+    generate_audio_hume,
+    hume_clip_key,
+    hume_configured,
+)
+from .text import build_hume_description, chunk_text, ensure_line_tail, normalize_line_text
+from .variants import VariantSet, pick_variant
+
+if TYPE_CHECKING:
+    from pydub import AudioSegment
+
+    from .takes import TakeStore
+
+# =============================
+# CHARACTER CONFIG
+# =============================
+
+@dataclass
+class CharConfig:
+    provider: str  # "eleven" | "hume" | "file"
+    # eleven
+    eleven_voice_id: str = ""
+    eleven_profile: dict = None
+    # hume
+    hume_voice_mode: str = "id"     # "id" | "name"
+    hume_voice_id: str = ""
+    hume_voice_name: str = ""
+    hume_provider: str = "HUME_AI"
+    hume_base_desc: str = ""
+    hume_auto_hints: bool = True
+    # render every repeat of a line separately instead of reusing one take
+    force_variation: bool = False
+    # independent reads per line, scored and auto-picked (the rest kept for a manual swap)
+    variants: int = 1
+    # file
+    file_takes: Optional["TakeStore"] = None
+    take_sequence: List[int] = None
+    # secondary voice used when the primary provider fails or its breaker is open
+    fallback: Optional["CharConfig"] = None
+
+def hume_voice_ref(cfg: CharConfig) -> dict:
+    if cfg.hume_voice_mode == "id":
+        return {"id": cfg.hume_voice_id}
+    return {"name": cfg.hume_voice_name, "provider": cfg.hume_provider}
+
+def _voice_signature(cfg: CharConfig) -> tuple:
+    if cfg.provider == "eleven":
+        return ("eleven", cfg.eleven_voice_id, tuple(sorted((cfg.eleven_profile or {}).items())))
+    if cfg.provider == "hume":
+        return ("hume", tuple(sorted(hume_voice_ref(cfg).items())), cfg.hume_base_desc, cfg.hume_auto_hints)
+    return ("file",)
+
+def speaker_signature(cfg: CharConfig) -> tuple:
+    """Everything in a character config that changes the synthesized audio: voice, variants, fallback voice."""
+    if cfg.provider == "file":
+        return ("file",)
+    fallback = _voice_signature(cfg.fallback) if cfg.fallback is not None else None
+    return _voice_signature(cfg) + (max(1, cfg.variants), fallback)
+
+def config_complete(cfg: CharConfig) -> bool:
+    if cfg.provider == "eleven":
+        return bool(cfg.eleven_voice_id)
+    if cfg.provider == "hume":
+        if not hume_configured():
+            return False
+        return bool(cfg.hume_voice_id if cfg.hume_voice_mode == "id" else cfg.hume_voice_name)
+    return False
+
+# =============================
+# RENDER PLAN
+# =============================
+
+@dataclass
+class PlannedLine:
+    speaker: str
+    text: str
+    job_key: Optional[tuple] = None  # None -> recorded file take
+
+@dataclass
+class SynthJob:
+    speaker: str
+    text: str
+    variation: int = 0
+    occurrences: int = 0
+    variant: int = 0  # which of the character's parallel reads this is
+
+def plan_render(parsed_items: List[Tuple[str, str]], char_cfgs: Dict[str, CharConfig]) -> Tuple[List[PlannedLine], Dict[tuple, SynthJob]]:
+    """
+    Collapse identical (speaker config, normalized text) lines into one synthesis
+    job each. Characters with force_variation get a job per occurrence instead.
+    """
+    lines: List[PlannedLine] = []
+    jobs: Dict[tuple, SynthJob] = {}
+    occurrence: Dict[tuple, int] = {}
+
+    for speaker, dialogue in parsed_items:
+        cfg = char_cfgs.get(speaker)
+        if cfg is None:
+            continue
+        if cfg.provider == "file":
+            lines.append(PlannedLine(speaker, dialogue))
+            continue
+
+        text = normalize_line_text(dialogue)
+        base = (speaker_signature(cfg), text)
+        variation = 0
+        if cfg.force_variation:
+            variation = occurrence.get(base, 0)
+            occurrence[base] = variation + 1
+        key = base + (variation,)
+
+        job = jobs.get(key)
+        if job is None:
+            job = jobs[key] = SynthJob(speaker=speaker, text=text, variation=variation)
+        job.occurrences += 1
+        lines.append(PlannedLine(speaker, dialogue, job_key=key))
+
+    return lines, jobs
+
+def plan_summary(parsed_items: List[Tuple[str, str]], char_cfgs: Dict[str, CharConfig], jobs: Dict[tuple, SynthJob]) -> dict:
+    """Size of a render, for the telemetry log."""
+    provider_mix: Dict[str, int] = {}
+    for speaker, _ in parsed_items:
+        cfg = char_cfgs.get(speaker)
+        if cfg is not None:
+            provider_mix[cfg.provider] = provider_mix.get(cfg.provider, 0) + 1
+    return {
+        "script_chars": sum(len(text) for _, text in parsed_items),
+        "lines": len(parsed_items),
+        "characters": len({speaker for speaker, _ in parsed_items}),
+        "unique_jobs": len(jobs),
+        "provider_mix": provider_mix,
+    }
+
+# =============================
+# SYNTHESIS
+# =============================
+
+def synth_workers() -> int:
+    """Requests the shared pool runs at once (split between users by fair share)."""
+    return get_scheduler().workers
+
+def synthesize_job(job: SynthJob, cfg: CharConfig, mix: MixSettings = DEFAULT_MIX) -> Optional["AudioSegment"]:
+    if cfg.provider == "eleven":
+        return generate_audio_eleven(
+            job.text, cfg.eleven_voice_id, cfg.eleven_profile, variation=job.variation, mix=mix, variant=job.variant,
+        )
+    desc = build_hume_description(cfg.hume_base_desc, job.text, cfg.hume_auto_hints)
+    return generate_audio_hume(
+        job.text, hume_voice_ref(cfg), desc, variation=job.variation, mix=mix,
+        variant=job.variant, generations=cfg.variants,
+    )
+
+def job_clip_key(job: SynthJob, cfg: CharConfig, mix: MixSettings = DEFAULT_MIX) -> str:
+    """The clip store key synthesize_job will render `job` under (for one read, or the Hume batch)."""
+    if cfg.provider == "eleven":
+        return eleven_clip_key(
+            ensure_line_tail(job.text), cfg.eleven_voice_id, cfg.eleven_profile, job.variation, mix, job.variant,
+        )
+    desc = build_hume_description(cfg.hume_base_desc, job.text, cfg.hume_auto_hints)
+    return hume_clip_key(job.text, hume_voice_ref(cfg), desc, job.variation, mix, cfg.variants)
+
+def voice_identity(cfg: CharConfig) -> tuple:
+    """The voice a config renders with, as the speed model keys it."""
+    if cfg.provider == "eleven":
+        return cfg.eleven_voice_id
+    return tuple(sorted(hume_voice_ref(cfg).items()))
+
+def job_chunks(job: SynthJob, mix: MixSettings = DEFAULT_MIX) -> List[SynthJob]:
+    """One request per chunk of a long line; short lines are a single chunk. Each chunk is cached on its own."""
+    parts = chunk_text(job.text, mix.chunk_max_chars)
+    if len(parts) <= 1:
+        return [job]
+    return [replace(job, text=part) for part in parts]
+
+def job_variants(job: SynthJob, cfg: CharConfig) -> List[SynthJob]:
+    """
+    One job per parallel read. Hume variants all resolve to a single
+    num_generations request; ElevenLabs variants are separate calls.
+    """
+    return [replace(job, variant=v) for v in range(max(1, cfg.variants))]
+
+def stitch_chunks(clips: List["AudioSegment"]) -> "AudioSegment":
+    """Join a long line's chunk clips back into one clip, with a few ms of crossfade at each seam."""
+    out = clips[0]
+    for clip in clips[1:]:
+        out = out.append(clip, crossfade=min(CHUNK_JOIN_CROSSFADE_MS, len(out), len(clip)))
+    return out
+
+def synthesize_with_fallback(job: SynthJob, cfg: CharConfig, mix: MixSettings = DEFAULT_MIX) -> Tuple[Optional["AudioSegment"], bool]:
+    """
+    Render with the primary voice; if it errors, comes back empty, or its
+    provider's breaker is open, render with cfg.fallback instead.
+    Returns (audio, used_fallback).
+    """
+    fallback = cfg.fallback if cfg.fallback is not None and config_complete(cfg.fallback) else None
+    if fallback is not None:
+        # the fallback renders the same reads: a Hume fallback batches all of them, not one
+        fallback = replace(fallback, variants=cfg.variants)
+    try:
+        audio = synthesize_job(job, cfg, mix)
+    except SynthesisError:
+        if fallback is None:
+            raise
+        audio = None
+    if audio is not None or fallback is None:
+        return audio, False
+    return synthesize_job(job, fallback, mix), True
+
+def synthesize_jobs(
+    jobs: Dict[tuple, SynthJob],
+    char_cfgs: Dict[str, CharConfig],
+    mix: MixSettings = DEFAULT_MIX,
+    on_progress: Optional[Callable[[int, int], None]] = None,
+    user: str = "",
+    lane: Optional[str] = None,
+    on_queue: Optional[Callable[[QueueStatus], None]] = None,
+    on_job: Optional[Callable[[tuple, Optional["AudioSegment"], Optional[VariantSet]], None]] = None,
+    window: Optional[Callable[[bool], int]] = None,
+) -> Tuple[Dict[tuple, Optional["AudioSegment"]], List[str], List[tuple], Dict[tuple, VariantSet]]:
+    """
+    Run every job on the shared pool, queued under `user` for fair share. The
+    lane defaults to interactive for renders of a few requests, batch otherwise.
+    While requests are still waiting, on_queue gets the user's queue status
+    every QUEUE_POLL_SEC. Lines already in the clip store (or being rendered by
+    another session / speculative run) come back without a new request.
+    on_job(key, audio, scored reads) is called once per job, as soon as all of
+    its requests are done (audio None if it failed), so later stages can start.
+    window(block) bounds how far ahead synthesis runs: it returns how many jobs,
+    in the order of `jobs`, may have requests out so far, and is called with
+    True (to wait for that number to grow) only when nothing is in flight.
+    Returns (audio per job key, provider error messages, job keys rendered by a
+    fallback voice, scored reads per job key for characters with variants > 1).
+    """
+    job_audio: Dict[tuple, Optional["AudioSegment"]] = dict.fromkeys(jobs)
+    errors: List[str] = []
+    fallbacks: List[tuple] = []
+    job_variant_sets: Dict[tuple, VariantSet] = {}
+    # long lines fan out into chunks, and each chunk into the character's
+    # variants, on the same pool; a read is done when all its chunks are
+    chunk_audio: Dict[tuple, List[List[Optional["AudioSegment"]]]] = {}
+    chunk_fallback: Dict[tuple, bool] = {}
+    left: Dict[tuple, int] = {}
+    tasks = []
+    for position, (key, job) in enumerate(jobs.items()):
+        cfg = char_cfgs[job.speaker]
+        chunks = job_chunks(job, mix)
+        n_variants = max(1, cfg.variants)
+        chunk_audio[key] = [[None] * len(chunks) for _ in range(n_variants)]
+        for i, chunk in enumerate(chunks):
+            estimate = estimate_seconds(cfg.provider, voice_identity(cfg), len(chunk.text))
+            for variant in job_variants(chunk, cfg):
+                tasks.append(((key, variant, i, cfg, estimate, position), position, estimate))
+        left[key] = len(chunks) * n_variants
+
+    # a user's requests start in submission order, so the order here is the render's schedule
+    scheduler = get_scheduler()
+    if lane is None:
+        lane = INTERACTIVE if len(tasks) <= INTERACTIVE_MAX_REQUESTS else BATCH
+    submitted = time.monotonic()
+    pending = {}
+    unsent = order_tasks(tasks, mix.schedule)
+
+    def submit(block: bool = False) -> set:
+        """Send every unsent request the window admits, in schedule order; the rest wait."""
+        nonlocal unsent
+        limit = window(block) if window is not None else len(jobs)
+        sent, held = set(), []
+        for item in unsent:
+            key, variant, i, cfg, estimate, position = item
+            if position >= limit:
+                held.append(item)
+                continue
+            fut = scheduler.submit(user, lane, estimate, synthesize_with_fallback, variant, cfg, mix)
+            pending[fut] = (key, variant.variant, i)
+            sent.add(fut)
+        unsent = held
+        return sent
+
+    # time to the opening line: what a preview listener waits for
+    telemetry.set_fields(schedule=mix.schedule, lane=lane)
+    start = time.perf_counter()
+    first_key = next(iter(jobs), None)
+
+    def finish_job(key: tuple) -> None:
+        reads = chunk_audio.pop(key)
+        # a read with any missing chunk is dropped whole rather than played with a hole in it
+        complete = [stitch_chunks(clips) for clips in reads if all(c is not None for c in clips)]
+        if complete:
+            if len(reads) > 1:
+                job_variant_sets[key] = pick_variant(complete)
+                job_audio[key] = job_variant_sets[key].chosen
+            else:
+                job_audio[key] = complete[0]
+            if chunk_fallback.get(key):
+                fallbacks.append(key)
+        if key == first_key:
+            telemetry.set_fields(first_line_sec=time.perf_counter() - start)
+        if on_job:
+            on_job(key, job_audio[key], job_variant_sets.get(key))
+
+    n = 0
+    remaining = set()
+    try:
+        remaining = submit()
+        while remaining or unsent:
+            if not remaining:
+                remaining = submit(block=True)
+                continue
+            done, remaining = wait(remaining, timeout=QUEUE_POLL_SEC, return_when=FIRST_COMPLETED)
+            for fut in done:
+                n += 1
+                key, v, i = pending[fut]
+                try:
+                    chunk_audio[key][v][i], used_fallback = fut.result()
+                    if used_fallback:
+                        chunk_fallback[key] = True
+                except SynthesisError as e:
+                    # an open breaker fails every remaining line the same way; report it once
+                    if str(e) not in errors:
+                        errors.append(str(e))
+                left[key] -= 1
+                if not left[key]:
+                    finish_job(key)
+                if on_progress:
+                    on_progress(n, len(tasks))
+            if unsent:
+                remaining |= submit()
+            if on_queue and any(fut.started is None for fut in remaining):
+                on_queue(scheduler.status(user))
+    except BaseException:
+        # a callback failed or the render was stopped: don't leave its requests queued
+        for fut in remaining:
+            fut.cancel()
+        raise
+
+    # how long the render waited behind other users' requests before its first one ran
+    started = [fut.started for fut in pending if fut.started is not None]
+    if started:
+        telemetry.set_fields(queue_wait_sec=min(started) - submitted)
+
+    telemetry.count("errors", len(errors))
+    telemetry.count("fallbacks", len(fallbacks))
+    return job_audio, errors, fallbacks, job_variant_sets
+
+def audition_line(
+    parsed_items: List[Tuple[str, str]],
+    index: int,
+    char_cfgs: Dict[str, CharConfig],
+    mix: MixSettings = DEFAULT_MIX,
+    user: str = "",
+) -> Tuple[Optional["AudioSegment"], List[str], Optional[VariantSet]]:
+    """
+    Synthesize just parsed_items[index] with its speaker's current config.
+    The line is planned exactly as a full render would plan it (same job, same
+    variation for repeats), so the clip lands in the clip store under the key
+    Generate will ask for. It is queued for `user` in the interactive lane.
+    Returns (audio, provider errors, scored reads).
+    """
+    speaker = parsed_items[index][0]
+    cfg = char_cfgs[speaker]
+    planned, jobs = plan_render(parsed_items[:index + 1], {speaker: cfg})
+    key = planned[-1].job_key
+    job_audio, errors, _, variant_sets = synthesize_jobs({key: jobs[key]}, {speaker: cfg}, mix, user=user, lane=INTERACTIVE)
+    return job_audio[key], errors, variant_sets.get(key)
@@ -0,0 +1,150 @@
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, replace
+from typing import Dict, List, Set, Tuple
+
+from .catalog import confirm_eleven_voice, get_catalogs
+from .config import DEFAULT_MIX, ELEVEN_MAX_CHARS, HUME_MAX_CHARS, HUME_MAX_DESC_CHARS, MixSettings
+from .plan import CharConfig
+from .providers import hume_configured
+from .text import build_hume_description, chunk_text, ensure_line_tail, normalize_line_text
+
+# =============================
+# PRE-FLIGHT VALIDATION
+# =============================
+
+@dataclass
+class PreflightIssue:
+    character: str
+    message: str
+    blocking: bool = True
+
+def _config_issues(ch: str, cfg: CharConfig) -> List[PreflightIssue]:
+    if cfg.provider == "eleven":
+        if not cfg.eleven_voice_id:
+            return [PreflightIssue(ch, f"Please enter ElevenLabs Voice ID for {ch}")]
+    elif cfg.provider == "hume":
+        if not hume_configured():
+            return [PreflightIssue(ch, "HUME_API_KEY missing in secrets.")]
+        if cfg.hume_voice_mode == "id" and not cfg.hume_voice_id:
+            return [PreflightIssue(ch, f"Please enter Hume voice id for {ch}")]
+        if cfg.hume_voice_mode == "name" and not cfg.hume_voice_name:
+            return [PreflightIssue(ch, f"Please enter Hume voice name for {ch}")]
+    elif cfg.provider == "file":
+        issues = []
+        if not cfg.file_takes:
+            issues.append(PreflightIssue(ch, f"Upload recorded audio file (with takes) for {ch}"))
+        if not cfg.take_sequence:
+            issues.append(PreflightIssue(ch, f"Provide take sequence for {ch} (e.g., 1,3,2,1,2)"))
+        return issues
+    return []
+
+def _length_issues(ch: str, cfg: CharConfig, lines: List[str], chunk_max_chars: int) -> List[PreflightIssue]:
+    # limits apply per request, i.e. per chunk of a long line
+    lines = [c for t in lines for c in chunk_text(normalize_line_text(t), chunk_max_chars)]
+    if cfg.provider == "eleven":
+        limit = ELEVEN_MAX_CHARS
+        too_long = [t for t in lines if len(ensure_line_tail(t)) > limit]
+    elif cfg.provider == "hume":
+        limit = HUME_MAX_CHARS
+        too_long = [t for t in lines if len(t) > limit]
+        descs = {build_hume_description(cfg.hume_base_desc, t, cfg.hume_auto_hints) for t in lines}
+        if any(len(d) > HUME_MAX_DESC_CHARS for d in descs):
+            return [PreflightIssue(ch, f"Hume description for {ch} is over {HUME_MAX_DESC_CHARS} characters.")]
+    else:
+        return []
+    if not too_long:
+        return []
+    preview = too_long[0][:60]
+    return [PreflightIssue(
+        ch,
+        f"{len(too_long)} line(s) for {ch} exceed the {limit}-character request limit (e.g. \"{preview}…\").",
+    )]
+
+def _voice_issues(char_cfgs: Dict[str, CharConfig]) -> List[PreflightIssue]:
+    providers: Set[str] = {cfg.provider for cfg in char_cfgs.values() if cfg.provider in ("eleven", "hume")}
+    if not providers:
+        return []
+    catalogs = get_catalogs(providers)
+    issues: List[PreflightIssue] = []
+
+    for p, cat in catalogs.items():
+        if cat is None:
+            name = "ElevenLabs" if p == "eleven" else "Hume"
+            issues.append(PreflightIssue("", f"Could not load the {name} voice list; voices were not checked.", blocking=False))
+
+    eleven = catalogs.get("eleven")
+    if eleven is not None:
+        to_check: List[Tuple[str, str]] = [
+            (ch, cfg.eleven_voice_id) for ch, cfg in char_cfgs.items()
+            if cfg.provider == "eleven" and cfg.eleven_voice_id
+        ]
+        unknown = [(ch, vid) for ch, vid in to_check if vid not in eleven.ids]
+        if unknown:
+            with ThreadPoolExecutor(max_workers=min(8, len(unknown))) as pool:
+                found = list(pool.map(lambda item: confirm_eleven_voice(eleven, item[1]), unknown))
+            for (ch, vid), ok in zip(unknown, found):
+                if not ok:
+                    issues.append(PreflightIssue(ch, f"ElevenLabs voice ID '{vid}' for {ch} was not found."))
+
+    hume = catalogs.get("hume")
+    if hume is not None:
+        for ch, cfg in char_cfgs.items():
+            if cfg.provider != "hume":
+                continue
+            if cfg.hume_voice_mode == "id" and cfg.hume_voice_id and cfg.hume_voice_id not in hume.ids:
+                issues.append(PreflightIssue(ch, f"Hume voice id '{cfg.hume_voice_id}' for {ch} was not found."))
+            if cfg.hume_voice_mode == "name" and cfg.hume_voice_name:
+                if cfg.hume_voice_name not in hume.names.get(cfg.hume_provider, set()):
+                    issues.append(PreflightIssue(
+                        ch, f"Hume voice '{cfg.hume_voice_name}' ({cfg.hume_provider}) for {ch} was not found."
+                    ))
+    return issues
+
+def preflight(
+    parsed_items: List[Tuple[str, str]],
+    characters: List[str],
+    char_cfgs: Dict[str, CharConfig],
+    mix: MixSettings = DEFAULT_MIX,
+) -> List[PreflightIssue]:
+    """
+    Check every character before any synthesis: config completeness, text
+    length limits and (against cached provider catalogs) that each voice exists.
+    Fallback voices get the same checks, as warnings: the primary can still
+    render without them. Returns every problem at once; blocking issues should
+    stop the render.
+    """
+    issues: List[PreflightIssue] = []
+    lines: Dict[str, List[str]] = {}
+    for sp, text in parsed_items:
+        lines.setdefault(sp, []).append(text)
+
+    complete: Dict[str, CharConfig] = {}
+    fallbacks: Set[str] = set()
+    for ch in characters:
+        cfg = char_cfgs.get(ch)
+        if cfg is None:
+            issues.append(PreflightIssue(ch, f"Missing config for {ch}"))
+            continue
+        cfg_issues = _config_issues(ch, cfg)
+        issues.extend(cfg_issues)
+        issues.extend(_length_issues(ch, cfg, lines.get(ch, []), mix.chunk_max_chars))
+        if not cfg_issues:
+            complete[ch] = cfg
+
+        if cfg.fallback is not None:
+            label = f"{ch} (fallback)"
+            fb_issues = _config_issues(label, cfg.fallback)
+            issues.extend(replace(i, blocking=False) for i in fb_issues)
+            issues.extend(
+                replace(i, blocking=False)
+                for i in _length_issues(label, cfg.fallback, lines.get(ch, []), mix.chunk_max_chars)
+            )
+            if not fb_issues:
+                complete[label] = cfg.fallback
+                fallbacks.add(label)
+
+    issues.extend(
+        replace(i, blocking=False) if i.character in fallbacks else i
+        for i in _voice_issues(complete)
+    )
+    return issues
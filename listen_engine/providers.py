@@ -0,0 +1,273 @@
+from __future__ import annotations
+
+import base64
+import threading
+import time
+from typing import TYPE_CHECKING, List, Optional, Sequence, Union
+
+from . import telemetry
+from .audio_io import decode
+from .breaker import get_breaker
+from .clip_store import clip_key, get_clip_store
+from .conform import conform
+from .hedge import hedged_call
+from .key_pool import NoKeysAvailable, get_key_pool, parse_keys, worker_capacity
+from .latency import get_latency
+from .schedule import record_voice_speed
+from .config import (
+    DEFAULT_MIX,
+    ELEVEN_API_BASE,
+    HUME_API_BASE,
+    MODEL_ID,
+    RETRIES,
+    TIMEOUT_SEC,
+    MixSettings,
+)
+from .text import ensure_line_tail
+
+if TYPE_CHECKING:
+    from pydub import AudioSegment
+
+ELEVEN_TTS_URL = ELEVEN_API_BASE + "/v1/text-to-speech/{voice_id}?output_format={output_format}"
+HUME_TTS_URL = HUME_API_BASE + "/v0/tts"
+
+class SynthesisError(Exception):
+    """Provider rejected a line. Raised instead of st.error so worker threads can report it."""
+
+class ProviderUnavailable(SynthesisError):
+    """The provider's circuit breaker is open; the line was not attempted."""
+
+# statuses that say the provider (or our key) is unhealthy, not that the line is bad
+_UNHEALTHY_STATUS = {401, 402, 403, 429}
+
+# =============================
+# KEYS + HTTP CLIENT
+# =============================
+
+_KEY_HEADERS = {"eleven": "xi-api-key", "hume": "X-Hume-Api-Key"}
+
+KeyList = Union[str, Sequence[str]]
+
+def configure(eleven_api_key: KeyList = "", hume_api_key: KeyList = "") -> None:
+    """
+    Set provider keys (the apps call this with values from st.secrets on every
+    run). Each may be a single key or a list; requests are spread over the list.
+    """
+    get_key_pool("eleven").set_keys(parse_keys(eleven_api_key))
+    get_key_pool("hume").set_keys(parse_keys(hume_api_key))
+
+def hume_configured() -> bool:
+    return get_key_pool("hume").configured()
+
+def api_key(provider: str) -> str:
+    return get_key_pool(provider).primary()
+
+_session = None
+_session_lock = threading.Lock()
+
+def http():
+    """One pooled requests.Session per process: keeps TLS connections to the providers warm."""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                import requests
+                from requests.adapters import HTTPAdapter
+
+                s = requests.Session()
+                adapter = HTTPAdapter(pool_connections=4, pool_maxsize=worker_capacity() * 2)
+                s.mount("https://", adapter)
+                _session = s
+    return _session
+
+def _timed_post(provider: str, url: str, payload: dict, headers: dict, token: object = None):
+    """
+    POST with a key leased from the provider's pool, and feed the provider's
+    latency histogram (successes, and timeouts at TIMEOUT_SEC) and its circuit
+    breaker (every outcome, under the breaker's `token` for this call). A
+    rejection that only ejected or cooled one key of several does not count
+    against the provider's breaker.
+    """
+    import requests
+
+    breaker = get_breaker(provider)
+    try:
+        with get_key_pool(provider).lease() as lease:
+            headers = {**headers, _KEY_HEADERS[provider]: lease.key}
+            start = time.monotonic()
+            try:
+                response = http().post(url, json=payload, headers=headers, timeout=TIMEOUT_SEC)
+            except requests.exceptions.Timeout:
+                get_latency(provider).record(TIMEOUT_SEC)
+                breaker.record(failed=True, seconds=TIMEOUT_SEC, token=token)
+                telemetry.record_request(provider, TIMEOUT_SEC, failed=True)
+                raise
+            except requests.exceptions.RequestException:
+                elapsed = time.monotonic() - start
+                breaker.record(failed=True, seconds=elapsed, token=token)
+                telemetry.record_request(provider, elapsed, failed=True)
+                raise
+            elapsed = time.monotonic() - start
+            key_problem = lease.report(response.status_code)
+    except NoKeysAvailable as e:
+        raise ProviderUnavailable(str(e)) from None
+    if response.status_code == 200:
+        get_latency(provider).record(elapsed)
+    failed = response.status_code >= 500 or (response.status_code in _UNHEALTHY_STATUS and not key_problem)
+    breaker.record(failed=failed, seconds=elapsed, token=token)
+    telemetry.record_request(provider, elapsed, failed=failed or response.status_code != 200)
+    return response
+
+def _post_with_retries(provider: str, url: str, payload: dict, headers: dict, require_content: bool, hedge: bool = False):
+    import requests
+
+    def ok(r) -> bool:
+        return r.status_code == 200 and bool(r.content or not require_content)
+
+    breaker = get_breaker(provider)
+    response = None
+    for attempt_no in range(RETRIES):
+        if attempt_no:
+            telemetry.count("retries")
+        token = breaker.allow()
+        if token is None:
+            raise ProviderUnavailable(f"{provider} is failing right now (circuit open); skipped without calling it.")
+
+        def attempt(token=token):
+            return _timed_post(provider, url, payload, headers, token)
+
+        try:
+            response = hedged_call(provider, attempt, ok) if hedge else attempt()
+            if ok(response):
+                break
+        except requests.exceptions.RequestException:
+            continue
+        finally:
+            breaker.release(token)
+    else:
+        return None
+    return response
+
+# =============================
+# AUDIO GENERATION (ElevenLabs)
+# =============================
+
+def generate_audio_eleven(
+    text: str,
+    voice_id: str,
+    voice_settings: dict,
+    variation: int = 0,
+    mix: MixSettings = DEFAULT_MIX,
+    variant: int = 0,
+) -> Optional["AudioSegment"]:
+    """`variant` > 0 asks for another independent read of the same line (ElevenLabs has one per call)."""
+    t = ensure_line_tail(text)
+    if not t:
+        return None
+
+    key = eleven_clip_key(t, voice_id, voice_settings, variation, mix, variant)
+    return get_clip_store().get_or_render(
+        key, lambda: _request_eleven(t, voice_id, voice_settings, mix, mix.eleven_output_format)
+    )
+
+def eleven_clip_key(t: str, voice_id: str, voice_settings: dict, variation: int, mix: MixSettings, variant: int = 0) -> str:
+    """Clip store key of one ElevenLabs read; `t` is the text as sent (after ensure_line_tail)."""
+    return clip_key(
+        "eleven", MODEL_ID, voice_id, voice_settings, t, mix.eleven_output_format,
+        mix.sample_rate, mix.channels, variation,
+        *((("variant", variant),) if variant else ()),
+    )
+
+def _request_eleven(t: str, voice_id: str, voice_settings: dict, mix: MixSettings, output_format: str) -> Optional["AudioSegment"]:
+    # pcm_* (raw) and wav_* decode in-process, mp3_* through soundfile (ffmpeg only without it)
+    fmt = output_format if output_format.startswith("pcm_") else output_format.split("_", 1)[0]
+    url = ELEVEN_TTS_URL.format(voice_id=voice_id, output_format=output_format)
+    headers = {
+        "Content-Type": "application/json",
+        "Accept": {"mp3": "audio/mpeg", "wav": "audio/wav"}.get(fmt, "audio/pcm"),
+    }
+    data = {"text": t, "model_id": MODEL_ID, "voice_settings": voice_settings}
+
+    start = time.monotonic()
+    response = _post_with_retries("eleven", url, data, headers, require_content=True, hedge=mix.hedge_requests)
+    if response is None:
+        return None
+    if response.status_code != 200:
+        raise SynthesisError(f"ElevenLabs API Error {response.status_code}: {response.text}")
+    record_voice_speed("eleven", voice_id, len(t), time.monotonic() - start)
+
+    return conform(decode(response.content, fmt), mix.sample_rate, mix.channels)
+
+# =============================
+# AUDIO GENERATION (Hume)
+# =============================
+
+def generate_audio_hume(
+    text: str,
+    voice_ref: dict,
+    description: str,
+    variation: int = 0,
+    mix: MixSettings = DEFAULT_MIX,
+    variant: int = 0,
+    generations: int = 1,
+) -> Optional["AudioSegment"]:
+    """
+    Hume TTS:
+      POST https://api.hume.ai/v0/tts
+    With generations > 1 one request returns every variant (num_generations);
+    the batch is cached as a whole, so the callers asking for each variant
+    concurrently share that single request.
+    """
+    if not hume_configured():
+        raise SynthesisError("Missing HUME_API_KEY in Streamlit secrets.")
+
+    key = hume_clip_key(text, voice_ref, description, variation, mix, generations)
+    if generations <= 1:
+        return get_clip_store().get_or_render(key, lambda: _first(_request_hume(text, voice_ref, description, mix)))
+
+    clips = get_clip_store().get_or_render(key, lambda: _request_hume(text, voice_ref, description, mix, generations))
+    return clips[variant] if clips is not None and variant < len(clips) else None
+
+def hume_clip_key(text: str, voice_ref: dict, description: str, variation: int, mix: MixSettings, generations: int = 1) -> str:
+    """Clip store key of one Hume request (a single read, or the whole num_generations batch)."""
+    return clip_key(
+        "hume", voice_ref, description, text,
+        mix.sample_rate, mix.channels, variation,
+        *((("generations", generations),) if generations > 1 else ()),
+    )
+
+def _first(clips: Optional[List["AudioSegment"]]) -> Optional["AudioSegment"]:
+    return clips[0] if clips else None
+
+def _request_hume(
+    text: str,
+    voice_ref: dict,
+    description: str,
+    mix: MixSettings,
+    generations: int = 1,
+) -> Optional[List["AudioSegment"]]:
+    headers = {"Content-Type": "application/json"}
+
+    payload = {
+        "utterances": [
+            {"text": text, "description": description, "voice": voice_ref}
+        ],
+        "format": {"type": "wav"},  # decoded in-process, no ffmpeg per clip
+        "num_generations": generations,
+        "split_utterances": False,
+        "strip_headers": True
+    }
+
+    start = time.monotonic()
+    response = _post_with_retries("hume", HUME_TTS_URL, payload, headers, require_content=False, hedge=mix.hedge_requests)
+    if response is None:
+        return None
+    if response.status_code != 200:
+        raise SynthesisError(f"Hume API Error {response.status_code}: {response.text}")
+    record_voice_speed("hume", tuple(sorted(voice_ref.items())), len(text), time.monotonic() - start)
+
+    data = response.json()
+    return [
+        conform(decode(base64.b64decode(gen["audio"]), "wav"), mix.sample_rate, mix.channels)
+        for gen in data["generations"]
+    ]
@@ -0,0 +1,92 @@
+import threading
+from typing import Dict, Hashable, List, Sequence, Tuple, TypeVar
+
+# =============================
+# RENDER ORDER
+# =============================
+#
+# Every render submits all of its requests to the shared pool at once, and the
+# pool runs them in submission order. Two orders are offered per render:
+#
+#   longest_first  estimated-longest requests first (LPT), so a few long lines
+#                  never start last and stretch the render; best for full renders
+#   script_order   opening lines first, so a preview can start playing early
+#
+# Estimates come from a per-voice speed model: a decayed least-squares fit of
+# request seconds against text length, seeded with per-provider defaults until
+# a voice has history.
+
+LONGEST_FIRST = "longest_first"
+SCRIPT_ORDER = "script_order"
+SCHEDULES = (LONGEST_FIRST, SCRIPT_ORDER)
+
+# seconds = base + per_char * characters, until a voice has enough history
+_DEFAULT_BASE_SEC = {"eleven": 0.8, "hume": 1.5}
+_DEFAULT_SEC_PER_CHAR = {"eleven": 0.012, "hume": 0.02}
+_DECAY = 0.95        # weight kept by older observations per new one
+_MIN_SAMPLES = 3
+
+class VoiceSpeed:
+    """Exponentially decayed linear fit of request seconds against characters."""
+
+    def __init__(self, provider: str):
+        self.provider = provider
+        self.samples = 0
+        self._w = self._x = self._y = self._xx = self._xy = 0.0
+
+    def record(self, chars: int, seconds: float) -> None:
+        d = _DECAY
+        self._w = self._w * d + 1
+        self._x = self._x * d + chars
+        self._y = self._y * d + seconds
+        self._xx = self._xx * d + chars * chars
+        self._xy = self._xy * d + chars * seconds
+        self.samples += 1
+
+    def estimate(self, chars: int) -> float:
+        base = _DEFAULT_BASE_SEC.get(self.provider, 1.0)
+        per_char = _DEFAULT_SEC_PER_CHAR.get(self.provider, 0.015)
+        if self.samples >= _MIN_SAMPLES:
+            mean_x, mean_y = self._x / self._w, self._y / self._w
+            var_x = self._xx / self._w - mean_x * mean_x
+            if var_x > 1.0:  # lengths spread enough to fit a slope
+                per_char = max(0.0, (self._xy / self._w - mean_x * mean_y) / var_x)
+                base = max(0.0, mean_y - per_char * mean_x)
+            elif mean_x > 0:  # all about the same length: keep the default base, rescale the rate
+                per_char = max(0.0, (mean_y - base) / mean_x)
+        return base + per_char * chars
+
+_speeds: Dict[Hashable, VoiceSpeed] = {}
+_lock = threading.Lock()
+
+_ANY_VOICE = "*"   # provider-wide model, for voices with no history of their own
+
+def record_voice_speed(provider: str, voice: Hashable, chars: int, seconds: float) -> None:
+    """One finished provider request (retries included) for this voice."""
+    with _lock:
+        for key in ((provider, voice), (provider, _ANY_VOICE)):
+            speed = _speeds.get(key)
+            if speed is None:
+                speed = _speeds[key] = VoiceSpeed(provider)
+            speed.record(chars, seconds)
+
+def estimate_seconds(provider: str, voice: Hashable, chars: int) -> float:
+    """Expected request seconds: the voice's own fit, else the provider's, else the defaults."""
+    with _lock:
+        speed = _speeds.get((provider, voice))
+        if speed is None or speed.samples < _MIN_SAMPLES:
+            speed = _speeds.get((provider, _ANY_VOICE)) or VoiceSpeed(provider)
+        return speed.estimate(chars)
+
+T = TypeVar("T")
+
+def order_tasks(tasks: Sequence[Tuple[T, int, float]], schedule: str) -> List[T]:
+    """
+    `tasks` are (task, script position, estimated seconds), in script order.
+    Returns the tasks in the order they should be submitted.
+    """
+    if schedule == SCRIPT_ORDER:
+        ordered = sorted(tasks, key=lambda t: t[1])
+    else:
+        ordered = sorted(tasks, key=lambda t: -t[2])
+    return [t[0] for t in ordered]
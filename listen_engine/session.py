@@ -0,0 +1,67 @@
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Callable, Dict, List, Optional, Tuple
+
+from .plan import CharConfig
+from .text import detect_characters_from_blocks, parse_script_blocks
+
+if TYPE_CHECKING:
+    from .edl import EditDecisionList
+    from .takes import TakeStore
+
+# =============================
+# PER-SESSION STUDIO STATE
+# =============================
+
+@dataclass
+class StudioSession:
+    """
+    Everything the character setup page derives from the uploaded script,
+    kept in st.session_state so a rerun (or one character's fragment rerun)
+    does not decode, parse or re-split anything that has not changed.
+    """
+    script_id: str = ""
+    parsed_items: List[Tuple[str, str]] = field(default_factory=list)
+    characters: List[str] = field(default_factory=list)
+    char_cfgs: Dict[str, CharConfig] = field(default_factory=dict)
+    # character -> (upload id + split params, takes)
+    _takes: Dict[str, Tuple[tuple, "TakeStore"]] = field(default_factory=dict)
+    # last render of this script, for remixing without re-synthesis
+    edl: Optional["EditDecisionList"] = None
+
+    def load_script(self, script_id: str, read: Callable[[], bytes]) -> None:
+        """Parse the script only when a different file is uploaded."""
+        if script_id == self.script_id:
+            return
+        self.script_id = script_id
+        self.edl = None
+        self.parsed_items = parse_script_blocks(read().decode("utf-8"))
+        self.characters = detect_characters_from_blocks(self.parsed_items)
+        for ch in list(self.char_cfgs):
+            if ch not in self.characters:
+                del self.char_cfgs[ch]
+                self._takes.pop(ch, None)
+
+    def set_config(self, character: str, cfg: CharConfig) -> None:
+        self.char_cfgs[character] = cfg
+
+    def lines_for(self, character: str) -> List[Tuple[str, str]]:
+        return [it for it in self.parsed_items if it[0] == character]
+
+    def takes_for(self, character: str, key: tuple, split: Callable[[], "TakeStore"]) -> "TakeStore":
+        """Decoded + split takes for one character, recomputed only when the upload or split params change."""
+        cached = self._takes.get(character)
+        if cached is not None and cached[0] == key:
+            return cached[1]
+        takes = split()
+        self._takes[character] = (key, takes)
+        return takes
+
+    def drop_takes(self, character: str) -> None:
+        self._takes.pop(character, None)
+
+def upload_id(uploaded) -> str:
+    """Stable id for a Streamlit UploadedFile across reruns."""
+    file_id: Optional[str] = getattr(uploaded, "file_id", None)
+    return file_id or f"{uploaded.name}:{uploaded.size}"
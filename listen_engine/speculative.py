@@ -0,0 +1,103 @@
+import threading
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from .config import DEFAULT_MIX, MixSettings
+from .fair_share import BACKGROUND, get_scheduler
+from .plan import CharConfig, SynthJob, config_complete, job_chunks, job_variants, plan_render, speaker_signature, synthesize_job, voice_identity
+from .schedule import estimate_seconds
+
+# =============================
+# SPECULATIVE PRE-RENDER
+# =============================
+
+@dataclass
+class SpeculativeProgress:
+    rendered: int = 0
+    failed: int = 0       # provider error, or no audio came back
+    cancelled: int = 0    # dropped from the queue, or skipped after the run was stopped
+    total: int = 0
+
+    @property
+    def pending(self) -> int:
+        return self.total - self.rendered - self.failed - self.cancelled
+
+@dataclass
+class SpeculativeRun:
+    signature: tuple
+    cancel: threading.Event = field(default_factory=threading.Event)
+    futures: List[Future] = field(default_factory=list)
+
+    def stop(self):
+        self.cancel.set()
+        for fut in self.futures:
+            fut.cancel()
+
+    def progress(self) -> SpeculativeProgress:
+        out = SpeculativeProgress(total=len(self.futures))
+        for fut in self.futures:
+            if not fut.done():
+                continue
+            if fut.cancelled():
+                out.cancelled += 1
+            elif fut.exception() is not None:
+                out.failed += 1
+            elif fut.result() is not None:
+                out.rendered += 1
+            elif self.cancel.is_set():
+                out.cancelled += 1
+            else:
+                out.failed += 1
+        return out
+
+def _speculative_job(run: SpeculativeRun, job: SynthJob, cfg: CharConfig, mix: MixSettings):
+    # jobs that were already picked up by a worker cannot be cancelled; skip them here instead
+    if run.cancel.is_set():
+        return None
+    return synthesize_job(job, cfg, mix)
+
+def speculate_character(
+    runs: Dict[str, SpeculativeRun],
+    character: str,
+    cfg: CharConfig,
+    parsed_items: List[Tuple[str, str]],
+    mix: MixSettings = DEFAULT_MIX,
+    user: str = "",
+) -> Optional[SpeculativeRun]:
+    """
+    Start rendering `character`'s lines in the background so Generate mostly hits
+    the clip store. Any earlier run for this character with a different config
+    (or script) is cancelled first. `runs` is the per-session registry. The
+    work is queued under `user` in the background lane, behind every real render.
+    """
+    current = runs.get(character)
+
+    if not config_complete(cfg):
+        if current is not None:
+            current.stop()
+            del runs[character]
+        return None
+
+    _, jobs = plan_render([it for it in parsed_items if it[0] == character], {character: cfg})
+    signature = (speaker_signature(cfg), mix, tuple(jobs))
+    if current is not None:
+        if current.signature == signature:
+            return current
+        current.stop()
+
+    run = SpeculativeRun(signature=signature)
+    scheduler = get_scheduler()
+    for job in jobs.values():
+        for chunk in job_chunks(job, mix):
+            estimate = estimate_seconds(cfg.provider, voice_identity(cfg), len(chunk.text))
+            for variant in job_variants(chunk, cfg):
+                run.futures.append(scheduler.submit(user, BACKGROUND, estimate, _speculative_job, run, variant, cfg, mix))
+    runs[character] = run
+    return run
+
+def stop_speculation(runs: Dict[str, SpeculativeRun], keep: Optional[Iterable[str]] = None):
+    keep = set(keep or ())
+    for ch in list(runs):
+        if ch not in keep:
+            runs.pop(ch).stop()
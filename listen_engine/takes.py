@@ -0,0 +1,251 @@
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple
+
+from .audio_io import decode, wav_bytes
+from .conform import conform
+
+if TYPE_CHECKING:
+    import numpy as np
+    from pydub import AudioSegment
+
+# =============================
+# RECORDED FILE TAKES
+# =============================
+
+def decode_upload(data: bytes, filename: str) -> "AudioSegment":
+    fmt = "wav" if filename.lower().endswith(".wav") else "mp3"
+    return decode(data, fmt)
+
+_SAMPLE_DTYPES = {1: "int8", 2: "int16", 4: "int32"}
+_ENERGY_CHUNK_MS = 10_000
+
+# waveform thumbnails read a min/max per PEAK_FRAMES frames, computed once per upload
+PEAK_FRAMES = 256
+PREVIEW_MS = 6000
+PREVIEW_RATE = 22050
+
+@dataclass(eq=False)
+class TakeStore:
+    """
+    All takes of one recorded upload: the decoded PCM held once, plus a
+    (n, 2) array of [start, end) frame offsets. `view` slices a take out
+    without copying; `take` copies the one take being placed, which its small
+    fades would do anyway.
+    """
+    raw: bytes
+    frame_rate: int
+    channels: int
+    sample_width: int
+    spans: "np.ndarray"
+    fade_in_ms: int = 5
+    fade_out_ms: int = 10
+    _peaks: Optional["np.ndarray"] = field(default=None, repr=False)
+    _previews: Dict[int, bytes] = field(default_factory=dict, repr=False)
+
+    def __len__(self) -> int:
+        return len(self.spans)
+
+    @property
+    def frame_width(self) -> int:
+        return self.channels * self.sample_width
+
+    @property
+    def nbytes(self) -> int:
+        return (
+            len(self.raw) + self.spans.nbytes
+            + (self._peaks.nbytes if self._peaks is not None else 0)
+            + sum(len(w) for w in self._previews.values())
+        )
+
+    def view(self, i: int) -> memoryview:
+        start, end = self.spans[i]
+        fw = self.frame_width
+        return memoryview(self.raw)[int(start) * fw:int(end) * fw]
+
+    def duration_ms(self, i: int) -> int:
+        start, end = self.spans[i]
+        return round(1000 * int(end - start) / self.frame_rate)
+
+    def take(self, i: int) -> "AudioSegment":
+        from pydub import AudioSegment
+
+        seg = AudioSegment(
+            data=bytes(self.view(i)),
+            sample_width=self.sample_width,
+            frame_rate=self.frame_rate,
+            channels=self.channels,
+        )
+        return seg.fade_in(self.fade_in_ms).fade_out(self.fade_out_ms)
+
+    def peaks(self) -> "np.ndarray":
+        """
+        (n, 2) min / max sample over every PEAK_FRAMES frames of the whole
+        upload, all channels together, as fractions of full scale. Built on
+        first use and kept, so thumbnails never touch the PCM again.
+        """
+        if self._peaks is None:
+            import numpy as np
+
+            samples = np.frombuffer(self.raw, dtype=_SAMPLE_DTYPES[self.sample_width])
+            per_bucket = PEAK_FRAMES * self.channels
+            n = -(-len(samples) // per_bucket)
+            padded = np.pad(samples, (0, n * per_bucket - len(samples)), mode="edge") if n else samples
+            blocks = padded.reshape(n, per_bucket)
+            full_scale = float(2 ** (8 * self.sample_width - 1))
+            self._peaks = np.stack([blocks.min(axis=1), blocks.max(axis=1)], axis=1).astype(np.float32) / full_scale
+        return self._peaks
+
+    def take_peaks(self, i: int, columns: int = 120) -> "np.ndarray":
+        """(columns, 2) min / max envelope of take i, read from the peak index."""
+        import numpy as np
+
+        start, end = self.spans[i]
+        peaks = self.peaks()[int(start) // PEAK_FRAMES:max(int(start) // PEAK_FRAMES + 1, -(-int(end) // PEAK_FRAMES))]
+        edges = np.linspace(0, len(peaks), min(columns, len(peaks)) + 1).astype(np.int64)[:-1]
+        return np.stack([np.minimum.reduceat(peaks[:, 0], edges), np.maximum.reduceat(peaks[:, 1], edges)], axis=1)
+
+    def preview_wav(self, i: int) -> bytes:
+        """
+        The first PREVIEW_MS of take i as a small mono WAV, for auditioning one
+        take in the browser. Encoded on first request and kept per take.
+        """
+        wav = self._previews.get(i)
+        if wav is None:
+            clip = self.take(i)[:PREVIEW_MS].set_channels(1).set_frame_rate(PREVIEW_RATE)
+            wav = self._previews[i] = wav_bytes(clip)
+        return wav
+
+def _ms_energy(samples: "np.ndarray", frame_rate: int, channels: int) -> Tuple["np.ndarray", "np.ndarray"]:
+    """
+    Sum of squared samples per millisecond (interleaved channels together, like
+    audioop.rms), plus the frame index where each millisecond starts.
+    Works in chunks so the float copy never covers the whole upload.
+    """
+    import numpy as np
+
+    n_frames = len(samples) // channels
+    # pydub rounds the length to the nearest ms; a last ms past the end reads as silence
+    n_ms = round(1000 * (n_frames / frame_rate))
+    bounds = np.arange(n_ms + 1, dtype=np.int64) * frame_rate // 1000
+    energy = np.empty(n_ms, dtype=np.float64)
+    for m0 in range(0, n_ms, _ENERGY_CHUNK_MS):
+        m1 = min(n_ms, m0 + _ENERGY_CHUNK_MS)
+        lo, hi = bounds[m0] * channels, bounds[m1] * channels
+        block = samples[lo:hi].astype(np.float64)
+        block *= block
+        energy[m0:m1] = np.add.reduceat(block, (bounds[m0:m1] * channels) - lo)
+    return energy, bounds
+
+def _nonsilent_ranges(energy: "np.ndarray", bounds: "np.ndarray", channels: int, min_silence_len: int, thresh_rms: float) -> List[List[int]]:
+    """Vectorized pydub.silence.detect_nonsilent (seek_step=1), in milliseconds."""
+    import numpy as np
+
+    seg_len = len(energy)
+    if seg_len < min_silence_len:
+        return [[0, seg_len]]
+
+    csum = np.concatenate(([0.0], np.cumsum(energy)))
+    starts = np.arange(seg_len - min_silence_len + 1)
+    ends = starts + min_silence_len
+    counts = (bounds[ends] - bounds[starts]) * channels
+    rms = np.sqrt((csum[ends] - csum[starts]) / np.maximum(counts, 1))
+    silent = starts[rms <= thresh_rms]
+    if len(silent) == 0:
+        return [[0, seg_len]]
+
+    # same merge rule as pydub: a new range only when the next silent window
+    # starts after the previous window has fully ended
+    breaks = np.nonzero(np.diff(silent) > min_silence_len)[0]
+    range_starts = np.concatenate(([silent[0]], silent[breaks + 1]))
+    range_ends = np.concatenate((silent[breaks], [silent[-1]])) + min_silence_len
+    silent_ranges = list(zip(range_starts.tolist(), range_ends.tolist()))
+
+    if silent_ranges[0][0] == 0 and silent_ranges[0][1] == seg_len:
+        return []
+
+    out: List[List[int]] = []
+    prev_end = 0
+    for start, end in silent_ranges:
+        out.append([prev_end, start])
+        prev_end = end
+    if prev_end != seg_len:
+        out.append([prev_end, seg_len])
+    if out[0] == [0, 0]:
+        out.pop(0)
+    return out
+
+def split_into_takes(audio: "AudioSegment", min_silence_len=300, silence_thresh_db=-38, keep_silence=100) -> TakeStore:
+    """
+    Same takes as pydub's split_on_silence, but recorded as offsets into the
+    upload's single PCM buffer instead of one copied AudioSegment per take.
+    """
+    import numpy as np
+    from pydub.utils import db_to_float
+
+    raw = audio.raw_data
+    samples = np.frombuffer(raw, dtype=_SAMPLE_DTYPES[audio.sample_width])
+    energy, bounds = _ms_energy(samples, audio.frame_rate, audio.channels)
+    thresh_rms = db_to_float(silence_thresh_db) * audio.max_possible_amplitude
+    seg_len = len(energy)
+
+    ranges = [[s - keep_silence, e + keep_silence] for s, e in _nonsilent_ranges(energy, bounds, audio.channels, min_silence_len, thresh_rms)]
+    for r1, r2 in zip(ranges, ranges[1:]):
+        if r2[0] < r1[1]:
+            r1[1] = (r1[1] + r2[0]) // 2
+            r2[0] = r1[1]
+
+    spans = []
+    for start, end in ranges:
+        start, end = max(start, 0), min(end, seg_len)
+        if end - start < 60:
+            continue
+        spans.append((bounds[start], min(bounds[end], len(samples) // audio.channels)))
+
+    return TakeStore(
+        raw=raw,
+        frame_rate=audio.frame_rate,
+        channels=audio.channels,
+        sample_width=audio.sample_width,
+        spans=np.asarray(spans, dtype=np.int64).reshape(-1, 2),
+    )
+
+def load_takes(
+    data: bytes,
+    filename: str,
+    sample_rate: int,
+    channels: int,
+    min_silence_len=300,
+    silence_thresh_db=-38,
+    keep_silence=100,
+) -> TakeStore:
+    """Decode an actor upload, conform it to the episode format once, and index its takes."""
+    audio = conform(decode_upload(data, filename), sample_rate, channels)
+    return split_into_takes(audio, min_silence_len=min_silence_len, silence_thresh_db=silence_thresh_db, keep_silence=keep_silence)
+
+def parse_take_sequence(seq: str) -> List[int]:
+    seq = seq.strip()
+    if not seq:
+        return []
+    out = []
+    for part in seq.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        try:
+            out.append(int(part))
+        except ValueError:
+            pass
+    return out
+
+def take_index(takes: Optional[TakeStore], seq: List[int], line_index: int) -> Optional[int]:
+    """Take index for the character's `line_index`-th recorded line; the sequence loops if shorter."""
+    if not takes or not seq:
+        return None
+    take_num = seq[line_index % len(seq)]
+    return min(max(0, take_num - 1), len(takes) - 1)
+
+def pick_take(takes: Optional[TakeStore], seq: List[int], line_index: int) -> Optional["AudioSegment"]:
+    idx = take_index(takes, seq, line_index)
+    return None if idx is None else takes.take(idx)
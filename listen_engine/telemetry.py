@@ -0,0 +1,250 @@
+import contextvars
+import json
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from .config import TELEMETRY_DB_PATH, TELEMETRY_RSS_POLL_SEC
+
+# =============================
+# RENDER TELEMETRY
+# =============================
+#
+# Each Generate / remix run opens a RenderRecorder. It is the current
+# recorder in a ContextVar, which the synthesis scheduler and the hedge pool copy into
+# their worker threads, so providers and the clip store can count into the
+# render that caused them. On exit the render is appended as one row to a
+# local SQLite file; the admin page charts the history.
+
+_current: contextvars.ContextVar[Optional["RenderRecorder"]] = contextvars.ContextVar("render_recorder", default=None)
+
+def _percentile(sorted_values: List[float], q: float) -> Optional[float]:
+    if not sorted_values:
+        return None
+    return sorted_values[min(len(sorted_values) - 1, int(q * len(sorted_values)))]
+
+def _rss_mb() -> Optional[float]:
+    """Resident memory of the whole process right now; None where there is no /proc."""
+    try:
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+        return pages * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    except (OSError, ValueError, AttributeError):
+        return None
+
+class _RssSampler:
+    """
+    Polls the process RSS from start to stop, for the peak while one render
+    ran. (ru_maxrss would be the server's high-water mark since it started.)
+    """
+
+    def __init__(self, interval: float):
+        self.peak_mb = _rss_mb()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        if self.peak_mb is not None:
+            self._thread = threading.Thread(target=self._run, args=(interval,), name="rss_sampler", daemon=True)
+            self._thread.start()
+
+    def _sample(self) -> None:
+        rss = _rss_mb()
+        if rss is not None and rss > self.peak_mb:
+            self.peak_mb = rss
+
+    def _run(self, interval: float) -> None:
+        while not self._stop.wait(interval):
+            self._sample()
+
+    def stop(self) -> Optional[float]:
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._sample()
+        return self.peak_mb
+
+class RenderRecorder:
+    def __init__(self, app: str, user: str, kind: str = "render"):
+        self._lock = threading.Lock()
+        self.fields: Dict[str, Any] = {"app": app, "user": user, "kind": kind}
+        self.counters: Dict[str, int] = {}
+        self.stages: Dict[str, float] = {}
+        self._latencies: Dict[str, List[float]] = {}
+
+    def set(self, **fields: Any) -> None:
+        self.fields.update(fields)
+
+    def count(self, counter: str, n: int = 1) -> None:
+        with self._lock:
+            self.counters[counter] = self.counters.get(counter, 0) + n
+
+    def request(self, provider: str, seconds: float, failed: bool) -> None:
+        with self._lock:
+            self.counters["requests"] = self.counters.get("requests", 0) + 1
+            if failed:
+                self.counters["request_failures"] = self.counters.get("request_failures", 0) + 1
+            self._latencies.setdefault(provider, []).append(seconds)
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stages[name] = self.stages.get(name, 0.0) + time.perf_counter() - start
+
+    def latency_summary(self) -> Dict[str, Dict[str, float]]:
+        with self._lock:
+            lat = {p: sorted(v) for p, v in self._latencies.items()}
+        return {
+            p: {"requests": len(v), "p50": _percentile(v, 0.5), "p95": _percentile(v, 0.95), "p99": _percentile(v, 0.99)}
+            for p, v in lat.items()
+        }
+
+def current() -> Optional[RenderRecorder]:
+    return _current.get()
+
+def count(counter: str, n: int = 1) -> None:
+    """Count into the current render, if there is one."""
+    rec = _current.get()
+    if rec is not None:
+        rec.count(counter, n)
+
+def set_fields(**fields: Any) -> None:
+    """Set fields on the current render, if there is one."""
+    rec = _current.get()
+    if rec is not None:
+        rec.set(**fields)
+
+def record_request(provider: str, seconds: float, failed: bool) -> None:
+    rec = _current.get()
+    if rec is not None:
+        rec.request(provider, seconds, failed)
+
+def submit_in_context(executor, fn, *args):
+    """executor.submit, carrying the current render recorder into the worker thread."""
+    return executor.submit(contextvars.copy_context().run, fn, *args)
+
+# =============================
+# STORE
+# =============================
+
+_COLUMNS: List[Tuple[str, str]] = [
+    ("ts", "REAL"),
+    ("app", "TEXT"),
+    ("user", "TEXT"),
+    ("kind", "TEXT"),
+    ("ok", "INTEGER"),
+    ("script_chars", "INTEGER"),
+    ("lines", "INTEGER"),
+    ("characters", "INTEGER"),
+    ("unique_jobs", "INTEGER"),
+    ("provider_mix", "TEXT"),       # JSON: provider -> line count
+    ("latency", "TEXT"),            # JSON: provider -> {requests, p50, p95, p99}
+    ("requests", "INTEGER"),
+    ("request_failures", "INTEGER"),
+    ("retries", "INTEGER"),
+    ("cache_hits", "INTEGER"),
+    ("cache_joins", "INTEGER"),
+    ("cache_misses", "INTEGER"),
+    ("fallbacks", "INTEGER"),
+    ("errors", "INTEGER"),
+    ("ffmpeg_spawns", "INTEGER"),
+    ("audio_sec", "REAL"),
+    ("preflight_sec", "REAL"),
+    ("schedule", "TEXT"),
+    ("lane", "TEXT"),               # fair-share lane: interactive / batch
+    ("queue_wait_sec", "REAL"),     # synth start until the first request got a worker
+    ("est_synth_sec", "REAL"),       # the pre-render estimate, to check the estimator against synth_sec
+    ("synth_sec", "REAL"),
+    ("first_line_sec", "REAL"),     # synth start until the opening line's audio was complete
+    ("mix_sec", "REAL"),
+    ("export_sec", "REAL"),
+    ("total_sec", "REAL"),
+    ("peak_rss_mb", "REAL"),        # highest process RSS sampled during the render (other sessions' work included)
+]
+
+_COUNTERS = ("requests", "request_failures", "retries", "cache_hits", "cache_joins", "cache_misses", "fallbacks", "errors", "ffmpeg_spawns")
+
+_db_lock = threading.Lock()
+_initialized = set()
+
+def _connect(path: str) -> sqlite3.Connection:
+    conn = sqlite3.connect(path, timeout=10)
+    if path not in _initialized:
+        cols = ", ".join(f"{name} {kind}" for name, kind in _COLUMNS)
+        conn.execute(f"CREATE TABLE IF NOT EXISTS renders (id INTEGER PRIMARY KEY AUTOINCREMENT, {cols})")
+        # files written by an older build lack the newer columns
+        have = {row[1] for row in conn.execute("PRAGMA table_info(renders)")}
+        for name, kind in _COLUMNS:
+            if name not in have:
+                conn.execute(f"ALTER TABLE renders ADD COLUMN {name} {kind}")
+        _initialized.add(path)
+    return conn
+
+def write_record(rec: RenderRecorder, ok: bool, total_sec: float, path: str = TELEMETRY_DB_PATH) -> None:
+    row = dict.fromkeys(_COUNTERS, 0)
+    row.update(rec.fields)
+    row.update(rec.counters)
+    for name, seconds in rec.stages.items():
+        row[f"{name}_sec"] = seconds
+    row.update(
+        ts=time.time(),
+        ok=int(ok),
+        total_sec=total_sec,
+        latency=json.dumps(rec.latency_summary()),
+    )
+    if isinstance(row.get("provider_mix"), dict):
+        row["provider_mix"] = json.dumps(row["provider_mix"])
+    names = [name for name, _ in _COLUMNS if name in row]
+    with _db_lock:
+        conn = _connect(path)
+        try:
+            with conn:
+                conn.execute(
+                    f"INSERT INTO renders ({', '.join(names)}) VALUES ({', '.join('?' for _ in names)})",
+                    [row[n] for n in names],
+                )
+        finally:
+            conn.close()
+
+def recent_renders(limit: int = 200, path: str = TELEMETRY_DB_PATH) -> List[Dict[str, Any]]:
+    """Newest last. JSON columns come back decoded."""
+    with _db_lock:
+        conn = _connect(path)
+        conn.row_factory = sqlite3.Row
+        try:
+            rows = conn.execute("SELECT * FROM renders ORDER BY id DESC LIMIT ?", (limit,)).fetchall()
+        finally:
+            conn.close()
+    out = []
+    for r in reversed(rows):
+        d = dict(r)
+        for col in ("provider_mix", "latency"):
+            d[col] = json.loads(d[col]) if d[col] else {}
+        out.append(d)
+    return out
+
+@contextmanager
+def render(app: str, user: str, kind: str = "render") -> Iterator[RenderRecorder]:
+    """
+    Record one render. The row is written however the block exits
+    (including st.stop()); telemetry failures never break the render.
+    """
+    rec = RenderRecorder(app, user, kind)
+    token = _current.set(rec)
+    rss = _RssSampler(TELEMETRY_RSS_POLL_SEC)
+    start = time.perf_counter()
+    ok = False
+    try:
+        yield rec
+        ok = not rec.counters.get("errors")
+    finally:
+        _current.reset(token)
+        rec.set(peak_rss_mb=rss.stop())
+        try:
+            write_record(rec, ok, time.perf_counter() - start)
+        except sqlite3.Error:
+            pass
@@ -0,0 +1,218 @@
+import re
+from typing import List, Tuple
+
+# =============================
+# SCRIPT PARSING
+# =============================
+
+_SPEAKER_LINE_RE = re.compile(r"^\s*([^:]{1,60})\s*:\s*(.*)$")  # speaker: (maybe dialogue)
+_UNSAFE_FILENAME_RE = re.compile(r"[^a-z0-9_\-]+")
+
+def normalize_name(name: str) -> str:
+    return name.strip().lower()
+
+def safe_filename(name: str) -> str:
+    return _UNSAFE_FILENAME_RE.sub("_", name.lower()).strip("_")
+
+def is_sfx_or_music_line(line: str) -> bool:
+    # remove production cues
+    l = line.strip().lower()
+    return l.startswith("sfx:") or l.startswith("music:")
+
+def parse_script_blocks(script_text: str) -> List[Tuple[str, str]]:
+    """
+    Supports BOTH:
+    1) single-line: name: dialogue
+    2) block format:
+       name:
+       [tag...]
+       dialogue line 1
+       dialogue line 2
+       (blank or next name:)
+    Returns list of tuples: (speaker, dialogue_text)
+    """
+    lines = script_text.splitlines()
+    items: List[Tuple[str, str]] = []
+
+    current_speaker = None
+    current_dialogue_lines: List[str] = []
+
+    def flush():
+        nonlocal current_speaker, current_dialogue_lines
+        if current_speaker and current_dialogue_lines:
+            # join multiple dialogue lines into one TTS chunk
+            dialogue = " ".join([x.strip() for x in current_dialogue_lines if x.strip()])
+            if dialogue.strip():
+                items.append((current_speaker, dialogue.strip()))
+        current_dialogue_lines = []
+
+    for raw in lines:
+        line = raw.rstrip("\n")
+        stripped = line.strip()
+
+        if not stripped:
+            # blank line ends current block dialogue chunk
+            flush()
+            continue
+
+        if is_sfx_or_music_line(stripped):
+            continue
+
+        # ignore pure bracket performance direction lines like [warm, loud]
+        if stripped.startswith("[") and stripped.endswith("]"):
+            continue
+
+        m = _SPEAKER_LINE_RE.match(line)
+        if m:
+            speaker = normalize_name(m.group(1))
+            after = (m.group(2) or "").strip()
+
+            # new speaker begins -> flush previous
+            flush()
+            current_speaker = speaker
+
+            # if same-line dialogue exists: take it
+            if after:
+                current_dialogue_lines.append(after)
+            continue
+
+        # normal dialogue line (belongs to current speaker)
+        if current_speaker:
+            current_dialogue_lines.append(stripped)
+
+    flush()
+    return items
+
+def parse_script_lines(script_text: str) -> List[Tuple[str, str]]:
+    """
+    Simple one-line-per-turn format (`name: dialogue`), as used by app2.
+    Every line containing ':' is a turn; everything else is ignored.
+    """
+    items: List[Tuple[str, str]] = []
+    for raw in script_text.split("\n"):
+        line = raw.strip()
+        if ":" not in line:
+            continue
+        speaker_part, dialogue = line.split(":", 1)
+        speaker = normalize_name(speaker_part)
+        dialogue = dialogue.strip()
+        if speaker and dialogue:
+            items.append((speaker, dialogue))
+    return items
+
+def detect_characters(script_text: str) -> List[str]:
+    characters = set()
+    for line in script_text.split("\n"):
+        line = line.strip()
+        if ":" in line:
+            speaker = line.split(":", 1)[0].strip()
+            if speaker:
+                characters.add(normalize_name(speaker))
+    return sorted(characters)
+
+def detect_characters_from_blocks(items: List[Tuple[str, str]]) -> List[str]:
+    return sorted({sp for sp, _ in items})
+
+# =============================
+# LINE NORMALIZATION
+# =============================
+
+# Keep your existing cadence stabilizer (unchanged)
+ALLOWED_PAUSE_TAGS = {"[pause]", "[short pause]", "[long pause]"}
+
+_BRACKET_TAG_RE = re.compile(r"\[[^\]]+\]")
+_PAUSE_TAIL_RE = re.compile(r"(\[short pause\]|\[pause\]|\[long pause\])\s*$")
+
+def strip_unknown_brackets(s: str) -> str:
+    def repl(m):
+        tag = m.group(0).strip().lower()
+        return m.group(0) if tag in ALLOWED_PAUSE_TAGS else ""
+    return _BRACKET_TAG_RE.sub(repl, s).strip()
+
+def ensure_line_tail(text: str) -> str:
+    t = strip_unknown_brackets(text.strip())
+    if not t:
+        return t
+    if not _PAUSE_TAIL_RE.search(t):
+        if not t.endswith((".", "!", "?", ",")):
+            t += "."
+        t += " [short pause]"
+    return t
+
+def normalize_line_text(text: str) -> str:
+    return " ".join(text.split())
+
+# =============================
+# CHUNKING (long blocks)
+# =============================
+
+# split after a sentence end or a tag, unless a tag follows (it stays with its sentence)
+_SENTENCE_SPLIT_RE = re.compile(r"(?<=[.!?\]])\s+(?!\[)")
+
+def _split_words(piece: str, max_chars: int) -> List[str]:
+    # a token longer than a whole request (a URL, a run of symbols) is cut at the limit
+    words = [w[i:i + max_chars] for w in piece.split(" ") for i in range(0, len(w), max_chars)]
+    out, cur = [], ""
+    for word in words:
+        if cur and len(cur) + 1 + len(word) > max_chars:
+            out.append(cur)
+            cur = word
+        else:
+            cur = f"{cur} {word}" if cur else word
+    if cur:
+        out.append(cur)
+    return out
+
+def chunk_text(text: str, max_chars: int) -> List[str]:
+    """
+    Split a normalized line into requests of at most `max_chars`, breaking at
+    sentence ends and pause tags (a tag always stays at the end of the chunk
+    before it). Once a chunk is half full, a pause tag closes it early so the
+    join lands on the pause. A single over-long sentence is split between words,
+    and a single over-long word is cut at the limit.
+    """
+    if max_chars <= 0 or len(text) <= max_chars:
+        return [text] if text else []
+
+    pieces: List[str] = []
+    for piece in _SENTENCE_SPLIT_RE.split(text):
+        pieces.extend([piece] if len(piece) <= max_chars else _split_words(piece, max_chars))
+
+    chunks, cur = [], ""
+    for piece in pieces:
+        if cur and len(cur) + 1 + len(piece) > max_chars:
+            chunks.append(cur)
+            cur = piece
+        else:
+            cur = f"{cur} {piece}" if cur else piece
+        if len(cur) >= max_chars // 2 and _PAUSE_TAIL_RE.search(cur):
+            chunks.append(cur)
+            cur = ""
+    if cur:
+        chunks.append(cur)
+    return chunks
+
+# =============================
+# HUME DESCRIPTIONS
+# =============================
+
+def infer_quick_emotion_hint(text: str) -> str:
+    t = text.strip()
+    if t.count("!") >= 2:
+        return "loud, excited"
+    if "!" in t:
+        return "excited"
+    if t.endswith("?"):
+        return "curious, questioning"
+    return ""
+
+def build_hume_description(base_desc: str, line_text: str, auto_hints: bool) -> str:
+    base = (base_desc or "").strip()
+    if not auto_hints:
+        return base if base else "Expressive delivery, clear articulation."
+    hint = infer_quick_emotion_hint(line_text)
+    if hint:
+        if base:
+            return f"{base} Emotion hint: {hint}."
+        return f"Expressive delivery. Emotion hint: {hint}."
+    return base if base else "Expressive delivery, clear articulation."
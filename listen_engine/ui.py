@@ -0,0 +1,273 @@
+"""Streamlit pieces shared by the apps (login gate, admin page, take browser)."""
+import time
+from datetime import datetime
+from statistics import median
+from typing import TYPE_CHECKING, Dict, Iterable, List, Optional
+
+import streamlit as st
+
+from .breaker import all_breakers
+from .clip_store import get_clip_store
+from .fair_share import QueueStatus, get_scheduler
+from .hedge import hedge_stats
+from .key_pool import all_key_pools
+from .latency import all_latencies
+from .telemetry import recent_renders
+
+if TYPE_CHECKING:
+    import numpy as np
+
+    from .takes import TakeStore
+
+# =============================
+# LOGIN SYSTEM
+# =============================
+
+def require_login(users: Dict[str, str], title: str) -> None:
+    if "logged_in" not in st.session_state:
+        st.session_state.logged_in = False
+
+    if st.session_state.logged_in:
+        return
+
+    st.title(title)
+
+    username = st.text_input("Name")
+    password = st.text_input("Password", type="password")
+
+    if st.button("Login"):
+        if username in users and users[username] == password:
+            st.session_state.logged_in = True
+            st.session_state.username = username
+            st.rerun()
+        else:
+            st.error("Invalid credentials")
+
+    st.stop()
+
+# =============================
+# ADMIN
+# =============================
+
+def render_admin_page() -> None:
+    store = get_clip_store()
+
+    st.title("🛠 Admin")
+    st.subheader("Shared clip cache")
+    st.caption("One cache per server process, shared by every logged-in session.")
+
+    stats = store.stats()
+    c1, c2, c3, c4 = st.columns(4)
+    c1.metric("Hit rate", f"{stats['hit_rate']:.0%}")
+    c2.metric("Requests", stats["requests"])
+    c3.metric("Cached clips", stats["entries"])
+    c4.metric("Cache size", f"{stats['bytes'] / (1024 * 1024):.1f} MB")
+
+    c1, c2, c3, c4 = st.columns(4)
+    c1.metric("Hits", stats["hits"])
+    c2.metric("Joined in-flight", stats["inflight_joins"])
+    c3.metric("API renders", stats["misses"])
+    c4.metric("Failed renders", stats["failures"])
+    st.caption(f"In flight now: {stats['inflight']} · Evictions: {stats['evictions']}")
+
+    if st.button("Clear clip cache"):
+        store.clear()
+        st.rerun()
+
+    st.subheader("Provider latency + hedging")
+    hedges = hedge_stats()
+    rows = []
+    for provider, hist in sorted(all_latencies().items()):
+        snap = hist.snapshot()
+        h = hedges.get(provider, {})
+        rows.append({
+            "provider": provider,
+            "samples": snap["samples"],
+            "p50 (s)": snap["p50"],
+            "p95 (s)": snap["p95"],
+            "p99 (s)": snap["p99"],
+            "hedged": h.get("hedged", 0),
+            "hedge wins": h.get("hedge_wins", 0),
+            "budget denied": h.get("budget_denied", 0),
+        })
+    if rows:
+        st.dataframe(rows, hide_index=True, use_container_width=True)
+    else:
+        st.caption("No provider requests yet.")
+
+    st.subheader("Provider circuit breakers")
+    st.caption("An open breaker skips the provider for a cool-down; characters with a fallback voice switch to it.")
+    rows = [{"provider": name, **b.snapshot()} for name, b in sorted(all_breakers().items())]
+    if rows:
+        st.dataframe(rows, hide_index=True, use_container_width=True)
+    else:
+        st.caption("No provider requests yet.")
+
+    st.subheader("API key pools")
+    st.caption("Requests go to the least-loaded key. Auth and quota errors eject a key; a 429 cools it down and lowers its limit.")
+    rows = [{"provider": name, **row} for name, pool in sorted(all_key_pools().items()) for row in pool.snapshot()]
+    if rows:
+        st.dataframe(rows, hide_index=True, use_container_width=True)
+    else:
+        st.caption("No API keys configured.")
+
+    st.subheader("Synthesis queue")
+    scheduler = get_scheduler()
+    st.caption(
+        f"{scheduler.workers} workers shared by fair share between users; "
+        "interactive requests (auditions, small renders) go first, speculative pre-renders last."
+    )
+    rows = scheduler.snapshot()
+    if rows:
+        st.dataframe(rows, hide_index=True, use_container_width=True)
+    else:
+        st.caption("Nothing queued.")
+
+    render_telemetry_dashboard()
+
+def queue_text(q: QueueStatus) -> str:
+    """One line for a render that is waiting on the shared synthesis queue."""
+    if not q.queued:
+        return f"⏳ {q.running} requests rendering."
+    ahead = f"{q.ahead} requests from other users ahead of yours · " if q.ahead else ""
+    return (
+        f"⏳ {ahead}{q.queued} of yours queued, {q.running} rendering · "
+        f"next starts in ~{q.wait_sec:.0f}s, all done in ~{q.finish_sec:.0f}s"
+    )
+
+def _median(values: List[Optional[float]]) -> Optional[float]:
+    values = [v for v in values if v is not None]
+    return median(values) if values else None
+
+def _lines_per_sec(row: dict) -> Optional[float]:
+    if not row.get("lines") or not row.get("synth_sec"):
+        return None
+    return row["lines"] / row["synth_sec"]
+
+def render_telemetry_dashboard() -> None:
+    st.subheader("Render history")
+    rows = [r for r in recent_renders(500) if r["kind"] == "render"]
+    if not rows:
+        st.caption("No renders logged yet.")
+        return
+
+    now = time.time()
+    week = 7 * 24 * 3600
+    this_week = [r for r in rows if r["ts"] >= now - week]
+    last_week = [r for r in rows if now - 2 * week <= r["ts"] < now - week]
+
+    def weekly(metric, fmt):
+        cur = _median([metric(r) for r in this_week])
+        prev = _median([metric(r) for r in last_week])
+        delta = None if cur is None or prev is None else fmt(cur - prev)
+        return ("–" if cur is None else fmt(cur)), delta
+
+    c1, c2, c3 = st.columns(3)
+    value, delta = weekly(_lines_per_sec, lambda v: f"{v:.2f}")
+    c1.metric("Lines / synth second (median, 7d)", value, delta)
+    value, delta = weekly(lambda r: r.get("total_sec"), lambda v: f"{v:.1f}s")
+    c2.metric("Render time (median, 7d)", value, delta, delta_color="inverse")
+    value, delta = weekly(lambda r: (r.get("cache_hits") or 0) / r["unique_jobs"] if r.get("unique_jobs") else None, lambda v: f"{v:.0%}")
+    c3.metric("Cache hit rate (median, 7d)", value, delta)
+
+    when = [datetime.fromtimestamp(r["ts"]) for r in rows]
+    st.caption("Throughput and stage timings per render")
+    st.line_chart(
+        {
+            "when": when,
+            "lines / synth s": [_lines_per_sec(r) for r in rows],
+            "synth s": [r.get("synth_sec") for r in rows],
+            "estimated synth s": [r.get("est_synth_sec") for r in rows],
+            "mix s": [r.get("mix_sec") for r in rows],
+            "export s": [r.get("export_sec") for r in rows],
+        },
+        x="when",
+    )
+
+    providers = sorted({p for r in rows for p in r["latency"]})
+    if providers:
+        st.caption("Provider p95 latency per render (s)")
+        st.line_chart(
+            {"when": when, **{p: [r["latency"].get(p, {}).get("p95") for r in rows] for p in providers}},
+            x="when",
+        )
+
+    st.dataframe(
+        [
+            {
+                "when": datetime.fromtimestamp(r["ts"]).strftime("%Y-%m-%d %H:%M"),
+                "app": r["app"],
+                "user": r["user"],
+                "ok": bool(r["ok"]),
+                "lines": r["lines"],
+                "unique": r["unique_jobs"],
+                "providers": ", ".join(f"{p}:{n}" for p, n in r["provider_mix"].items()),
+                "requests": r["requests"],
+                "retries": r["retries"],
+                "cache hits": r["cache_hits"],
+                "ffmpeg": r["ffmpeg_spawns"],
+                "order": r["schedule"],
+                "lane": r["lane"],
+                "queued s": r["queue_wait_sec"],
+                "first line s": r["first_line_sec"],
+                "total s": r["total_sec"],
+                "peak MB": r["peak_rss_mb"],
+            }
+            for r in reversed(rows[-50:])
+        ],
+        hide_index=True,
+        use_container_width=True,
+    )
+
+def admin_nav(admins: Iterable[str]) -> None:
+    """Admins get a Studio/Admin switch in the sidebar; the Admin page ends the run."""
+    if st.session_state.get("username") not in admins:
+        return
+    page = st.sidebar.radio("Page", ["Studio", "Admin"])
+    if page == "Admin":
+        render_admin_page()
+        st.stop()
+
+# =============================
+# TAKE BROWSER
+# =============================
+
+TAKES_PER_PAGE = 24
+
+def waveform_svg(envelope: "np.ndarray", width: int = 180, height: int = 36) -> str:
+    """Filled min/max envelope (values in -1..1) as a small inline SVG."""
+    n = max(1, len(envelope))
+    xs = [round(i * width / n, 1) for i in range(n)]
+    mid = height / 2
+    top = [f"{x},{round(mid - float(hi) * mid, 1)}" for x, (_, hi) in zip(xs, envelope)]
+    bottom = [f"{x},{round(mid - float(lo) * mid, 1)}" for x, (lo, _) in zip(reversed(xs), envelope[::-1])]
+    return (
+        f'<svg width="{width}" height="{height}" viewBox="0 0 {width} {height}" xmlns="http://www.w3.org/2000/svg">'
+        f'<polygon points="{" ".join(top + bottom)}" fill="#ff4b4b"/></svg>'
+    )
+
+def take_browser(key: str, takes: "TakeStore") -> None:
+    """
+    Waveform thumbnails of every take (from the upload's peak index) and a
+    preview player that only ships the one take picked.
+    """
+    if not len(takes):
+        return
+    with st.expander("🔎 Take browser"):
+        pages = -(-len(takes) // TAKES_PER_PAGE)
+        page = st.number_input("Page", 1, pages, 1, key=f"{key}_take_page") if pages > 1 else 1
+        first = (page - 1) * TAKES_PER_PAGE
+        cols = st.columns(4)
+        for i in range(first, min(len(takes), first + TAKES_PER_PAGE)):
+            with cols[(i - first) % 4]:
+                st.markdown(
+                    f"**{i + 1}** · {takes.duration_ms(i) / 1000:.1f}s<br>{waveform_svg(takes.take_peaks(i))}",
+                    unsafe_allow_html=True,
+                )
+        # nothing is encoded or sent until a take is picked (the expander's body runs even when collapsed)
+        pick = st.selectbox(
+            "Preview take", range(1, len(takes) + 1), index=None,
+            placeholder="Pick a take to listen to", key=f"{key}_take_preview",
+        )
+        if pick is not None:
+            st.audio(takes.preview_wav(pick - 1), format="audio/wav")
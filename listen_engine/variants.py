@@ -0,0 +1,75 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, List
+
+if TYPE_CHECKING:
+    import numpy as np
+    from pydub import AudioSegment
+
+# =============================
+# VARIANT SCORING
+# =============================
+#
+# A character with variants > 1 gets several independent reads of every
+# line in one parallel pass. Each read is scored on cheap signal checks and
+# the lowest penalty is picked; the others stay in the EDL for a manual swap.
+
+CLIP_LEVEL = 0.98          # |sample| at or above this fraction of full scale counts as clipped
+SILENCE_DBFS = -45.0       # 10 ms windows quieter than this count as silence
+_WINDOW_MS = 10
+
+# penalty weights: a read 50% longer/shorter than its siblings ~ 1% clipped samples ~ all-silence
+W_DURATION = 2.0
+W_CLIPPING = 100.0
+W_SILENCE = 1.0
+
+@dataclass
+class VariantSet:
+    clips: List["AudioSegment"]
+    scores: List[float]
+    pick: int
+
+    @property
+    def chosen(self) -> "AudioSegment":
+        return self.clips[self.pick]
+
+def _samples(audio: "AudioSegment") -> "np.ndarray":
+    import numpy as np
+
+    return np.frombuffer(audio.raw_data, dtype=np.int16).astype(np.float32) / 32768.0
+
+def _silence_ratio(x: "np.ndarray", frame_rate: int, channels: int) -> float:
+    import numpy as np
+
+    win = max(1, frame_rate * _WINDOW_MS // 1000) * channels
+    n = len(x) // win
+    if n == 0:
+        return 1.0
+    rms = np.sqrt(np.mean(x[:n * win].reshape(n, win) ** 2, axis=1))
+    return float(np.mean(rms < 10 ** (SILENCE_DBFS / 20)))
+
+def score_variants(clips: List["AudioSegment"]) -> List[float]:
+    """
+    Penalty per read (lower is better): distance from the siblings' median
+    duration, fraction of clipped samples, and fraction of silent windows.
+    Clips are episode-format (16-bit) audio.
+    """
+    import numpy as np
+
+    durations = np.array([len(c) for c in clips], dtype=np.float64)
+    median = float(np.median(durations)) or 1.0
+    duration_dev = np.abs(durations - median) / median
+
+    clipping = np.empty(len(clips))
+    silence = np.empty(len(clips))
+    for i, clip in enumerate(clips):
+        x = _samples(clip)
+        clipping[i] = np.mean(np.abs(x) >= CLIP_LEVEL) if len(x) else 0.0
+        silence[i] = _silence_ratio(x, clip.frame_rate, clip.channels)
+
+    return (W_DURATION * duration_dev + W_CLIPPING * clipping + W_SILENCE * silence).tolist()
+
+def pick_variant(clips: List["AudioSegment"]) -> VariantSet:
+    scores = score_variants(clips)
+    return VariantSet(clips=clips, scores=scores, pick=min(range(len(clips)), key=scores.__getitem__))
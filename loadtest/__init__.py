@@ -0,0 +1 @@
+"""Headless multi-user load test for the Streamlit apps (see __main__)."""
@@ -0,0 +1,301 @@
+"""
+Headless multi-user load test.
+
+    python -m loadtest --app app_file_eleven_hume.py --levels 1,2,4,8,12,16
+
+Starts a fake TTS server and a real `streamlit run` of the app pointed at
+it, then for each concurrency level connects that many simulated users at
+once over the websocket protocol and drives them through login, script
+upload, character setup and Generate. Sessions stay connected across levels,
+as open tabs would, so the server's RSS growth per session is measured.
+Stops at the first level that breaks the failure-rate or latency limit and
+reports it as the failure point. Needs no browser; the simulated users speak
+the websocket protocol with the `websockets` package.
+"""
+import argparse
+import ast
+import json
+import os
+import random
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import requests
+
+from .client import StreamlitSession
+from .fake_tts import VOICE_PREFIX, FakeTTS
+
+REPO = Path(__file__).resolve().parent.parent
+
+_WORDS = (
+    "the studio lights flicker while everyone waits for the next take and nobody "
+    "remembers who brought the coffee or why the script changed again this morning"
+).split()
+
+# =============================
+# SIMULATED USER
+# =============================
+
+@dataclass
+class UserResult:
+    user: str
+    ok: bool
+    error: str = ""
+    login_sec: float = 0.0
+    setup_sec: float = 0.0
+    generate_sec: float = 0.0
+
+def _rss_mb(pid: int) -> float:
+    with open(f"/proc/{pid}/statm") as f:
+        pages = int(f.read().split()[1])
+    return pages * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+
+def app_users(app_path: str) -> Dict[str, str]:
+    """The app's USERS literal, so simulated users log in with real credentials."""
+    tree = ast.parse(Path(app_path).read_text())
+    for node in tree.body:
+        if isinstance(node, ast.Assign) and any(getattr(t, "id", None) == "USERS" for t in node.targets):
+            return ast.literal_eval(node.value)
+    raise SystemExit(f"No USERS dict found in {app_path}")
+
+def make_script(seed: int, characters: int, lines: int) -> str:
+    """A script unique to one user, so users do not share clips through the cache."""
+    rng = random.Random(seed)
+    out = []
+    for i in range(lines):
+        words = " ".join(rng.choice(_WORDS) for _ in range(rng.randint(6, 30)))
+        out.append(f"Speaker{i % characters}: {words.capitalize()} number {seed}-{i}.")
+    return "\n".join(out) + "\n"
+
+def run_user(index: int, name: str, password: str, base_url: str, args) -> Tuple[UserResult, StreamlitSession]:
+    session = StreamlitSession(base_url, timeout=args.timeout)
+    result = UserResult(user=f"{name}#{index}", ok=False)
+
+    try:
+        start = time.perf_counter()
+        page = session.connect()
+        session.set_text(page.widget("text_input", "Name"), name)
+        session.set_text(page.widget("text_input", "Password"), password)
+        page = session.rerun(click=page.widget("button", "Login"))
+        result.login_sec = time.perf_counter() - start
+
+        start = time.perf_counter()
+        script = make_script(index, args.characters, args.lines).encode("utf-8")
+        page = session.upload(page.widget("file_uploader", "Upload Script"), f"loadtest-{index}.txt", script)
+        voices = [w for w in page.widgets if w.kind == "text_input" and "Voice ID for " in w.label and not w.label.startswith("Fallback")]
+        for i, w in enumerate(voices):
+            session.set_text(w, f"{VOICE_PREFIX}{i % 10}")
+        page = session.rerun()
+        result.setup_sec = time.perf_counter() - start
+
+        start = time.perf_counter()
+        page = session.rerun(click=page.widget("button", "Generate"))
+        result.generate_sec = time.perf_counter() - start
+
+        problems = page.exceptions + page.alert_bodies("ERROR")
+        if problems:
+            result.error = problems[0][:200]
+        elif not any("enerated" in body for body in page.alert_bodies("SUCCESS")):
+            result.error = "no success message"
+        else:
+            result.ok = True
+    except Exception as e:  # a crashed session is a data point, not a harness failure
+        result.error = f"{type(e).__name__}: {e}"[:200]
+    return result, session
+
+# =============================
+# RAMP
+# =============================
+
+@dataclass
+class LevelReport:
+    users: int
+    ok: int
+    failed: int
+    generate_p50: Optional[float]
+    generate_p95: Optional[float]
+    generate_max: Optional[float]
+    login_p95: Optional[float]
+    wall_sec: float
+    rss_mb: float
+    rss_per_session_mb: float
+    sessions_alive: int
+    tts_requests: int
+    tts_peak_in_flight: int
+    errors: List[str] = field(default_factory=list)
+
+def _pct(values: List[float], q: float) -> Optional[float]:
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+def run_level(n: int, first_index: int, users: List[Tuple[str, str]], base_url: str, args) -> Tuple[List[UserResult], list]:
+    start_gate = threading.Barrier(n)
+
+    def one(i: int):
+        name, password = users[(first_index + i) % len(users)]
+        start_gate.wait()
+        return run_user(first_index + i, name, password, base_url, args)
+
+    with ThreadPoolExecutor(max_workers=n) as pool:
+        out = list(pool.map(one, range(n)))
+    return [r for r, _ in out], [s for _, s in out]
+
+# =============================
+# SERVER UNDER TEST
+# =============================
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+def start_app(app: str, fake_url: str, workdir: Path) -> Tuple[subprocess.Popen, str]:
+    """`streamlit run` the app headless, with fake API keys and every provider URL on the fake server."""
+    (workdir / ".streamlit").mkdir(parents=True, exist_ok=True)
+    (workdir / ".streamlit" / "secrets.toml").write_text('API_KEY = "loadtest"\nHUME_API_KEY = "loadtest"\n')
+    port = _free_port()
+    env = dict(
+        os.environ,
+        ELEVEN_API_BASE=fake_url,
+        HUME_API_BASE=fake_url,
+        VOBBLE_TELEMETRY_DB=str(workdir / "telemetry.sqlite3"),
+    )
+    proc = subprocess.Popen(
+        [
+            sys.executable, "-m", "streamlit", "run", app,
+            "--server.headless", "true",
+            "--server.address", "127.0.0.1",
+            "--server.port", str(port),
+            "--server.enableXsrfProtection", "false",
+            "--server.fileWatcherType", "none",
+            "--browser.gatherUsageStats", "false",
+        ],
+        cwd=workdir,
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=open(workdir / "streamlit.log", "wb"),
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        if proc.poll() is not None:
+            raise SystemExit(f"streamlit exited early; see {workdir / 'streamlit.log'}")
+        try:
+            if requests.get(base_url + "/_stcore/health", timeout=1).ok:
+                return proc, base_url
+        except requests.RequestException:
+            pass
+        time.sleep(0.5)
+    proc.kill()
+    raise SystemExit("streamlit did not come up within 60 s")
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(prog="python -m loadtest", description=__doc__.split("\n\n")[0])
+    ap.add_argument("--app", default=str(REPO / "app_file_eleven_hume.py"))
+    ap.add_argument("--levels", default="1,2,4,8,12,16", help="concurrent users per step")
+    ap.add_argument("--lines", type=int, default=24, help="script lines per user")
+    ap.add_argument("--characters", type=int, default=3)
+    ap.add_argument("--latency", type=float, default=0.3, help="fake TTS base latency (s)")
+    ap.add_argument("--per-char", type=float, default=0.002, help="fake TTS latency per character (s)")
+    ap.add_argument("--error-rate", type=float, default=0.0, help="fake TTS 503 rate")
+    ap.add_argument("--timeout", type=float, default=600, help="longest one simulated user waits for a script run or upload to finish, over its websocket session (s)")
+    ap.add_argument("--max-failure-rate", type=float, default=0.05)
+    ap.add_argument("--max-p95", type=float, default=120.0, help="Generate p95 limit (s)")
+    ap.add_argument("--json", help="also write the report here")
+    args = ap.parse_args(argv)
+    args.app = str(Path(args.app).resolve())
+
+    print("Encoding fake TTS clips…", flush=True)
+    fake = FakeTTS(latency_sec=args.latency, per_char_sec=args.per_char, error_rate=args.error_rate).start()
+    workdir = Path(tempfile.mkdtemp(prefix="loadtest-"))
+    proc, base_url = start_app(args.app, fake.base_url, workdir)
+    print(f"App at {base_url} (logs in {workdir})", flush=True)
+
+    users = list(app_users(args.app).items())
+    levels = [int(x) for x in args.levels.split(",") if x.strip()]
+    # one throwaway page load imports the app and engine, so the baseline is the warm idle server
+    warmup = StreamlitSession(base_url, timeout=args.timeout)
+    warmup.connect()
+    warmup.close()
+    baseline_rss = _rss_mb(proc.pid)
+    alive = []
+    reports: List[LevelReport] = []
+    failure_point: Optional[int] = None
+    next_index = 0
+
+    header = f"{'users':>5} {'ok':>4} {'fail':>4} {'gen p50':>8} {'gen p95':>8} {'gen max':>8} {'login p95':>9} {'RSS MB':>8} {'MB/sess':>8} {'TTS req':>8}"
+    print(header)
+    for n in levels:
+        before = fake.stats()
+        start = time.perf_counter()
+        results, sessions = run_level(n, next_index, users, base_url, args)
+        wall = time.perf_counter() - start
+        next_index += n
+        alive.extend(sessions)
+        after = fake.stats()
+
+        gen = [r.generate_sec for r in results if r.ok]
+        rss = _rss_mb(proc.pid)
+        report = LevelReport(
+            users=n,
+            ok=sum(r.ok for r in results),
+            failed=sum(not r.ok for r in results),
+            generate_p50=statistics.median(gen) if gen else None,
+            generate_p95=_pct(gen, 0.95),
+            generate_max=max(gen) if gen else None,
+            login_p95=_pct([r.login_sec for r in results], 0.95),
+            wall_sec=wall,
+            rss_mb=rss,
+            rss_per_session_mb=(rss - baseline_rss) / len(alive),
+            sessions_alive=len(alive),
+            tts_requests=after["requests"] - before["requests"],
+            tts_peak_in_flight=after["peak_in_flight"],
+            errors=sorted({r.error for r in results if r.error}),
+        )
+        reports.append(report)
+
+        fmt = lambda v: "–" if v is None else f"{v:.2f}"
+        print(
+            f"{n:>5} {report.ok:>4} {report.failed:>4} {fmt(report.generate_p50):>8} {fmt(report.generate_p95):>8} "
+            f"{fmt(report.generate_max):>8} {fmt(report.login_p95):>9} {rss:>8.0f} {report.rss_per_session_mb:>8.1f} "
+            f"{report.tts_requests:>8}",
+            flush=True,
+        )
+        for err in report.errors[:3]:
+            print(f"      ! {err}")
+
+        too_slow = report.generate_p95 is not None and report.generate_p95 > args.max_p95
+        if report.failed / n > args.max_failure_rate or too_slow:
+            failure_point = n
+            break
+
+    for session in alive:
+        session.close()
+    proc.terminate()
+    proc.wait(timeout=30)
+    fake.stop()
+    if failure_point is None:
+        print(f"\nNo failure up to {levels[-1]} concurrent users.")
+    else:
+        print(f"\nFailure point: {failure_point} concurrent users.")
+
+    if args.json:
+        Path(args.json).write_text(json.dumps(
+            {"failure_point": failure_point, "baseline_rss_mb": baseline_rss, "levels": [asdict(r) for r in reports]},
+            indent=2,
+        ))
+    return 1 if failure_point is not None else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,153 @@
+"""
+A minimal Streamlit browser stand-in: one websocket session speaking the
+BackMsg / ForwardMsg protocol, enough to fill widgets, click buttons and
+upload a file the way the frontend does.
+"""
+import itertools
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+import requests
+
+@dataclass
+class Widget:
+    kind: str   # Element oneof name: "text_input", "button", "file_uploader", ...
+    id: str
+    label: str
+
+@dataclass
+class RunResult:
+    widgets: List[Widget] = field(default_factory=list)
+    alerts: List[tuple] = field(default_factory=list)   # (format name, body)
+    exceptions: List[str] = field(default_factory=list)
+
+    def widget(self, kind: str, label_contains: str) -> Widget:
+        for w in self.widgets:
+            if w.kind == kind and label_contains in w.label:
+                return w
+        raise LookupError(f"no {kind} labelled like {label_contains!r} on the page")
+
+    def alert_bodies(self, fmt: str) -> List[str]:
+        return [body for f, body in self.alerts if f == fmt]
+
+class StreamlitSession:
+    def __init__(self, base_url: str, timeout: float = 600):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.session_id = ""
+        self._ws = None
+        self._state: Dict[str, object] = {}   # widget id -> WidgetState field values we keep sending
+        self._request_ids = itertools.count(1)
+
+    # ----- connection -----
+
+    def connect(self) -> RunResult:
+        from websockets.sync.client import connect
+
+        ws_url = "ws" + self.base_url[len("http"):] + "/_stcore/stream"
+        self._ws = connect(ws_url, subprotocols=["streamlit"], max_size=None, open_timeout=30)
+        return self.rerun()
+
+    def close(self) -> None:
+        if self._ws is not None:
+            self._ws.close()
+            self._ws = None
+
+    # ----- interaction -----
+
+    def set_text(self, widget: Widget, value: str) -> None:
+        self._state[widget.id] = ("string_value", value)
+
+    def rerun(self, click: Optional[Widget] = None) -> RunResult:
+        from streamlit.proto.BackMsg_pb2 import BackMsg
+
+        msg = BackMsg()
+        msg.rerun_script.SetInParent()
+        states = msg.rerun_script.widget_states.widgets
+        for wid, (kind, value) in self._state.items():
+            ws = states.add()
+            ws.id = wid
+            if kind == "file_uploader_state_value":
+                ws.file_uploader_state_value.CopyFrom(value)
+            else:
+                setattr(ws, kind, value)
+        if click is not None:
+            ws = states.add()
+            ws.id = click.id
+            ws.trigger_value = True
+        self._ws.send(msg.SerializeToString())
+        return self._wait_for_run()
+
+    def upload(self, widget: Widget, name: str, data: bytes) -> RunResult:
+        """Upload through the server's file endpoint, then rerun with the uploader pointing at it."""
+        from streamlit.proto.BackMsg_pb2 import BackMsg
+        from streamlit.proto.Common_pb2 import FileUploaderState
+
+        request_id = str(next(self._request_ids))
+        msg = BackMsg()
+        msg.file_urls_request.request_id = request_id
+        msg.file_urls_request.session_id = self.session_id
+        msg.file_urls_request.file_names.append(name)
+        self._ws.send(msg.SerializeToString())
+
+        urls = None
+        deadline = time.monotonic() + self.timeout
+        while urls is None:
+            fwd = self._recv(deadline)
+            if fwd.WhichOneof("type") == "file_urls_response" and fwd.file_urls_response.response_id == request_id:
+                if fwd.file_urls_response.error_msg:
+                    raise RuntimeError(fwd.file_urls_response.error_msg)
+                urls = fwd.file_urls_response.file_urls[0]
+
+        r = requests.put(self.base_url + urls.upload_url, files={"file": (name, data)}, timeout=self.timeout)
+        r.raise_for_status()
+
+        state = FileUploaderState()
+        info = state.uploaded_file_info.add()
+        info.file_id = urls.file_id
+        info.name = name
+        info.size = len(data)
+        info.file_urls.CopyFrom(urls)
+        self._state[widget.id] = ("file_uploader_state_value", state)
+        return self.rerun()
+
+    # ----- protocol -----
+
+    def _recv(self, deadline: float):
+        from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise TimeoutError("script run did not finish in time")
+        fwd = ForwardMsg()
+        fwd.ParseFromString(self._ws.recv(timeout=remaining))
+        return fwd
+
+    def _wait_for_run(self) -> RunResult:
+        from streamlit.proto.Alert_pb2 import Alert
+        from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+
+        done = {ForwardMsg.FINISHED_SUCCESSFULLY, ForwardMsg.FINISHED_WITH_COMPILE_ERROR}
+        result = RunResult()
+        deadline = time.monotonic() + self.timeout
+        while True:
+            fwd = self._recv(deadline)
+            kind = fwd.WhichOneof("type")
+            if kind == "new_session":
+                # every (re)run starts here; st.rerun() means a second one
+                result = RunResult()
+                if fwd.new_session.initialize.session_id:
+                    self.session_id = fwd.new_session.initialize.session_id
+            elif kind == "delta" and fwd.delta.WhichOneof("type") == "new_element":
+                el = fwd.delta.new_element
+                el_kind = el.WhichOneof("type")
+                inner = getattr(el, el_kind)
+                if el_kind == "alert":
+                    result.alerts.append((Alert.Format.Name(inner.format), inner.body))
+                elif el_kind == "exception":
+                    result.exceptions.append(f"{inner.type}: {inner.message}")
+                elif getattr(inner, "id", ""):
+                    result.widgets.append(Widget(el_kind, inner.id, getattr(inner, "label", "")))
+            elif kind == "script_finished" and fwd.script_finished in done:
+                return result
@@ -0,0 +1,159 @@
+"""A local stand-in for the ElevenLabs and Hume endpoints the engine calls."""
+import base64
+import io
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Tuple
+from urllib.parse import parse_qs, urlparse
+
+# =============================
+# CANNED AUDIO
+# =============================
+#
+# Clips are encoded once at start-up in whole seconds; each request gets the
+# clip closest to ~60 ms per character of text, so mixes have realistic length.
+# Both formats are written with soundfile (no ffmpeg needed). Where its
+# libsndfile predates MP3 support, MP3 requests get the WAV clip instead; the
+# engine sniffs the RIFF header, so renders still work, they just skip the
+# cost of decoding MP3.
+
+VOICE_PREFIX = "loadtest-voice-"
+MS_PER_CHAR = 60
+CLIP_SECONDS = range(1, 31)
+RATE = 44100
+
+def _encode_clips() -> Dict[Tuple[str, int], bytes]:
+    import numpy as np
+    import soundfile
+
+    clips = {}
+    for sec in CLIP_SECONDS:
+        t = np.arange(sec * RATE) / RATE
+        tone = (np.sin(2 * np.pi * (220 + 10 * sec) * t) * 0.25 * 32767).astype(np.int16)
+        for fmt, subtype in (("wav", "PCM_16"), ("mp3", None)):
+            buf = io.BytesIO()
+            try:
+                soundfile.write(buf, tone, RATE, format=fmt.upper(), subtype=subtype)
+            except (soundfile.LibsndfileError, ValueError, TypeError):
+                clips[(fmt, sec)] = clips[("wav", sec)]
+                continue
+            clips[(fmt, sec)] = buf.getvalue()
+    return clips
+
+# =============================
+# SERVER
+# =============================
+
+class FakeTTS:
+    """
+    Threaded HTTP server. Every synthesis request sleeps
+    `latency_sec + per_char_sec * len(text)` (x jitter) and fails with a 503
+    at `error_rate`.
+    """
+
+    def __init__(self, latency_sec: float = 0.3, per_char_sec: float = 0.002, jitter: float = 0.3, error_rate: float = 0.0):
+        self.latency_sec = latency_sec
+        self.per_char_sec = per_char_sec
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.clips = _encode_clips()
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.errors = 0
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "FakeTTS":
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"requests": self.requests, "errors": self.errors, "peak_in_flight": self.peak_in_flight}
+
+    def _synthesize(self, text: str, fmt: str) -> Tuple[int, bytes]:
+        with self._lock:
+            self.requests += 1
+            self.in_flight += 1
+            self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+        try:
+            delay = (self.latency_sec + self.per_char_sec * len(text)) * (1 + random.uniform(-self.jitter, self.jitter))
+            time.sleep(max(0.0, delay))
+            if random.random() < self.error_rate:
+                with self._lock:
+                    self.errors += 1
+                return 503, b'{"detail": "fake overload"}'
+            sec = min(max(CLIP_SECONDS), max(1, round(len(text) * MS_PER_CHAR / 1000)))
+            return 200, self.clips[(fmt, sec)]
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+
+    def _handler(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def _send(self, status: int, body: bytes, content_type: str) -> None:
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def _json(self, status: int, data) -> None:
+                self._send(status, json.dumps(data).encode(), "application/json")
+
+            def do_GET(self):
+                url = urlparse(self.path)
+                if url.path == "/v1/voices":
+                    self._json(200, {"voices": [{"voice_id": f"{VOICE_PREFIX}{i}"} for i in range(10)]})
+                elif url.path.startswith("/v1/voices/"):
+                    ok = url.path.rsplit("/", 1)[1].startswith(VOICE_PREFIX)
+                    self._json(200 if ok else 404, {})
+                elif url.path == "/v0/tts/voices":
+                    voices = [{"id": f"{VOICE_PREFIX}{i}", "name": f"Loadtest {i}"} for i in range(10)]
+                    self._json(200, {"voices_page": voices, "total_pages": 1})
+                else:
+                    self._json(404, {})
+
+            def do_POST(self):
+                url = urlparse(self.path)
+                body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+                if url.path.startswith("/v1/text-to-speech/"):
+                    fmt = "wav" if parse_qs(url.query).get("output_format", ["mp3"])[0].startswith("wav") else "mp3"
+                    status, audio = fake._synthesize(body.get("text", ""), fmt)
+                    self._send(status, audio, "audio/wav" if fmt == "wav" else "audio/mpeg")
+                elif url.path == "/v0/tts":
+                    text = " ".join(u.get("text", "") for u in body.get("utterances", []))
+                    fmt = "wav" if body.get("format", {}).get("type") == "wav" else "mp3"
+                    status, audio = fake._synthesize(text, fmt)
+                    if status != 200:
+                        self._send(status, audio, "application/json")
+                        return
+                    gens = [
+                        {"generation_id": f"fake-{i}", "audio": base64.b64encode(audio).decode()}
+                        for i in range(body.get("num_generations", 1))
+                    ]
+                    self._json(200, {"generations": gens})
+                else:
+                    self._json(404, {})
+
+        return Handler
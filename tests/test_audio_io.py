@@ -0,0 +1,41 @@
+import io
+
+import numpy as np
+import pytest
+
+from listen_engine.audio_io import decode, ffmpeg_spawns
+
+soundfile = pytest.importorskip("soundfile")
+
+
+def test_mp3_decodes_without_ffmpeg():
+    tone = (np.sin(np.arange(44100) / 20) * 8000).astype("int16")
+    buf = io.BytesIO()
+    soundfile.write(buf, tone, 44100, format="MP3")
+
+    spawns = ffmpeg_spawns()
+    audio = decode(buf.getvalue(), "mp3_44100_128")
+    assert ffmpeg_spawns() == spawns
+    assert (audio.frame_rate, audio.channels) == (44100, 1)
+    assert abs(len(audio) - 1000) < 100
+
+
+def test_raw_pcm_decodes_at_its_rate():
+    pcm = (np.arange(2400) % 200).astype("<i2").tobytes()
+    audio = decode(pcm + b"\x00", "pcm_24000")
+    assert (audio.frame_rate, len(audio), audio.raw_data) == (24000, 100, pcm)
+
+
+@pytest.mark.parametrize("subtype", ["ULAW", "IMA_ADPCM"])
+def test_compressed_wav_falls_back_to_a_decoder(subtype):
+    tone = (np.sin(np.arange(8000) / 10) * 8000).astype("int16")
+    buf = io.BytesIO()
+    soundfile.write(buf, tone, 8000, format="WAV", subtype=subtype)
+    data = buf.getvalue()
+    assert data[:4] == b"RIFF"
+
+    audio = decode(data, "wav")
+    assert (audio.frame_rate, audio.channels) == (8000, 1)
+    assert abs(len(audio) - 1000) < 50
+    pcm = np.frombuffer(audio.raw_data, dtype="<i2")[:len(tone)].astype(np.float64)
+    assert np.corrcoef(pcm, tone[:len(pcm)])[0, 1] > 0.95
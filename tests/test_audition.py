@@ -0,0 +1,49 @@
+import threading
+
+import pytest
+from pydub import AudioSegment
+
+from listen_engine import providers
+from listen_engine.clip_store import ClipStore
+from listen_engine.config import DEFAULT_MIX
+from listen_engine.plan import CharConfig, audition_line, plan_render, synthesize_jobs
+
+
+@pytest.fixture
+def requests_sent(monkeypatch):
+    """Every ElevenLabs request reaching the network, against a private clip store."""
+    sent = []
+    lock = threading.Lock()
+
+    def request(t, voice_id, voice_settings, mix, output_format):
+        with lock:
+            sent.append(t)
+        return AudioSegment.silent(duration=100 + len(t), frame_rate=mix.sample_rate)
+
+    store = ClipStore()
+    monkeypatch.setattr(providers, "_request_eleven", request)
+    monkeypatch.setattr(providers, "get_clip_store", lambda: store)
+    return sent
+
+
+@pytest.mark.parametrize("cfg", [
+    CharConfig(provider="eleven", eleven_voice_id="v-ava", eleven_profile={}),
+    CharConfig(provider="eleven", eleven_voice_id="v-ava", eleven_profile={}, variants=3),
+    CharConfig(provider="eleven", eleven_voice_id="v-ava", eleven_profile={}, force_variation=True),
+], ids=["plain", "variants", "force_variation"])
+def test_auditioned_line_is_not_requested_again_by_the_render(requests_sent, cfg):
+    cfgs = {"ava": cfg, "ben": CharConfig(provider="eleven", eleven_voice_id="v-ben", eleven_profile={})}
+    items = [("ava", "Hello there."), ("ben", "Hi."), ("ava", "Hello there."), ("ben", "Bye.")]
+
+    audio, errors, _ = audition_line(items, 2, cfgs)   # a repeat: auditioned as the render would plan it
+    assert audio is not None and not errors
+    auditioned = len(requests_sent)
+    assert auditioned == max(1, cfg.variants)
+
+    planned, jobs = plan_render(items, cfgs)
+    job_audio, errors, _, _ = synthesize_jobs(jobs, cfgs, DEFAULT_MIX)
+    assert not errors
+    assert job_audio[planned[2].job_key] is not None
+    rendered = requests_sent[auditioned:]
+    # only the lines never auditioned went out: ben's two and (with force_variation) ava's first read
+    assert len(rendered) == 2 + cfg.force_variation * max(1, cfg.variants)
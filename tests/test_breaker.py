@@ -0,0 +1,109 @@
+import pytest
+
+from listen_engine import breaker, preflight as preflight_mod, providers
+from listen_engine.breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker
+from listen_engine.catalog import VoiceCatalog
+from listen_engine.config import BREAKER_MIN_CALLS, BREAKER_SLOW_CALL_SEC
+from listen_engine.key_pool import KeyPool
+from listen_engine.plan import CharConfig
+from listen_engine.preflight import preflight
+
+
+@pytest.fixture
+def no_cooldown(monkeypatch):
+    monkeypatch.setattr(breaker, "BREAKER_COOLDOWN_SEC", 0)
+
+
+def _state(b):
+    return b.snapshot()["state"]
+
+
+def _trip(b):
+    tokens = [b.allow() for _ in range(BREAKER_MIN_CALLS)]
+    for token in tokens:
+        b.record(failed=True, seconds=0.1, token=token)
+        b.release(token)
+    return tokens
+
+
+def test_trips_on_error_rate_and_rejects_while_open():
+    b = CircuitBreaker("eleven")
+    for _ in range(BREAKER_MIN_CALLS - 1):
+        b.record(failed=True, seconds=0.1, token=b.allow())
+    assert _state(b) == CLOSED
+    b.record(failed=True, seconds=0.1, token=b.allow())
+    assert _state(b) == OPEN
+    assert b.allow() is None
+    assert b.snapshot()["rejected"] == 1
+
+
+def test_trips_on_slow_calls():
+    b = CircuitBreaker("eleven")
+    for _ in range(BREAKER_MIN_CALLS):
+        b.record(failed=False, seconds=BREAKER_SLOW_CALL_SEC, token=b.allow())
+    assert _state(b) == OPEN
+
+
+def test_one_probe_closes_or_reopens(no_cooldown):
+    b = CircuitBreaker("eleven")
+    _trip(b)
+    probe = b.allow()
+    assert probe is not None and _state(b) == HALF_OPEN
+    assert b.allow() is None           # one probe at a time
+    b.record(failed=True, seconds=0.1, token=probe)
+    assert _state(b) == OPEN and b.trips == 2
+
+    probe = b.allow()
+    b.record(failed=False, seconds=0.1, token=probe)
+    assert _state(b) == CLOSED and b.snapshot()["window"] == 0
+
+
+def test_only_the_probes_own_result_resolves_half_open(no_cooldown):
+    b = CircuitBreaker("eleven")
+    straggler = b.allow()
+    _trip(b)
+    probe = b.allow()
+    b.record(failed=False, seconds=0.1, token=straggler)   # sent before the trip, back late
+    assert _state(b) == HALF_OPEN
+    b.record(failed=True, seconds=0.1, token=probe)
+    assert _state(b) == OPEN
+
+
+def test_probe_without_an_outcome_frees_the_slot(no_cooldown):
+    b = CircuitBreaker("eleven")
+    _trip(b)
+    probe = b.allow()
+    b.release(probe)
+    assert b.allow() is not None
+
+
+def test_probe_that_finds_no_keys_does_not_wedge_the_breaker(no_cooldown, monkeypatch):
+    b = CircuitBreaker("eleven")
+    monkeypatch.setattr(providers, "get_breaker", lambda provider: b)
+    monkeypatch.setattr(providers, "get_key_pool", lambda provider: KeyPool(provider))
+    _trip(b)
+
+    with pytest.raises(providers.ProviderUnavailable, match="no eleven API key"):
+        providers._post_with_retries("eleven", "https://example.invalid", {}, {}, require_content=True)
+    assert _state(b) == HALF_OPEN
+    assert b.allow() is not None
+
+
+def test_preflight_checks_fallback_voices(monkeypatch):
+    catalog = VoiceCatalog(ids={"alice-voice"})
+    monkeypatch.setattr(preflight_mod, "get_catalogs", lambda providers: {"eleven": catalog})
+    monkeypatch.setattr(preflight_mod, "confirm_eleven_voice", lambda cat, vid: vid in cat.ids)
+    cfgs = {
+        "alice": CharConfig(
+            provider="eleven", eleven_voice_id="alice-voice",
+            fallback=CharConfig(provider="eleven", eleven_voice_id="gone-voice"),
+        ),
+        "bob": CharConfig(provider="eleven", eleven_voice_id="bob-voice", fallback=CharConfig(provider="eleven")),
+    }
+    issues = preflight([("alice", "Hi."), ("bob", "Hi.")], ["alice", "bob"], cfgs)
+
+    by_character = {i.character: i for i in issues}
+    assert by_character["bob"].blocking                       # primary voice missing
+    assert "gone-voice" in by_character["alice (fallback)"].message
+    assert not by_character["alice (fallback)"].blocking
+    assert not by_character["bob (fallback)"].blocking        # no fallback voice id entered
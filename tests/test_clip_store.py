@@ -0,0 +1,109 @@
+import threading
+
+import pytest
+
+from listen_engine.clip_store import ClipStore, clip_key
+
+
+def _concurrently(store, key, render, n):
+    results, errors = [None] * n, [None] * n
+    barrier = threading.Barrier(n)
+
+    def call(i):
+        barrier.wait()
+        try:
+            results[i] = store.get_or_render(key, render)
+        except Exception as e:
+            errors[i] = e
+
+    threads = [threading.Thread(target=call, args=(i,)) for i in range(n)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join(timeout=5)
+    return results, errors
+
+
+def _slow_render(calls, value=None, error=None, delay=0.2):
+    def render():
+        calls.append(1)
+        threading.Event().wait(delay)
+        if error is not None:
+            raise error
+        return value
+
+    return render
+
+
+def test_key_is_stable_and_order_sensitive():
+    assert clip_key("eleven", {"a": 1, "b": 2}, "hi") == clip_key("eleven", {"b": 2, "a": 1}, "hi")
+    assert clip_key("eleven", "a", "b") != clip_key("eleven", "b", "a")
+
+
+def test_second_caller_joins_the_render_in_flight():
+    store, calls = ClipStore(), []
+    results, errors = _concurrently(store, "k", _slow_render(calls, value=b"clip"), 4)
+
+    assert calls == [1]
+    assert results == [b"clip"] * 4 and errors == [None] * 4
+    stats = store.stats()
+    assert (stats["misses"], stats["inflight_joins"], stats["inflight"]) == (1, 3, 0)
+    assert store.get_or_render("k", lambda: pytest.fail("rendered twice")) == b"clip"
+
+
+def test_failure_reaches_every_waiter_and_is_not_cached():
+    store, calls = ClipStore(), []
+    results, errors = _concurrently(store, "k", _slow_render(calls, error=RuntimeError("provider down")), 3)
+
+    assert calls == [1]
+    assert all(isinstance(e, RuntimeError) for e in errors)
+    assert store.stats()["inflight"] == 0 and store.get("k") is None
+    assert store.get_or_render("k", lambda: b"retry") == b"retry"
+
+
+def test_empty_render_is_shared_but_not_cached():
+    store, calls = ClipStore(), []
+    results, _ = _concurrently(store, "k", _slow_render(calls), 3)
+    assert calls == [1] and results == [None] * 3
+    assert store.stats()["inflight"] == 0 and store.get("k") is None
+
+
+def test_eviction_keeps_bytes_within_the_budget():
+    store = ClipStore(max_bytes=100)
+    for i in range(10):
+        store.get_or_render(f"k{i}", lambda: bytes(30))
+        assert store.stats()["bytes"] <= 100
+    assert store.stats()["entries"] == 3
+    assert store.stats()["evictions"] == 7
+    assert store.get("k9") is not None and store.get("k0") is None
+
+
+def test_lru_order_follows_reads():
+    store = ClipStore(max_bytes=60)
+    store.put("a", bytes(30))
+    store.put("b", bytes(30))
+    store.get("a")
+    store.put("c", bytes(30))
+    assert store.get("b") is None and store.get("a") is not None
+
+
+def test_replacing_a_key_does_not_double_count():
+    store = ClipStore(max_bytes=1000)
+    store.put("k", bytes(100))
+    store.put("k", bytes(40))
+    assert store.stats()["bytes"] == 40
+
+    def render():
+        store.put("j", bytes(10))   # cached by someone else while this render ran
+        return bytes(20)
+
+    store.get_or_render("j", render)
+    assert store.stats()["bytes"] == 60
+
+
+def test_clip_over_the_whole_budget_is_not_kept():
+    store = ClipStore(max_bytes=100)
+    store.put("small", bytes(30))
+    assert store.get_or_render("huge", lambda: bytes(500)) == bytes(500)
+    assert store.get("huge") is None and store.get("small") is not None
+    assert store.stats()["bytes"] == 30
@@ -0,0 +1,63 @@
+import numpy as np
+import pytest
+from pydub import AudioSegment
+
+from listen_engine.conform import conform, remix_channels, resample
+
+
+def _sine(freq, rate, seconds=1.0, channels=1):
+    t = np.arange(int(rate * seconds)) / rate
+    x = (0.5 * np.sin(2 * np.pi * freq * t)).astype(np.float32)
+    return np.repeat(x[:, None], channels, axis=1)
+
+
+def _dominant_hz(x, rate):
+    spectrum = np.abs(np.fft.rfft(x[:, 0] * np.hanning(len(x))))
+    return np.argmax(spectrum) * rate / len(x)
+
+
+@pytest.mark.parametrize("src_rate", [48000, 24000])
+def test_resampled_sine_keeps_its_length_and_pitch(src_rate):
+    x = _sine(1000.0, src_rate)
+    y = resample(x, src_rate, 44100)
+    assert y.shape == (44100, 1)
+    assert _dominant_hz(y, 44100) == pytest.approx(1000.0, abs=2.0)
+    # away from the zero-padded edges the level is unchanged
+    mid = y[2000:-2000, 0]
+    assert np.sqrt(np.mean(mid ** 2)) == pytest.approx(0.5 / np.sqrt(2), rel=0.01)
+
+
+def test_downsampling_removes_tones_above_the_new_nyquist():
+    x = _sine(1000.0, 48000) + _sine(23000.0, 48000)
+    y = resample(x, 48000, 44100)
+    assert _dominant_hz(y, 44100) == pytest.approx(1000.0, abs=2.0)
+    assert np.sqrt(np.mean(y[2000:-2000, 0] ** 2)) == pytest.approx(0.5 / np.sqrt(2), rel=0.02)
+
+
+def test_same_rate_and_empty_input_are_returned_as_is():
+    x = _sine(440.0, 44100, seconds=0.1)
+    assert resample(x, 44100, 44100) is x
+    empty = np.zeros((0, 2), np.float32)
+    assert resample(empty, 48000, 44100) is empty
+
+
+def test_mono_is_spread_to_stereo_and_stereo_averaged_to_mono():
+    mono = np.array([[0.2], [-0.4]], np.float32)
+    stereo = remix_channels(mono, 2)
+    assert stereo.shape == (2, 2)
+    assert np.array_equal(stereo[:, 0], mono[:, 0]) and np.array_equal(stereo[:, 1], mono[:, 0])
+
+    lr = np.array([[0.2, 0.6], [-1.0, 0.0]], np.float32)
+    assert np.allclose(remix_channels(lr, 1), [[0.4], [-0.5]])
+    assert remix_channels(lr, 2) is lr
+
+
+def test_conform_converts_a_segment_to_the_episode_format():
+    x = _sine(1000.0, 24000, seconds=0.5)
+    pcm = np.rint(x[:, 0] * 32767).astype("<i2")
+    seg = AudioSegment(data=pcm.tobytes(), sample_width=2, frame_rate=24000, channels=1)
+
+    out = conform(seg, 44100, 2)
+    assert (out.frame_rate, out.channels, out.sample_width) == (44100, 2, 2)
+    assert out.frame_count() == 22050
+    assert conform(out, 44100, 2) is out
@@ -0,0 +1,70 @@
+import json
+from dataclasses import replace
+
+from listen_engine.config import DEFAULT_MIX
+from listen_engine.edl import build_edl
+from listen_engine.mix import render_edl, silence
+from listen_engine.plan import CharConfig, job_chunks, job_clip_key, job_variants, plan_render
+from listen_engine.variants import VariantSet
+
+
+def _render_edl(cfgs, script):
+    lines, jobs = plan_render(script, cfgs)
+    audio = {key: silence(200, DEFAULT_MIX) for key in jobs}
+    return lines, jobs, build_edl(lines, audio, cfgs, list(cfgs), DEFAULT_MIX)
+
+
+def test_remix_moves_lines_without_new_clips():
+    cfgs = {
+        "A": CharConfig(provider="eleven", eleven_voice_id="v1", eleven_profile={}),
+        "B": CharConfig(provider="eleven", eleven_voice_id="v2", eleven_profile={}),
+    }
+    lines, jobs, edl = _render_edl(cfgs, [("A", "One."), ("B", "Two."), ("A", "Three.")])
+    clip = 200 + DEFAULT_MIX.clip_tail_pad_ms
+
+    full, stems = render_edl(edl)
+    gap = DEFAULT_MIX.gap_speaker_change_ms
+    assert [ln.start_ms for ln in edl.lines] == [0, clip + gap, 2 * (clip + gap)]
+    assert len(full) == 3 * clip + 2 * gap
+    assert all(len(stem) == len(full) for stem in stems.values())
+
+    edl.lines[2].gap_before_ms = 0
+    full, _ = render_edl(edl, replace(DEFAULT_MIX, gap_speaker_change_ms=500))
+    assert [ln.start_ms for ln in edl.lines] == [0, clip + 500, 2 * clip + 500]
+    assert len(full) == 3 * clip + 500
+    assert len(edl.clips) == len(jobs) == 3
+
+
+def test_json_lists_the_clip_store_keys_the_render_used():
+    cfgs = {"A": CharConfig(provider="eleven", eleven_voice_id="v1", eleven_profile={})}
+    lines, jobs, edl = _render_edl(cfgs, [("A", "Hello there."), ("A", "Hello there.")])
+
+    job = next(iter(jobs.values()))
+    expected = [job_clip_key(job, cfgs["A"], DEFAULT_MIX)]
+    out = json.loads(edl.to_json())["lines"]
+    assert [ln["clips"] for ln in out] == [expected, expected]
+
+
+def test_json_keys_follow_the_picked_variant():
+    cfgs = {"A": CharConfig(provider="eleven", eleven_voice_id="v1", eleven_profile={}, variants=2)}
+    lines, jobs, edl = _render_edl(cfgs, [("A", "Hello there.")])
+    key, job = next(iter(jobs.items()))
+    reads = [silence(200, DEFAULT_MIX), silence(300, DEFAULT_MIX)]
+    edl.variants[key] = VariantSet(clips=reads, scores=[1.0, 0.5], pick=0)
+
+    edl.pick_variant(key, 1)
+    clips = json.loads(edl.to_json())["lines"][0]["clips"]
+    second_read = job_variants(job, cfgs["A"])[1]
+    assert clips == [job_clip_key(second_read, cfgs["A"], DEFAULT_MIX)]
+    assert clips != json.loads(_render_edl(cfgs, [("A", "Hello there.")])[2].to_json())["lines"][0]["clips"]
+
+
+def test_long_lines_list_one_key_per_chunk():
+    mix = DEFAULT_MIX
+    cfgs = {"A": CharConfig(provider="eleven", eleven_voice_id="v1", eleven_profile={})}
+    text = " ".join(["This sentence pads the line out well past one request."] * 40)
+    lines, jobs, edl = _render_edl(cfgs, [("A", text)])
+
+    clips = json.loads(edl.to_json())["lines"][0]["clips"]
+    assert len(clips) == len(job_chunks(next(iter(jobs.values())), mix)) > 1
+    assert all(isinstance(k, str) for k in clips)
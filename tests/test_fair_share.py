@@ -0,0 +1,87 @@
+import threading
+
+from listen_engine.fair_share import BACKGROUND, BATCH, INTERACTIVE, FairScheduler
+
+
+class _Recorder:
+    def __init__(self):
+        self.order = []
+        self._lock = threading.Lock()
+
+    def __call__(self, tag):
+        with self._lock:
+            self.order.append(tag)
+        return tag
+
+
+def _held(workers=1):
+    """A scheduler whose workers are all busy until the returned event is set."""
+    scheduler = FairScheduler(workers)
+    gate, started = threading.Event(), threading.Barrier(workers + 1)
+
+    def block():
+        started.wait()
+        gate.wait()
+
+    blockers = [scheduler.submit("holder", BATCH, 1.0, block) for _ in range(workers)]
+    started.wait()
+    return scheduler, gate, blockers
+
+
+def _drain(gate, futures):
+    gate.set()
+    for fut in futures:
+        fut.result(timeout=5)
+
+
+def test_interactive_first_background_last():
+    scheduler, gate, blockers = _held()
+    rec = _Recorder()
+    futures = [scheduler.submit("ann", BACKGROUND, 1.0, rec, "ann-bg")]
+    futures += [scheduler.submit("ann", BATCH, 1.0, rec, f"ann-{i}") for i in range(2)]
+    futures += [scheduler.submit("bob", INTERACTIVE, 1.0, rec, "bob-audition")]
+    _drain(gate, blockers + futures)
+    assert rec.order == ["bob-audition", "ann-0", "ann-1", "ann-bg"]
+
+
+def test_users_alternate_within_a_lane():
+    scheduler, gate, blockers = _held()
+    rec = _Recorder()
+    futures = [scheduler.submit("big", BATCH, 1.0, rec, f"big{i}") for i in range(6)]
+    futures += [scheduler.submit("small", BATCH, 1.0, rec, f"small{i}") for i in range(2)]
+    _drain(gate, blockers + futures)
+    assert rec.order[:4] == ["big0", "small0", "big1", "small1"]
+    assert rec.order[4:] == ["big2", "big3", "big4", "big5"]
+
+
+def test_weights_and_estimates_set_the_share():
+    scheduler, gate, blockers = _held()
+    rec = _Recorder()
+    # one 4 s request costs "slow" as much virtual time as four 1 s requests cost "fast"
+    futures = [scheduler.submit("slow", BATCH, 4.0, rec, f"slow{i}") for i in range(2)]
+    futures += [scheduler.submit("fast", BATCH, 1.0, rec, f"fast{i}") for i in range(5)]
+    _drain(gate, blockers + futures)
+    assert rec.order == ["slow0", "fast0", "fast1", "fast2", "fast3", "slow1", "fast4"]
+
+
+def test_cancelled_requests_are_skipped():
+    scheduler, gate, blockers = _held()
+    rec = _Recorder()
+    dropped = scheduler.submit("ann", BACKGROUND, 1.0, rec, "dropped")
+    kept = scheduler.submit("ann", BACKGROUND, 1.0, rec, "kept")
+    assert dropped.cancel()
+    assert scheduler.status("ann").queued == 1
+    _drain(gate, blockers + [kept])
+    assert rec.order == ["kept"] and dropped.cancelled()
+
+
+def test_status_counts_other_users_ahead():
+    scheduler, gate, blockers = _held()
+    rec = _Recorder()
+    futures = [scheduler.submit("big", BATCH, 1.0, rec, f"big{i}") for i in range(4)]
+    futures += [scheduler.submit("small", BATCH, 1.0, rec, "small0")]
+    status = scheduler.status("small")
+    assert (status.queued, status.ahead) == (1, 1)
+    assert status.wait_sec >= 1.0
+    _drain(gate, blockers + futures)
+    assert all(fut.started is not None for fut in futures)
@@ -0,0 +1,124 @@
+import itertools
+import threading
+import time
+
+import pytest
+
+from listen_engine import hedge, latency
+from listen_engine.hedge import HedgeBudget, hedge_stats, hedged_call
+from listen_engine.latency import LatencyHistogram
+
+_providers = itertools.count()
+
+
+@pytest.fixture
+def provider():
+    """A provider name no other test has recorded latencies for, with a 50 ms p95."""
+    name = f"test-provider-{next(_providers)}"
+    for _ in range(latency.MIN_SAMPLES):
+        latency.get_latency(name).record(0.05)
+    return name
+
+
+@pytest.fixture
+def budget(monkeypatch):
+    b = HedgeBudget(ratio=0.0, burst=1.0)
+    monkeypatch.setattr(hedge, "_budget", b)
+    return b
+
+
+def _attempts(*delays):
+    """An attempt() whose n-th call sleeps delays[n] and returns n."""
+    calls = itertools.count()
+    lock = threading.Lock()
+
+    def attempt():
+        with lock:
+            n = next(calls)
+        time.sleep(delays[n])
+        return n
+
+    attempt.calls = calls
+    return attempt
+
+
+def test_percentile_is_the_upper_bound_of_its_bucket():
+    hist = LatencyHistogram()
+    for _ in range(90):
+        hist.record(0.1)
+    for _ in range(10):
+        hist.record(2.0)
+    p50, p95 = hist.percentile(0.50), hist.percentile(0.95)
+    assert 0.1 <= p50 < 0.1 * 2 ** (1 / 8)
+    assert 2.0 <= p95 < 2.0 * 2 ** (1 / 8)
+    assert hist.percentile(0.90) == p50
+
+
+def test_percentile_needs_enough_samples_and_forgets_old_ones():
+    hist = LatencyHistogram(window=10)
+    for _ in range(latency.MIN_SAMPLES - 1):
+        hist.record(5.0)
+    assert hist.percentile(0.95) is None
+    for _ in range(10):
+        hist.record(0.2)
+    assert hist.count() == 10 and hist.total == 19
+    assert hist.percentile(0.99) < 0.25
+
+
+def test_latencies_beyond_the_last_bucket_report_the_top_bound():
+    hist = LatencyHistogram()
+    for _ in range(latency.MIN_SAMPLES):
+        hist.record(10_000.0)
+    assert hist.percentile(0.5) == latency._BOUNDS[-1]
+
+
+def test_budget_refills_by_ratio_up_to_the_burst():
+    b = HedgeBudget(ratio=0.5, burst=1.0)
+    assert b.try_spend() and not b.try_spend()
+    b.on_request()
+    assert not b.try_spend()
+    b.on_request()
+    b.on_request()   # capped at the burst
+    assert b.try_spend() and not b.try_spend()
+
+
+def test_no_hedge_without_latency_history(budget):
+    attempt = _attempts(0.2)
+    assert hedged_call("test-provider-unseen", attempt, lambda r: True) == 0
+    assert next(attempt.calls) == 1
+    assert hedge_stats()["test-provider-unseen"]["hedged"] == 0
+
+
+def test_no_hedge_when_the_call_beats_p95(provider, budget):
+    attempt = _attempts(0.0)
+    assert hedged_call(provider, attempt, lambda r: True) == 0
+    assert next(attempt.calls) == 1
+    assert hedge_stats()[provider]["hedged"] == 0
+
+
+def test_no_hedge_when_the_budget_is_spent(provider, budget):
+    assert budget.try_spend()
+    attempt = _attempts(0.3)
+    assert hedged_call(provider, attempt, lambda r: True) == 0
+    assert next(attempt.calls) == 1
+    assert hedge_stats()[provider]["budget_denied"] == 1
+
+
+def test_the_faster_twin_wins(provider, budget):
+    attempt = _attempts(1.0, 0.0)
+    started = time.monotonic()
+    assert hedged_call(provider, attempt, lambda r: True) == 1
+    assert time.monotonic() - started < 0.8
+    stats = hedge_stats()[provider]
+    assert stats["hedged"] == 1 and stats["hedge_wins"] == 1
+
+
+def test_a_failed_twin_does_not_hide_a_good_result(provider, budget):
+    def attempt(calls=itertools.count()):
+        if next(calls) == 0:
+            time.sleep(0.2)
+            return "slow"
+        raise RuntimeError("backup failed")
+
+    assert hedged_call(provider, attempt, lambda r: True) == "slow"
+    assert hedge_stats()[provider]["hedge_wins"] == 0
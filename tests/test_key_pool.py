@@ -0,0 +1,95 @@
+import pytest
+
+from listen_engine import key_pool
+from listen_engine.config import KEY_MAX_CONCURRENCY, KEY_RECOVER_SUCCESSES
+from listen_engine.key_pool import KeyPool, NoKeysAvailable
+
+
+def _limit(pool, key):
+    return next(s["limit"] for s in pool.snapshot() if s["key"].endswith(key[-4:]))
+
+
+def _rate_limited(pool, in_flight):
+    """Hold `in_flight` leases on the only key and report a 429 on the last one."""
+    leases = [pool.lease() for _ in range(in_flight)]
+    held = [cm.__enter__() for cm in leases]
+    other_keys_left = held[-1].report(429)
+    for cm in reversed(leases):
+        cm.__exit__(None, None, None)
+    return other_keys_left
+
+
+def _succeed(pool, n):
+    for _ in range(n):
+        with pool.lease() as lease:
+            lease.report(200)
+
+
+@pytest.fixture
+def no_cooldown(monkeypatch):
+    monkeypatch.setattr(key_pool, "KEY_COOLDOWN_SEC", 0)
+
+
+def test_429_lowers_the_limit_below_what_was_in_flight(no_cooldown):
+    pool = KeyPool("eleven", ["key-aaaa"])
+    _rate_limited(pool, 3)
+    assert _limit(pool, "key-aaaa") == 2
+    _rate_limited(pool, 1)
+    assert _limit(pool, "key-aaaa") == 1   # never below one
+
+
+def test_key_regains_capacity_after_successes(no_cooldown):
+    pool = KeyPool("eleven", ["key-aaaa"])
+    _rate_limited(pool, 2)
+    assert _limit(pool, "key-aaaa") == 1
+
+    _succeed(pool, KEY_RECOVER_SUCCESSES - 1)
+    assert _limit(pool, "key-aaaa") == 1
+    _succeed(pool, 1)
+    assert _limit(pool, "key-aaaa") == 2
+
+    _succeed(pool, KEY_RECOVER_SUCCESSES * (KEY_MAX_CONCURRENCY + 2))
+    assert _limit(pool, "key-aaaa") == KEY_MAX_CONCURRENCY
+
+
+def test_429_resets_the_recovery_streak(no_cooldown):
+    pool = KeyPool("eleven", ["key-aaaa"])
+    _rate_limited(pool, 3)
+    _succeed(pool, KEY_RECOVER_SUCCESSES - 1)
+    _rate_limited(pool, 2)
+    _succeed(pool, KEY_RECOVER_SUCCESSES - 1)
+    assert _limit(pool, "key-aaaa") == 1
+
+
+def test_rate_limited_key_cools_and_others_serve():
+    pool = KeyPool("eleven", ["key-aaaa", "key-bbbb"])
+    with pool.lease() as lease:
+        first = lease.key
+        assert lease.report(429)
+    for _ in range(3):
+        with pool.lease() as lease:
+            assert lease.key != first
+
+
+def test_auth_errors_eject_until_no_keys_remain():
+    pool = KeyPool("eleven", ["key-aaaa", "key-bbbb"])
+    with pool.lease() as lease:
+        assert lease.report(401)
+    with pool.lease() as lease:
+        assert not lease.report(402)
+    with pytest.raises(NoKeysAvailable):
+        with pool.lease():
+            pass
+
+
+def test_429_on_the_only_key_is_the_providers_problem():
+    pool = KeyPool("eleven", ["key-aaaa"])
+    assert not _rate_limited(pool, 1)
+
+
+def test_429_while_every_other_key_cools_is_the_providers_problem():
+    pool = KeyPool("eleven", ["key-aaaa", "key-bbbb"])
+    with pool.lease() as first, pool.lease() as second:
+        assert first.key != second.key
+        assert first.report(429)          # the other key can still take requests
+        assert not second.report(429)     # now nothing can
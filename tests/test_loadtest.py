@@ -0,0 +1,39 @@
+import io
+
+import pytest
+import requests
+import soundfile
+
+from loadtest import fake_tts
+from loadtest.fake_tts import MS_PER_CHAR, VOICE_PREFIX, FakeTTS
+
+
+@pytest.fixture
+def fake(monkeypatch):
+    monkeypatch.setattr(fake_tts, "CLIP_SECONDS", range(1, 5))   # encoding all 30 s takes a while
+    server = FakeTTS(latency_sec=0.0, per_char_sec=0.0, jitter=0.0).start()
+    yield server
+    server.stop()
+
+
+def test_serves_catalogs_and_clips_sized_to_the_text(fake):
+    voices = requests.get(f"{fake.base_url}/v1/voices", timeout=5).json()["voices"]
+    assert all(v["voice_id"].startswith(VOICE_PREFIX) for v in voices)
+    assert requests.get(f"{fake.base_url}/v1/voices/someone-else", timeout=5).status_code == 404
+
+    text = "x" * 50
+    r = requests.post(
+        f"{fake.base_url}/v1/text-to-speech/{VOICE_PREFIX}0?output_format=wav_44100",
+        json={"text": text}, timeout=5,
+    )
+    assert r.status_code == 200
+    audio, rate = soundfile.read(io.BytesIO(r.content))
+    assert round(len(audio) / rate) == round(len(text) * MS_PER_CHAR / 1000)
+    assert fake.stats()["requests"] == 1
+
+
+def test_error_rate_answers_503(fake):
+    fake.error_rate = 1.0
+    r = requests.post(f"{fake.base_url}/v1/text-to-speech/{VOICE_PREFIX}0", json={"text": "Hi."}, timeout=5)
+    assert r.status_code == 503
+    assert fake.stats()["errors"] == 1
@@ -0,0 +1,100 @@
+import threading
+import time
+import zipfile
+from dataclasses import replace
+
+import numpy as np
+import pytest
+from pydub import AudioSegment
+
+from listen_engine import pipeline, plan
+from listen_engine.config import DEFAULT_MIX
+from listen_engine.fair_share import FairScheduler
+from listen_engine.mix import assemble_episode, build_episode_zip
+from listen_engine.pipeline import render_episode
+from listen_engine.plan import CharConfig, plan_render
+
+CHARACTERS = ["alice", "bob"]
+
+
+@pytest.fixture
+def fake_synthesis(monkeypatch):
+    """Deterministic clips from a private one-worker scheduler; returns the list of rendered texts."""
+    calls = []
+    lock = threading.Lock()
+
+    def synthesize(job, cfg, mix):
+        with lock:
+            calls.append(job.text)
+        time.sleep(0.01)
+        rng = np.random.default_rng(sum(job.text.encode()))
+        frames = int(mix.sample_rate * (0.2 + len(job.text) / 100))
+        pcm = (rng.standard_normal(frames * mix.channels) * 3000).astype("<i2")
+        return AudioSegment(pcm.tobytes(), sample_width=2, frame_rate=mix.sample_rate, channels=mix.channels), False
+
+    scheduler = FairScheduler(1)
+    monkeypatch.setattr(plan, "synthesize_with_fallback", synthesize)
+    monkeypatch.setattr(plan, "get_scheduler", lambda: scheduler)
+    return calls
+
+
+def _script(n):
+    cfgs = {ch: CharConfig(provider="eleven", eleven_voice_id=f"v-{ch}", eleven_profile={}) for ch in CHARACTERS}
+    items = [(CHARACTERS[i % 2], f"Line number {i}.") for i in range(n)]
+    return plan_render(items + items[:3], cfgs), cfgs
+
+
+@pytest.mark.parametrize("schedule", ["script_order", "longest_first"])
+def test_matches_the_staged_render(fake_synthesis, schedule):
+    mix = replace(DEFAULT_MIX, crossfade_ms=30, schedule=schedule)
+    (planned, jobs), cfgs = _script(12)
+
+    job_audio, _, _, _ = plan.synthesize_jobs(jobs, cfgs, mix)
+    full, stems, edl = assemble_episode(planned, job_audio, cfgs, CHARACTERS, mix)
+    expected = zipfile.ZipFile(build_episode_zip(full, stems, edl))
+
+    with render_episode(planned, jobs, cfgs, CHARACTERS, mix) as episode:
+        got = zipfile.ZipFile(episode.zip())
+        assert episode.duration_ms == len(full)
+    assert got.namelist() == expected.namelist()
+    for name in expected.namelist():
+        assert got.read(name) == expected.read(name), name
+
+
+def test_failed_stage_cancels_queued_requests(fake_synthesis, monkeypatch):
+    def broken_fade(audio, mix):
+        raise ValueError("fade broke")
+
+    monkeypatch.setattr(pipeline, "finish_clip", broken_fade)
+    (planned, jobs), cfgs = _script(40)
+
+    with pytest.raises(ValueError, match="fade broke"):
+        render_episode(planned, jobs, cfgs, CHARACTERS, replace(DEFAULT_MIX, schedule="script_order"))
+    time.sleep(0.1)
+    assert len(fake_synthesis) < len(jobs) // 2
+
+
+@pytest.mark.parametrize("schedule", ["script_order", "longest_first"])
+def test_synthesis_stays_a_window_ahead_of_the_finish_stage(fake_synthesis, monkeypatch, schedule):
+    monkeypatch.setattr(pipeline, "PIPELINE_JOBS_AHEAD", 5)
+    gate = threading.Event()
+    fade = pipeline.finish_clip
+
+    def held_fade(audio, mix):
+        gate.wait()
+        return fade(audio, mix)
+
+    monkeypatch.setattr(pipeline, "finish_clip", held_fade)
+    (planned, jobs), cfgs = _script(30)
+    result = {}
+    mix = replace(DEFAULT_MIX, schedule=schedule)
+    thread = threading.Thread(target=lambda: result.setdefault("ep", render_episode(planned, jobs, cfgs, CHARACTERS, mix)))
+    thread.start()
+
+    time.sleep(0.3)
+    assert len(fake_synthesis) == 5        # the finish stage is stuck on line one
+    gate.set()
+    thread.join(timeout=10)
+    with result["ep"] as episode:
+        assert len(fake_synthesis) == len(jobs)
+        assert len(episode.edl.lines) == len(planned)
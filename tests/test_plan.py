@@ -0,0 +1,67 @@
+from listen_engine import plan
+from listen_engine.plan import CharConfig, SynthJob, plan_render, speaker_signature, synthesize_with_fallback
+from listen_engine.providers import SynthesisError
+
+
+def _eleven(voice="v1", **kw):
+    return CharConfig(provider="eleven", eleven_voice_id=voice, eleven_profile={"stability": 0.5}, **kw)
+
+
+def _hume(name="Ava", **kw):
+    return CharConfig(provider="hume", hume_voice_mode="name", hume_voice_name=name, **kw)
+
+
+def test_identical_voices_share_jobs():
+    cfgs = {"A": _eleven(), "B": _eleven()}
+    lines, jobs = plan_render([("A", "Hi there."), ("B", "Hi there."), ("A", "Hi there.")], cfgs)
+    assert len(jobs) == 1
+    assert next(iter(jobs.values())).occurrences == 3
+    assert len({ln.job_key for ln in lines}) == 1
+
+
+def test_variants_split_jobs():
+    cfgs = {"A": _eleven(), "B": _eleven(variants=3)}
+    _, jobs = plan_render([("A", "Hi there."), ("B", "Hi there.")], cfgs)
+    assert len(jobs) == 2
+    assert speaker_signature(_eleven(variants=0)) == speaker_signature(_eleven(variants=1))
+
+
+def test_fallback_voice_splits_jobs():
+    cfgs = {
+        "A": _eleven(),
+        "B": _eleven(fallback=_hume()),
+        "C": _eleven(fallback=_hume("Kai")),
+        "D": _eleven(fallback=_hume("Kai")),
+    }
+    lines, jobs = plan_render([(ch, "Hi there.") for ch in cfgs], cfgs)
+    assert len(jobs) == 3
+    assert lines[2].job_key == lines[3].job_key
+
+
+def test_force_variation_renders_each_occurrence():
+    cfgs = {"A": _eleven(force_variation=True)}
+    _, jobs = plan_render([("A", "Hi there.")] * 3, cfgs)
+    assert sorted(k[2] for k in jobs) == [0, 1, 2]
+
+
+def test_recorded_characters_have_no_jobs():
+    lines, jobs = plan_render([("A", "Hi.")], {"A": CharConfig(provider="file")})
+    assert not jobs and lines[0].job_key is None
+
+
+def test_hume_fallback_renders_every_variant(monkeypatch):
+    monkeypatch.setattr(plan, "hume_configured", lambda: True)
+    calls = []
+
+    def fake_synthesize(job, cfg, mix):
+        if cfg.provider == "eleven":
+            raise SynthesisError("ElevenLabs is down")
+        calls.append((job.variant, cfg.variants))
+        return f"read {job.variant} of {cfg.variants}"
+
+    monkeypatch.setattr(plan, "synthesize_job", fake_synthesize)
+    cfg = _eleven(variants=3, fallback=_hume())
+    reads = [synthesize_with_fallback(SynthJob("A", "Hi there.", variant=v), cfg) for v in range(3)]
+
+    assert reads == [(f"read {v} of 3", True) for v in range(3)]
+    assert calls == [(0, 3), (1, 3), (2, 3)]
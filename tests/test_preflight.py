@@ -0,0 +1,116 @@
+import time
+
+import pytest
+
+from listen_engine import catalog, preflight as preflight_mod
+from listen_engine.catalog import CatalogUnavailable, VoiceCatalog, get_catalog, get_catalogs
+from listen_engine.config import CATALOG_TTL_SEC, ELEVEN_MAX_CHARS, MixSettings
+from listen_engine.plan import CharConfig
+from listen_engine.preflight import preflight
+
+
+class _Fetches:
+    """Counts catalog fetches per API key; the key in use is `key`."""
+
+    def __init__(self):
+        self.key = "key-1"
+        self.counts = {}
+
+    def __call__(self):
+        self.counts[self.key] = self.counts.get(self.key, 0) + 1
+        return VoiceCatalog(ids={f"voice-{self.key}"}, fetched_at=time.monotonic())
+
+
+@pytest.fixture
+def fetches(monkeypatch):
+    fetch = _Fetches()
+    monkeypatch.setattr(catalog, "api_key", lambda provider: fetch.key)
+    monkeypatch.setattr(catalog, "_FETCHERS", {"eleven": fetch})
+    catalog.clear_catalogs()
+    yield fetch
+    catalog.clear_catalogs()
+
+
+def test_catalog_is_cached_until_its_ttl_runs_out(fetches):
+    cat = get_catalog("eleven")
+    assert get_catalog("eleven") is cat
+    assert fetches.counts == {"key-1": 1}
+
+    cat.fetched_at -= CATALOG_TTL_SEC + 1
+    assert not cat.fresh()
+    refreshed = get_catalog("eleven")
+    assert refreshed is not cat and refreshed.fresh()
+    assert fetches.counts == {"key-1": 2}
+
+
+def test_catalog_is_cached_per_api_key(fetches):
+    first = get_catalog("eleven")
+    fetches.key = "key-2"
+    assert get_catalog("eleven").ids == {"voice-key-2"}
+    fetches.key = "key-1"
+    assert get_catalog("eleven") is first
+    assert fetches.counts == {"key-1": 1, "key-2": 1}
+
+
+def test_unavailable_catalog_maps_to_none(monkeypatch):
+    def down():
+        raise CatalogUnavailable("timed out")
+
+    monkeypatch.setattr(catalog, "_FETCHERS", {"eleven": down, "hume": down})
+    monkeypatch.setattr(catalog, "api_key", lambda provider: "key")
+    assert get_catalogs({"eleven", "hume"}) == {"eleven": None, "hume": None}
+
+
+@pytest.fixture
+def voices(monkeypatch):
+    cat = VoiceCatalog(ids={"alice-voice", "backup-voice"})
+    monkeypatch.setattr(preflight_mod, "get_catalogs", lambda providers: {"eleven": cat})
+    monkeypatch.setattr(preflight_mod, "confirm_eleven_voice", lambda c, vid: vid in c.ids)
+    return cat
+
+
+def test_unknown_voices_are_all_reported_at_once(voices):
+    cfgs = {ch: CharConfig(provider="eleven", eleven_voice_id=f"{ch}-voice") for ch in ("alice", "bob", "cleo")}
+    issues = preflight([("alice", "Hi.")], list(cfgs), cfgs)
+    assert sorted(i.character for i in issues) == ["bob", "cleo"]
+    assert all(i.blocking for i in issues)
+
+
+def test_unavailable_catalog_is_a_warning(monkeypatch):
+    monkeypatch.setattr(preflight_mod, "get_catalogs", lambda providers: {"eleven": None})
+    cfgs = {"alice": CharConfig(provider="eleven", eleven_voice_id="anything")}
+    issues = preflight([("alice", "Hi.")], ["alice"], cfgs)
+    assert len(issues) == 1 and not issues[0].blocking
+
+
+def test_length_limit_applies_to_each_request_chunk(voices):
+    sentence = "x" * 99 + "."
+    long_line = " ".join([sentence] * (ELEVEN_MAX_CHARS // 100 + 5))
+    cfgs = {"alice": CharConfig(provider="eleven", eleven_voice_id="alice-voice")}
+
+    assert preflight([("alice", long_line)], ["alice"], cfgs, MixSettings(chunk_max_chars=400)) == []
+    issues = preflight([("alice", long_line)], ["alice"], cfgs, MixSettings(chunk_max_chars=0))
+    assert len(issues) == 1 and issues[0].blocking
+    assert f"{ELEVEN_MAX_CHARS}-character" in issues[0].message
+
+
+def test_fallback_problems_are_warnings(voices):
+    sentence = "x" * 99 + "."
+    long_line = " ".join([sentence] * (ELEVEN_MAX_CHARS // 100 + 5))
+    cfgs = {
+        "alice": CharConfig(
+            provider="eleven", eleven_voice_id="alice-voice",
+            fallback=CharConfig(provider="eleven", eleven_voice_id="gone-voice"),
+        ),
+        "bob": CharConfig(
+            provider="eleven", eleven_voice_id="alice-voice",
+            fallback=CharConfig(provider="eleven", eleven_voice_id="backup-voice"),
+        ),
+    }
+    issues = preflight([("alice", "Hi."), ("bob", long_line)], ["alice", "bob"], cfgs, MixSettings(chunk_max_chars=0))
+
+    by_character = {i.character: i for i in issues}
+    assert by_character["bob"].blocking                     # the primary is over the limit
+    assert not by_character["bob (fallback)"].blocking      # so is the fallback, but it is optional
+    assert not by_character["alice (fallback)"].blocking    # unknown fallback voice
+    assert "alice" not in by_character
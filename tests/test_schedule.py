@@ -0,0 +1,93 @@
+import pytest
+from pydub import AudioSegment
+
+from listen_engine import estimate
+from listen_engine.clip_store import ClipStore
+from listen_engine.config import MixSettings
+from listen_engine.plan import CharConfig, job_clip_key, plan_render
+from listen_engine.schedule import LONGEST_FIRST, SCRIPT_ORDER, estimate_seconds, order_tasks, record_voice_speed
+
+
+def test_longest_first_sorts_by_estimate_and_script_order_by_position():
+    tasks = [("a", 0, 1.0), ("b", 1, 5.0), ("c", 2, 3.0), ("d", 3, 5.0)]
+    assert order_tasks(tasks, LONGEST_FIRST) == ["b", "d", "c", "a"]   # ties keep script order
+    assert order_tasks(tasks, SCRIPT_ORDER) == ["a", "b", "c", "d"]
+
+
+def test_voice_speed_starts_from_the_defaults_and_learns_a_fit():
+    provider = "test-speed-fit"
+    default = estimate_seconds(provider, "v1", 100)
+    assert default == pytest.approx(1.0 + 0.015 * 100)
+
+    for chars in (20, 80, 200, 50):
+        record_voice_speed(provider, "v1", chars, 0.5 + 0.01 * chars)
+    assert estimate_seconds(provider, "v1", 100) == pytest.approx(1.5)
+    assert estimate_seconds(provider, "v1", 300) == pytest.approx(3.5)
+
+
+def test_voice_speed_needs_a_few_samples_and_rescales_same_length_lines():
+    provider = "test-speed-same-length"
+    record_voice_speed(provider, "v1", 100, 9.0)
+    assert estimate_seconds(provider, "v1", 100) == pytest.approx(2.5)   # one sample: still the defaults
+
+    record_voice_speed(provider, "v1", 100, 9.0)
+    record_voice_speed(provider, "v1", 100, 9.0)
+    # no spread in length to fit a slope: the default base is kept and the rate rescaled
+    assert estimate_seconds(provider, "v1", 100) == pytest.approx(9.0)
+    assert estimate_seconds(provider, "v1", 200) == pytest.approx(17.0)
+
+
+def test_voice_with_no_history_borrows_the_provider_fit():
+    provider = "test-speed-provider-wide"
+    for voice, chars in (("v1", 20), ("v2", 80), ("v1", 200), ("v2", 50)):
+        record_voice_speed(provider, voice, chars, 0.5 + 0.01 * chars)
+    # v1 and v2 have two samples each, too few for their own fits
+    assert estimate_seconds(provider, "v1", 300) == pytest.approx(3.5)
+    assert estimate_seconds(provider, "v3", 300) == pytest.approx(3.5)
+
+
+class _Keys:
+    def __init__(self, slots):
+        self.slots = slots
+
+    def capacity(self):
+        return self.slots
+
+
+@pytest.fixture
+def setup(monkeypatch):
+    """Hume voice, 10 s of wall time per 100 characters, a fresh clip store."""
+    store = ClipStore()
+    monkeypatch.setattr(estimate, "get_clip_store", lambda: store)
+    monkeypatch.setattr(estimate, "estimate_seconds", lambda provider, voice, chars: chars / 10)
+    cfgs = {"ava": CharConfig(provider="hume", hume_voice_mode="name", hume_voice_name="Ava", hume_auto_hints=False)}
+    items = [("ava", ch * n) for ch, n in (("a", 10), ("b", 20), ("c", 30), ("d", 40))]
+    return store, cfgs, items
+
+
+@pytest.mark.parametrize("schedule, slots, wall", [
+    (LONGEST_FIRST, 2, 5.0),   # 4 and 3 start; 2 follows 3
+    (SCRIPT_ORDER, 2, 6.0),    # 2 and 3 start; 4 follows 2
+    (LONGEST_FIRST, 1, 9.0),   # one key slot: serial despite two workers
+])
+def test_estimate_replays_the_schedule_on_pool_and_key_slots(monkeypatch, setup, schedule, slots, wall):
+    store, cfgs, items = setup
+    monkeypatch.setattr(estimate, "synth_workers", lambda: 2)
+    monkeypatch.setattr(estimate, "get_key_pool", lambda provider: _Keys(slots))
+    mix = MixSettings(chunk_max_chars=0, schedule=schedule)
+
+    _, jobs = plan_render(items[:1], cfgs)
+    store.put(job_clip_key(next(iter(jobs.values())), cfgs["ava"], mix), [AudioSegment.silent(duration=500)])
+
+    est = estimate.estimate_render(items, cfgs, ["ava"], mix)
+    hume = est.providers["hume"]
+    assert (hume.requests, hume.cached, hume.billed_chars) == (3, 1, 90)
+    assert est.cost == pytest.approx(90 / 1000 * 0.15)
+    assert est.workers == 2
+    assert est.wall_sec == pytest.approx(wall)
+
+    # the cached read's real length, the rest at speaking rate, plus pads and gaps
+    total_ms = 500 + 90 * 65 + 4 * mix.clip_tail_pad_ms + 3 * mix.gap_same_speaker_ms
+    assert est.episode_sec == pytest.approx(total_ms / 1000)
+    assert est.mix_bytes == estimate.wav_size(est.episode_sec, mix)
+    assert est.stems_bytes == est.mix_bytes
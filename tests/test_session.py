@@ -0,0 +1,51 @@
+from listen_engine.plan import CharConfig
+from listen_engine.session import StudioSession
+
+SCRIPT = b"ava: Hello there.\nben: Hi.\nava: Bye.\n"
+
+
+def _reads(data):
+    calls = []
+
+    def read():
+        calls.append(1)
+        return data
+
+    return read, calls
+
+
+def test_script_is_parsed_once_per_upload():
+    session = StudioSession()
+    read, calls = _reads(SCRIPT)
+    session.load_script("upload-1", read)
+    session.load_script("upload-1", read)
+    assert len(calls) == 1
+    assert session.characters == ["ava", "ben"]
+    assert session.lines_for("ava") == [("ava", "Hello there."), ("ava", "Bye.")]
+
+
+def test_new_script_drops_characters_it_no_longer_has():
+    session = StudioSession()
+    session.load_script("upload-1", _reads(SCRIPT)[0])
+    session.set_config("ava", CharConfig(provider="eleven", eleven_voice_id="v1"))
+    session.set_config("ben", CharConfig(provider="file"))
+    session.takes_for("ben", ("ben.wav", 300), lambda: "takes")
+
+    session.load_script("upload-2", _reads(b"ava: Only me.\n")[0])
+    assert session.characters == ["ava"] and list(session.char_cfgs) == ["ava"]
+    assert session.takes_for("ben", ("ben.wav", 300), lambda: "split again") == "split again"
+
+
+def test_takes_are_split_again_only_when_upload_or_params_change():
+    session = StudioSession()
+    splits = []
+
+    def split():
+        splits.append(1)
+        return f"takes {len(splits)}"
+
+    assert session.takes_for("ben", ("ben.wav", 300), split) == "takes 1"
+    assert session.takes_for("ben", ("ben.wav", 300), split) == "takes 1"
+    assert session.takes_for("ben", ("ben.wav", 500), split) == "takes 2"
+    session.drop_takes("ben")
+    assert session.takes_for("ben", ("ben.wav", 500), split) == "takes 3"
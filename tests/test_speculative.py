@@ -0,0 +1,70 @@
+import threading
+from concurrent.futures import Future
+
+from listen_engine import speculative
+from listen_engine.plan import CharConfig
+from listen_engine.speculative import SpeculativeRun, speculate_character, stop_speculation
+
+
+def _future(result=None, error=None, cancelled=False, done=True):
+    fut = Future()
+    if cancelled:
+        fut.cancel()
+    elif error is not None:
+        fut.set_exception(error)
+    elif done:
+        fut.set_result(result)
+    return fut
+
+
+def test_progress_counts_outcomes_separately():
+    run = SpeculativeRun(signature=())
+    run.futures = [
+        _future("clip"), _future("clip"),
+        _future(error=RuntimeError("provider down")),
+        _future(None),                     # empty audio
+        _future(cancelled=True),
+        _future(done=False),
+    ]
+    progress = run.progress()
+    assert (progress.rendered, progress.failed, progress.cancelled, progress.total) == (2, 2, 1, 6)
+    assert progress.pending == 1
+
+
+def test_jobs_skipped_after_stop_count_as_cancelled():
+    run = SpeculativeRun(signature=())
+    run.futures = [_future("clip"), _future(None)]
+    run.stop()
+    progress = run.progress()
+    assert (progress.rendered, progress.failed, progress.cancelled) == (1, 0, 1)
+
+
+def test_same_config_reuses_the_run_and_a_change_replaces_it(monkeypatch):
+    rendered = []
+    lock = threading.Lock()
+
+    def synthesize(job, cfg, mix):
+        with lock:
+            rendered.append((cfg.eleven_voice_id, job.text))
+        return "clip"
+
+    monkeypatch.setattr(speculative, "synthesize_job", synthesize)
+    script = [("ava", "Hello."), ("ben", "Hi."), ("ava", "Hello."), ("ava", "Bye.")]
+    runs = {}
+
+    first = speculate_character(runs, "ava", CharConfig(provider="eleven", eleven_voice_id="v1"), script)
+    assert len(first.futures) == 2                  # the repeated line is rendered once
+    assert [f.result() for f in first.futures] == ["clip", "clip"]
+    assert speculate_character(runs, "ava", CharConfig(provider="eleven", eleven_voice_id="v1"), script) is first
+
+    second = speculate_character(runs, "ava", CharConfig(provider="eleven", eleven_voice_id="v2"), script)
+    assert second is not first and first.cancel.is_set() and runs["ava"] is second
+    assert all(f.result() == "clip" for f in second.futures)
+    assert sorted(rendered) == [("v1", "Bye."), ("v1", "Hello."), ("v2", "Bye."), ("v2", "Hello.")]
+
+    assert speculate_character(runs, "ava", CharConfig(provider="eleven"), script) is None
+    assert "ava" not in runs and second.cancel.is_set()
+
+    speculate_character(runs, "ava", CharConfig(provider="eleven", eleven_voice_id="v1"), script)
+    stop_speculation(runs, keep=["ben"])
+    assert runs == {}
@@ -0,0 +1,84 @@
+import numpy as np
+import pytest
+from pydub import AudioSegment
+
+from listen_engine import takes as takes_mod
+from listen_engine.takes import split_into_takes
+
+
+def _synthetic_session(rate, channels):
+    """Reads of varying length and level between room-noise gaps, some too short to split on."""
+    rng = np.random.default_rng(7)
+
+    def noise(ms, level):
+        return rng.normal(0, level, rate * ms // 1000 * channels)
+
+    def read(ms, level):
+        t = np.arange(rate * ms // 1000)
+        tone = np.sin(2 * np.pi * 220 * t / rate) * level
+        return np.repeat(tone, channels) + noise(ms, 150)
+
+    parts = [
+        noise(400, 60), read(900, 9000), noise(650, 80), read(300, 3000),
+        noise(120, 60), read(500, 12000),   # breath inside a read: not a split
+        noise(340, 90), read(50, 8000),     # too short to keep
+        noise(800, 40), read(1200, 6000), noise(250, 50),
+    ]
+    pcm = np.clip(np.concatenate(parts), -32768, 32767).astype("<i2")
+    return AudioSegment(pcm.tobytes(), sample_width=2, frame_rate=rate, channels=channels)
+
+
+@pytest.mark.parametrize("rate, channels, keep_silence", [(44100, 1, 100), (22050, 2, 100), (11025, 1, 100), (48000, 1, 200)])
+def test_takes_match_pydub_split_on_silence(rate, channels, keep_silence):
+    from pydub.silence import split_on_silence
+
+    audio = _synthetic_session(rate, channels)
+    kwargs = dict(min_silence_len=300, silence_thresh=-38, keep_silence=keep_silence)
+    expected = [seg for seg in split_on_silence(audio, **kwargs) if len(seg) >= 60]
+
+    store = split_into_takes(audio, min_silence_len=300, silence_thresh_db=-38, keep_silence=keep_silence)
+    assert len(store) == len(expected) == 4
+    for i, seg in enumerate(expected):
+        take = bytes(store.view(i))
+        # a take running into a rounded-up last ms ends at the upload, where pydub pads with silence
+        pad = seg.raw_data[len(take):]
+        assert take == seg.raw_data[:len(take)]
+        assert pad == bytes(len(pad)) and len(pad) <= audio.frame_count(ms=1) * audio.frame_width
+
+
+def _recording():
+    rate = 44100
+    tone = (np.sin(np.arange(rate) / 10) * 12000).astype("<i2")
+    gap = np.zeros(rate // 2, dtype="<i2")
+    pcm = np.concatenate([gap, tone, gap, tone[: rate // 2], gap])
+    return AudioSegment(pcm.tobytes(), sample_width=2, frame_rate=rate, channels=1)
+
+
+def test_take_envelope_comes_from_the_peak_index():
+    store = split_into_takes(_recording())
+    peaks = store.peaks()
+    assert store.peaks() is peaks
+    assert len(peaks) == -(-len(store.raw) // 2 // takes_mod.PEAK_FRAMES)
+
+    x = np.frombuffer(bytes(store.view(0)), dtype="<i2") / 32768.0
+    envelope = store.take_peaks(0, columns=40)
+    assert envelope.shape == (40, 2)
+    # buckets straddling the take's edges may reach a little past it, never short of it
+    assert envelope[:, 0].min() <= x.min() and envelope[:, 1].max() >= x.max()
+    assert np.all(envelope[:, 0] >= -12000 / 32768.0 - 1e-6) and np.all(envelope[:, 1] <= 12000 / 32768.0 + 1e-6)
+
+
+def test_preview_is_encoded_once_per_take(monkeypatch):
+    store = split_into_takes(_recording())
+    assert len(store) == 2
+
+    encoded = []
+    wav_bytes = takes_mod.wav_bytes
+    monkeypatch.setattr(takes_mod, "wav_bytes", lambda clip: encoded.append(clip) or wav_bytes(clip))
+
+    first = store.preview_wav(0)
+    assert store.preview_wav(0) is first
+    assert first[:4] == b"RIFF"
+    store.preview_wav(1)
+    assert len(encoded) == 2
+    assert store.nbytes >= len(store.raw) + len(first)
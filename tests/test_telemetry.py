@@ -0,0 +1,45 @@
+import time
+
+import numpy as np
+import pytest
+
+from listen_engine import telemetry
+
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    path = str(tmp_path / "telemetry.sqlite3")
+    write = telemetry.write_record
+    monkeypatch.setattr(telemetry, "write_record", lambda rec, ok, total, path=path: write(rec, ok, total, path))
+    monkeypatch.setattr(telemetry, "TELEMETRY_RSS_POLL_SEC", 0.02)
+    return path
+
+
+def _touch(mb):
+    block = np.ones(mb * 1024 * 1024, dtype=np.uint8)
+    time.sleep(0.2)
+    return block
+
+
+@pytest.mark.skipif(telemetry._rss_mb() is None, reason="no /proc")
+def test_peak_rss_is_sampled_during_the_render(db):
+    # a high-water mark from before the render must not show up in it
+    block = _touch(300)
+    del block
+    before = telemetry._rss_mb()
+
+    with telemetry.render("test", "tester", kind="remix"):
+        block = _touch(120)
+        del block
+
+    peak = telemetry.recent_renders(path=db)[-1]["peak_rss_mb"]
+    assert before + 80 < peak < before + 250
+
+
+def test_render_row_counts_and_fields(db):
+    with telemetry.render("test", "tester"):
+        telemetry.count("cache_hits", 2)
+        telemetry.set_fields(schedule="script_order")
+
+    row = telemetry.recent_renders(path=db)[-1]
+    assert (row["ok"], row["cache_hits"], row["schedule"]) == (1, 2, "script_order")
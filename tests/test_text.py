@@ -0,0 +1,52 @@
+import pytest
+
+from listen_engine.text import chunk_text, normalize_line_text
+
+
+def _words(chunks):
+    return " ".join(chunks).split()
+
+
+def test_short_lines_are_one_chunk():
+    assert chunk_text("Hello there.", 400) == ["Hello there."]
+    assert chunk_text("Hello there.", 0) == ["Hello there."]
+    assert chunk_text("", 400) == []
+
+
+def test_splits_at_sentence_ends():
+    text = "First sentence is here. Second one follows! Third asks why? Fourth ends it."
+    chunks = chunk_text(text, 50)
+    assert all(len(c) <= 50 for c in chunks)
+    assert all(c.endswith((".", "!", "?")) for c in chunks)
+    assert _words(chunks) == text.split()
+
+
+def test_pause_tag_stays_with_its_sentence_and_closes_a_half_full_chunk():
+    text = "We waited for a long time. [pause] Then the door opened slowly. And nobody came in."
+    chunks = chunk_text(text, 60)
+    assert chunks[0] == "We waited for a long time. [pause]"
+    assert not any(c.startswith("[") for c in chunks)
+    assert _words(chunks) == text.split()
+
+
+def test_over_long_sentence_splits_between_words():
+    text = " ".join(f"word{i}" for i in range(200))
+    chunks = chunk_text(text, 100)
+    assert all(len(c) <= 100 for c in chunks)
+    assert _words(chunks) == text.split()
+
+
+@pytest.mark.parametrize("max_chars", [7, 100, 400])
+def test_no_text_is_lost(max_chars):
+    text = normalize_line_text(
+        "Is this it? " * 30 + "Yes. [short pause] " * 20 + "A long winding sentence without an end " * 15
+    )
+    chunks = chunk_text(text, max_chars)
+    assert "".join(chunks).replace(" ", "") == text.replace(" ", "")
+
+
+def test_unbroken_token_longer_than_a_request_is_cut():
+    token = "x" * 500
+    chunks = chunk_text(f"Before it. {token} After it.", 400)
+    assert all(len(c) <= 400 for c in chunks)
+    assert "".join(chunks).replace(" ", "") == f"Beforeit.{token}Afterit."
@@ -0,0 +1,92 @@
+from dataclasses import replace
+
+import numpy as np
+import pytest
+from pydub import AudioSegment
+
+from listen_engine.config import DEFAULT_MIX
+from listen_engine.edl import EditDecisionList, EdlLine
+from listen_engine.mix import PcmBuffer, Timeline, render_edl, silence
+
+
+def _clip(ms: int, mix, seed: int) -> AudioSegment:
+    rng = np.random.default_rng(seed)
+    frames = int(mix.sample_rate * ms / 1000) + seed % 5
+    pcm = (rng.standard_normal(frames * mix.channels) * 3000).astype("<i2")
+    return AudioSegment(pcm.tobytes(), sample_width=2, frame_rate=mix.sample_rate, channels=mix.channels)
+
+
+def _pydub_mix(lines, clips, mix):
+    """The whole-segment appends the Timeline replaces, with the crossfade clamped the same way."""
+    final = silence(0, mix)
+    last = None
+    for line, audio in zip(lines, clips):
+        if last is not None:
+            gap = mix.gap_same_speaker_ms if last == line.speaker else mix.gap_speaker_change_ms
+            if gap > 0:
+                final += silence(gap, mix)
+        if len(final) == 0:
+            final = audio
+        else:
+            final = final.append(audio, crossfade=min(mix.crossfade_ms, len(final), len(audio)))
+        last = line.speaker
+    return final
+
+
+def _place(lines, clips, mix, characters):
+    sink = PcmBuffer(mix)
+    stems = {ch: PcmBuffer(mix) for ch in characters}
+    timeline = Timeline(mix, sink, stems)
+    for line, audio in zip(lines, clips):
+        timeline.place(line, audio)
+    timeline.close()
+    return sink.segment(), {ch: s.segment() for ch, s in stems.items()}
+
+
+@pytest.mark.parametrize("crossfade,channels", [(0, 1), (30, 1), (30, 2), (120, 1)])
+def test_matches_pydub_appends(crossfade, channels):
+    mix = replace(DEFAULT_MIX, crossfade_ms=crossfade, channels=channels, sample_rate=22050)
+    speakers = ["a", "b", "a", "a", "c", "b", "c", "a"]
+    lines = [EdlLine(sp, "x") for sp in speakers]
+    clips = [_clip(300 + 97 * i, mix, i) for i in range(len(lines))]
+
+    full, _ = _place(lines, clips, mix, ["a", "b", "c"])
+
+    assert full.raw_data == _pydub_mix(lines, clips, mix).raw_data
+
+
+def test_clip_shorter_than_crossfade_is_clamped():
+    mix = replace(DEFAULT_MIX, crossfade_ms=1000, sample_rate=8000)
+    lines = [EdlLine("a", "long"), EdlLine("b", "short"), EdlLine("a", "long again")]
+    clips = [_clip(1500, mix, 1), _clip(250, mix, 2), _clip(1200, mix, 3)]
+
+    full, stems = _place(lines, clips, mix, ["a", "b"])
+
+    assert full.raw_data == _pydub_mix(lines, clips, mix).raw_data
+    assert [ln.duration_ms for ln in lines] == [len(c) for c in clips]
+    # stems do not crossfade: each runs to the end of its last line
+    assert len(stems["a"]) == lines[2].start_ms + lines[2].duration_ms
+
+
+def test_crossfade_longer_than_the_mix_so_far():
+    mix = replace(DEFAULT_MIX, crossfade_ms=500, gap_speaker_change_ms=0, gap_same_speaker_ms=0, sample_rate=8000)
+    lines = [EdlLine("a", "tiny"), EdlLine("b", "longer")]
+    clips = [_clip(120, mix, 4), _clip(900, mix, 5)]
+
+    full, _ = _place(lines, clips, mix, ["a", "b"])
+
+    assert full.raw_data == _pydub_mix(lines, clips, mix).raw_data
+
+
+def test_render_edl_remix_with_long_crossfade():
+    mix = replace(DEFAULT_MIX, sample_rate=8000)
+    edl = EditDecisionList(characters=["a", "b"], mix=mix)
+    for i, (speaker, ms) in enumerate([("a", 2000), ("b", 300), ("a", 150), ("b", 1800)]):
+        edl.clips[("k", i)] = _clip(ms, mix, i)
+        edl.lines.append(EdlLine(speaker, "x", clip=("k", i)))
+
+    full, stems = render_edl(edl, replace(mix, crossfade_ms=2000))
+
+    assert len(full) > 0
+    assert set(stems) == {"a", "b"}
+    assert [ln.start_ms for ln in edl.lines] == sorted(ln.start_ms for ln in edl.lines)
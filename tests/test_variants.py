@@ -0,0 +1,26 @@
+import numpy as np
+from pydub import AudioSegment
+
+from listen_engine.variants import pick_variant, score_variants
+
+
+def _read(ms, level=8000, silent_ms=0, clipped=False, rate=24000):
+    t = np.arange(rate * ms // 1000)
+    x = np.sin(2 * np.pi * 200 * t / rate) * level
+    x[:rate * silent_ms // 1000] = 0
+    if clipped:
+        x = np.clip(x * 6, -32767, 32767)
+    return AudioSegment(x.astype("<i2").tobytes(), sample_width=2, frame_rate=rate, channels=1)
+
+
+def test_clean_read_beats_clipped_silent_and_off_length_ones():
+    clips = [_read(1000, clipped=True), _read(1000, silent_ms=600), _read(1000), _read(1700), _read(1000)]
+    chosen = pick_variant(clips)
+    assert chosen.pick == 2 and chosen.chosen is clips[2]
+    assert chosen.scores[2] == chosen.scores[4] == 0.0
+    assert all(s > 0.5 for i, s in enumerate(chosen.scores) if i not in (2, 4))
+
+
+def test_all_silent_read_scores_as_fully_silent():
+    scores = score_variants([_read(500), _read(500, level=0)])
+    assert scores[0] == 0.0 and scores[1] == 1.0